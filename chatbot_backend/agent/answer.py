@@ -12,17 +12,44 @@ COMPLETE RAG + LLM CHAIN FLOW:
 ONLINE/OFFLINE MODE:
 ====================
 - ONLINE: Full RAG + LLM chain with Groq API
+  (STEP 2 is a single JSON-mode planning call: intent + entities together)
 - OFFLINE: If internet unavailable, uses FAISS-based retrieval with 7,000+ Q&A pairs
 
+ASYNC PIPELINE:
+===============
+- answer_query(): blocking version (scripts, tests, sync callers)
+- answer_query_async(): same chain for the FastAPI event loop - async Groq
+  client, async HTTP for tools, embedding/vector search on an executor
+- answer_query_stream(): async chain that yields the structured fields first,
+  then streams the STEP 5 answer token-by-token (SSE / WebSocket endpoints)
+
+ANSWER CACHE:
+=============
+- All three entry points check the semantic answer cache first - a repeat
+  question (same entities + language) returns without any LLM call
+
 This ensures natural language understanding and natural language generation!
 """
 
-from chatbot_backend.tools.disease import detect_disease
-from chatbot_backend.tools.weather import get_weather
-from chatbot_backend.tools.market_forecast import forecast_price
-from chatbot_backend.tools.mandi_price import get_mandi_price
-from chatbot_backend.rag.retriever import retrieve_context
-from chatbot_backend.llm.client import call_llm, enhance_response_with_llm, extract_entities_with_llm, is_online, NetworkError
+from chatbot_backend.tools.disease import detect_disease, detect_disease_async
+from chatbot_backend.tools.weather import get_weather, get_weather_async
+from chatbot_backend.tools.market_forecast import forecast_price, forecast_price_async
+from chatbot_backend.tools.mandi_price import get_mandi_price, get_mandi_price_async
+from chatbot_backend.rag.retriever import (
+    retrieve_context, retrieve_context_async, embed_query, embed_query_async,
+    retrieve_multi_domain, retrieve_multi_domain_async, pick_best_domain
+)
+from chatbot_backend.agent.semantic_cache import (
+    answer_cache, normalize_query, cache_partition, ANSWER_CACHE_ENABLED
+)
+from chatbot_backend.geo import gazetteer
+from chatbot_backend.llm.client import (
+    call_llm, call_llm_async, stream_llm_async, enhance_response_with_llm,
+    extract_entities_with_llm, is_online, NetworkError
+)
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import Optional
+import asyncio
 import re
 import json
 
@@ -41,8 +68,15 @@ except ImportError:
     print("⚠️ Offline retrieval not available")
 
 
-def extract_location(query: str) -> str:
-    """Fallback: Extract location from query using keywords"""
+def extract_location(query: str, default: str = "Delhi") -> str:
+    """Fallback: Extract location from query (offline gazetteer, then keywords)"""
+    try:
+        location = gazetteer.find_in_text(query)["location"]
+        if location:
+            return location
+    except Exception as e:
+        print(f"   ⚠️ Gazetteer lookup failed: {e}")
+    
     locations = [
         "delhi", "mumbai", "bangalore", "chennai", "kolkata", "hyderabad",
         "pune", "ahmedabad", "lucknow", "jaipur", "chandigarh", "ludhiana",
@@ -55,7 +89,7 @@ def extract_location(query: str) -> str:
         if loc in query_lower:
             return loc.title()
     
-    return "Delhi"
+    return default
 
 
 def extract_crop(query: str) -> str:
@@ -74,8 +108,15 @@ def extract_crop(query: str) -> str:
     return None
 
 
-def extract_state(query: str) -> str:
-    """Fallback: Extract state from query using keywords"""
+def extract_state(query: str, default: str = "Punjab") -> str:
+    """Fallback: Extract state from query (offline gazetteer, then keywords)"""
+    try:
+        state = gazetteer.find_in_text(query)["state"]
+        if state:
+            return state
+    except Exception as e:
+        print(f"   ⚠️ Gazetteer lookup failed: {e}")
+    
     states = [
         "punjab", "haryana", "uttar pradesh", "maharashtra", "karnataka",
         "tamil nadu", "west bengal", "gujarat", "rajasthan", "bihar",
@@ -87,14 +128,14 @@ def extract_state(query: str) -> str:
         if state in query_lower:
             return state.title()
     
-    return "Punjab"
+    return default
 
 
-def llm_classify_intent(query: str) -> str:
-    """
-    STEP 2a: Use LLaMA-3 to classify user intent
-    """
-    prompt = f"""Classify this agricultural query into ONE category.
+VALID_INTENTS = ["weather", "disease", "market_forecast", "mandi_price", "soil", "scheme", "crop_advice", "general"]
+
+
+def _intent_prompt(query: str) -> str:
+    return f"""Classify this agricultural query into ONE category.
 
 Query: "{query}"
 
@@ -110,40 +151,144 @@ Categories:
 
 Reply with ONLY the category name (one word):"""
 
+
+def _normalize_intent(response: str) -> str:
+    intent = response.strip().lower().replace('"', '').replace("'", "")
+    
+    # Normalize intent
+    if intent in VALID_INTENTS:
+        return intent
+    
+    # Fuzzy match
+    for valid in VALID_INTENTS:
+        if valid in intent:
+            return valid
+    
+    return "general"
+
+
+def llm_classify_intent(query: str) -> str:
+    """
+    STEP 2a: Use LLaMA-3 to classify user intent
+    (standalone - the chain uses llm_plan_query() instead)
+    """
     try:
-        response = call_llm(prompt)
-        intent = response.strip().lower().replace('"', '').replace("'", "")
-        
-        # Normalize intent
-        valid_intents = ["weather", "disease", "market_forecast", "mandi_price", "soil", "scheme", "crop_advice", "general"]
-        if intent in valid_intents:
-            return intent
-        
-        # Fuzzy match
-        for valid in valid_intents:
-            if valid in intent:
-                return valid
-        
-        return "general"
+        return _normalize_intent(call_llm(_intent_prompt(query)))
     except:
         return "general"
 
 
+def _keyword_entities(query: str) -> dict:
+    """Fallback to keyword extraction when the LLM is unavailable"""
+    return {
+        "crop": extract_crop(query),
+        "location": extract_location(query, default=None),
+        "state": extract_state(query, default=None),
+        "district": None,
+        "disease": None
+    }
+
+
 def llm_extract_entities(query: str) -> dict:
     """
     STEP 2b: Use LLaMA-3 to extract entities from query
+    (standalone - the chain uses llm_plan_query() instead)
     """
     try:
         return extract_entities_with_llm(query)
     except:
-        # Fallback to keyword extraction
-        return {
-            "crop": extract_crop(query),
-            "location": extract_location(query),
-            "state": extract_state(query),
-            "district": None,
-            "disease": None
-        }
+        return _keyword_entities(query)
+
+
+class QueryPlan(BaseModel):
+    """Schema for the STEP 2 planning call - intent + entities in one JSON object"""
+    intent: str = "general"
+    crop: Optional[str] = None
+    location: Optional[str] = None
+    state: Optional[str] = None
+    district: Optional[str] = None
+    disease: Optional[str] = None
+
+    @field_validator("intent", mode="before")
+    @classmethod
+    def _valid_intent(cls, value):
+        return _normalize_intent(str(value or ""))
+
+    @field_validator("crop", "location", "state", "district", "disease", mode="before")
+    @classmethod
+    def _blank_to_none(cls, value):
+        if value is None:
+            return None
+        value = str(value).strip()
+        if value.lower() in ("", "none", "null", "unknown", "n/a", "not specified"):
+            return None
+        return value
+
+    def entities(self) -> dict:
+        return self.model_dump(exclude={"intent"})
+
+
+def _plan_prompt(query: str) -> str:
+    return f"""Analyze this agricultural query and reply with a JSON object.
+
+Query: "{query}"
+
+JSON keys:
+- intent: exactly one of {VALID_INTENTS}
+    weather = weather, rain, temperature, climate
+    disease = plant diseases, crop problems, leaf issues, pests
+    market_forecast = future crop prices, price predictions
+    mandi_price = current mandi rates, today's prices, wholesale rates
+    soil = soil health, fertilizers, nutrients, pH
+    scheme = government schemes, subsidies, PM-KISAN, PMFBY
+    crop_advice = farming practices, cultivation, irrigation
+    general = any other agricultural question
+- crop: crop name if mentioned (e.g. wheat, rice, potato) or null
+- location: city/village name if mentioned or null
+- state: Indian state name if mentioned or null
+- district: district name if mentioned or null
+- disease: disease name if mentioned or null
+
+Example: {{"intent": "mandi_price", "crop": "onion", "location": "Nashik", "state": "Maharashtra", "district": "Nashik", "disease": null}}"""
+
+
+def _parse_plan(query: str, response: str) -> QueryPlan:
+    """Validate the planner JSON, falling back to keyword extraction if it is malformed"""
+    try:
+        return QueryPlan.model_validate_json(response)
+    except ValidationError as e:
+        print(f"   ⚠️ Invalid plan from LLM, using keyword extraction: {e}")
+        return QueryPlan(intent="general", **_keyword_entities(query))
+
+
+def llm_plan_query(query: str) -> QueryPlan:
+    """
+    STEP 2: One JSON-mode LLaMA-3 call for intent + entities
+    
+    Raises:
+        NetworkError: If the LLM is unreachable (caller switches to offline mode)
+    """
+    try:
+        response = call_llm(_plan_prompt(query), json_mode=True, max_tokens=150)
+    except NetworkError:
+        raise
+    except Exception as e:
+        # Groq rejects JSON-mode completions that fail to parse (HTTP 400)
+        response = ""
+        print(f"   ⚠️ Planning call failed: {e}")
+    return _parse_plan(query, response)
+
+
+async def llm_plan_query_async(query: str) -> QueryPlan:
+    """Async version of llm_plan_query()"""
+    try:
+        response = await call_llm_async(_plan_prompt(query), json_mode=True, max_tokens=150)
+    except NetworkError:
+        raise
+    except Exception as e:
+        response = ""
+        print(f"   ⚠️ Planning call failed: {e}")
+    return _parse_plan(query, response)
 
 
 def clean_advisory_text(advisory_list: list) -> list:
@@ -191,12 +336,12 @@ def clean_advisory_text(advisory_list: list) -> list:
     ]
 
 
-def llm_generate_response(query: str, tool_data: dict, entities: dict, language: str = "en") -> str:
+def _response_prompt(query: str, tool_data: dict, entities: dict, language: str = "en"):
     """
-    STEP 5: Use LLaMA-3 to generate farmer-friendly final response
+    Build the STEP 5 prompt from tool/API/RAG data
     
-    Takes the raw tool/API/RAG data and creates a natural, helpful response
-    Respects the language preference - English by default
+    Returns:
+        (prompt, summary, cleaned advisory) - the latter two feed the fallback
     """
     
     # Determine response language
@@ -263,44 +408,664 @@ IMPORTANT RULES:
 
 RESPONSE:"""
 
+    return prompt, summary, advisory
+
+
+def _generation_fallback(query: str, summary: str, advisory: list) -> str:
+    """Response text when the STEP 5 LLM call fails (blocking - may hit offline KB)"""
+    
+    # Try offline retrieval first for better response
+    if OFFLINE_AVAILABLE:
+        try:
+            offline_result = get_offline_answer(query)
+            if offline_result.get("confidence", 0) > 0.4:
+                return offline_result.get("message", "")
+        except:
+            pass
+    
+    # Create a clean fallback response (NOT raw data)
+    fallback_parts = []
+    
+    # Use summary if clean
+    if summary and not any(skip in summary.lower() for skip in ['kg/ha', 'temp [', 'rainfall [']):
+        fallback_parts.append(summary)
+    
+    # Add clean advisory only
+    clean_advisory = clean_advisory_text(advisory) if advisory else []
+    if clean_advisory:
+        fallback_parts.append("\n\nसुझाव (Suggestions):")
+        for i, adv in enumerate(clean_advisory[:3], 1):
+            fallback_parts.append(f"{i}. {adv}")
+    
+    if fallback_parts:
+        return "\n".join(fallback_parts)
+    else:
+        return """I can help you with your farming question. Here are some general suggestions:
+
+1. Get your soil tested at the nearest Krishi Vigyan Kendra
+2. Follow recommended practices for your crop and region
+3. Call the farmer helpline 1800-180-1551 for specific guidance
+
+Please ask your question again for more specific advice."""
+
+
+def llm_generate_response(query: str, tool_data: dict, entities: dict, language: str = "en") -> str:
+    """
+    STEP 5: Use LLaMA-3 to generate farmer-friendly final response
+    
+    Takes the raw tool/API/RAG data and creates a natural, helpful response
+    Respects the language preference - English by default
+    """
+    prompt, summary, advisory = _response_prompt(query, tool_data, entities, language)
+
     try:
         return call_llm(prompt)
     except (NetworkError, Exception) as e:
         print(f"   ⚠️ LLM generation failed: {e}")
+        return _generation_fallback(query, summary, advisory)
+
+
+async def llm_generate_response_async(query: str, tool_data: dict, entities: dict, language: str = "en") -> str:
+    """Async version of llm_generate_response()"""
+    prompt, summary, advisory = _response_prompt(query, tool_data, entities, language)
+
+    try:
+        return await call_llm_async(prompt)
+    except (NetworkError, Exception) as e:
+        print(f"   ⚠️ LLM generation failed: {e}")
+        return await asyncio.to_thread(_generation_fallback, query, summary, advisory)
+
+
+# =========================================================
+# Shared building blocks for answer_query / answer_query_async
+# =========================================================
+
+def _conversational_result(message: str, mode: str, source: str = "KrishiMitra") -> dict:
+    return {
+        "type": "conversational",
+        "summary": "Greeting",
+        "details": {},
+        "advisory": [],
+        "confidence": 1.0,
+        "source": source,
+        "message": message,
+        "entities": {},
+        "intent": "greeting",
+        "mode": mode
+    }
+
+
+def _offline_mode_response(query: str) -> dict:
+    """Answer a query without internet (blocking - FAISS search + embedding)"""
+    
+    # Use offline retrieval system
+    if OFFLINE_AVAILABLE:
+        # Initialize if not ready
+        if not is_offline_ready():
+            print("   🔄 Initializing offline system...")
+            initialize_offline_system()
         
-        # Try offline retrieval first for better response
-        if OFFLINE_AVAILABLE:
-            try:
-                offline_result = get_offline_answer(query)
-                if offline_result.get("confidence", 0) > 0.4:
-                    return offline_result.get("message", "")
-            except:
-                pass
+        # Handle conversational queries first
+        conversational_response = handle_conversational(query)
+        if conversational_response:
+            return _conversational_result(conversational_response, "offline", "KrishiMitra (Offline)")
+        
+        # Get offline answer
+        offline_result = get_offline_answer(query)
+        offline_result["mode"] = "offline"
+        offline_result["entities"] = {}
+        offline_result["intent"] = "offline_qa"
+        return offline_result
+    else:
+        return {
+            "type": "error",
+            "summary": "No internet connection",
+            "details": {"error": "Internet is required for this feature"},
+            "advisory": ["Please check your internet connection", "Connect to WiFi or mobile data"],
+            "confidence": 0.0,
+            "source": "KrishiMitra",
+            "message": "इंटरनेट कनेक्शन नहीं है। कृपया अपना इंटरनेट कनेक्शन जांचें।\n\nNo internet connection. Please check your internet connection.",
+            "entities": {},
+            "intent": "error",
+            "mode": "offline"
+        }
+
+
+def _offline_fallback(query: str) -> dict:
+    """Offline KB answer used when the LLM fails mid-chain (blocking)"""
+    offline_result = get_offline_answer(query)
+    offline_result["mode"] = "offline_fallback"
+    return offline_result
+
+
+def _context_place(context: dict):
+    """State / district for the user's lat/lng from the offline gazetteer"""
+    lat, lng = context.get("lat"), context.get("lng")
+    if lat is None or lng is None:
+        return None
+    try:
+        return gazetteer.reverse_geocode(lat, lng)
+    except Exception as e:
+        print(f"   ⚠️ Reverse geocoding failed: {e}")
+        return None
+
+
+def _text_district(query: str):
+    """District of a place named in the query (e.g. a mandi or tehsil)"""
+    try:
+        return gazetteer.find_in_text(query)["district"]
+    except Exception:
+        return None
+
+
+def _merge_entities(entities: dict, context: dict, query: str) -> dict:
+    """
+    Merge LLM entities with user context (user context takes priority);
+    the user's coordinates fill location / state / district before the
+    keyword defaults do
+    """
+    place = _context_place(context) or {}
+    entities["crop"] = context.get("crop") or entities.get("crop") or extract_crop(query)
+    entities["location"] = (context.get("location") or entities.get("location")
+                            or place.get("location") or extract_location(query))
+    entities["state"] = (context.get("state") or entities.get("state")
+                         or place.get("state") or extract_state(query))
+    entities["district"] = entities.get("district") or place.get("district") or _text_district(query)
+    return entities
+
+
+def _disease_image_required_result() -> dict:
+    return {
+        "type": "disease",
+        "summary": "कृपया पौधे की तस्वीर अपलोड करें (Please upload plant image)",
+        "details": {"error": "No image provided", "instructions": "Take a clear photo of the affected leaf"},
+        "advisory": [
+            "प्रभावित पत्ती की साफ फोटो लें",
+            "अच्छी रोशनी में फोटो खींचें",
+            "15-20 सेमी दूरी से फोटो लें",
+            "Please upload a clear photo of the affected plant leaf"
+        ],
+        "confidence": 0.0,
+        "source": "ML Disease Detection Model"
+    }
+
+
+def _soil_result(query: str, rag_context: str = None) -> dict:
+    """Soil tool result from RAG context, or general guidelines if none was found"""
+    if rag_context and rag_context.strip():
+        lines = rag_context.split('\n')[:5]
+        advisory = [line.strip() for line in lines if line.strip() and len(line) > 20]
         
-        # Create a clean fallback response (NOT raw data)
-        fallback_parts = []
+        return {
+            "type": "soil",
+            "summary": f"मिट्टी और उर्वरक संबंधी जानकारी",
+            "details": {
+                "query": query,
+                "information": rag_context[:600]
+            },
+            "advisory": advisory if advisory else [
+                "मिट्टी की जांच कराएं",
+                "संतुलित उर्वरक का प्रयोग करें",
+                "जैविक खाद का उपयोग करें"
+            ],
+            "confidence": 0.8,
+            "source": "Agricultural Knowledge Base (RAG)"
+        }
+    
+    return {
+        "type": "soil",
+        "summary": "Soil and fertilizer guidance",
+        "details": {"query": query},
+        "advisory": [
+            "Get soil tested at nearest Krishi Vigyan Kendra",
+            "Apply balanced NPK based on soil test report",
+            "Add organic manure like FYM or compost",
+            "Maintain soil pH between 6.0-7.5"
+        ],
+        "confidence": 0.6,
+        "source": "General Agricultural Guidelines"
+    }
+
+
+def _scheme_result(query: str, rag_context: str = None) -> dict:
+    """Scheme tool result from RAG context, or well-known schemes if none was found"""
+    if rag_context and rag_context.strip():
+        lines = rag_context.split('\n')
+        advisory = [line.strip() for line in lines if line.strip() and len(line) > 20][:5]
         
-        # Use summary if clean
-        if summary and not any(skip in summary.lower() for skip in ['kg/ha', 'temp [', 'rainfall [']):
-            fallback_parts.append(summary)
+        return {
+            "type": "scheme",
+            "summary": "सरकारी योजनाओं की जानकारी",
+            "details": {
+                "query": query,
+                "information": rag_context[:800]
+            },
+            "advisory": advisory,
+            "confidence": 0.85,
+            "source": "Government Schemes Database (RAG)"
+        }
+    
+    return {
+        "type": "scheme",
+        "summary": "Government schemes information",
+        "details": {"query": query},
+        "advisory": [
+            "PM-KISAN: ₹6000 annual direct benefit",
+            "PMFBY: Crop insurance scheme",
+            "KCC: Kisan Credit Card for loans",
+            "Visit https://pmkisan.gov.in for registration",
+            "Call 1800-180-1551 for helpline"
+        ],
+        "confidence": 0.7,
+        "source": "Government Agricultural Schemes"
+    }
+
+
+GENERAL_DOMAINS = [
+    "crop_recommendation",
+    "modern_farming",
+    "organic_farming",
+    "general_agri",
+    "historic_practices"
+]
+
+
+def _crop_advice_result(query: str, rag_context: str, used_domain: str) -> dict:
+    lines = rag_context.split('\n')
+    advisory = []
+    for line in lines:
+        line = line.strip()
+        if line and len(line) > 20:
+            advisory.append(line[:200])
+        if len(advisory) >= 5:
+            break
+    
+    return {
+        "type": "crop_advice",
+        "summary": f"कृषि संबंधी जानकारी",
+        "details": {
+            "query": query,
+            "information": rag_context[:700],
+            "domain": used_domain
+        },
+        "advisory": advisory if advisory else [
+            "Consult local agricultural extension officer",
+            "Follow recommended practices for your region"
+        ],
+        "confidence": 0.75,
+        "source": "Agricultural Knowledge Base (RAG)"
+    }
+
+
+def _direct_llm_prompt(query: str) -> str:
+    return f"""As KrishiMitra agricultural assistant, answer this farmer's question:
+
+Question: {query}
+
+Provide practical, helpful advice in simple language. Include:
+1. Direct answer to the question
+2. Step-by-step guidance if applicable
+3. Any precautions or warnings
+4. Suggest contacting Krishi Vigyan Kendra if needed
+
+Keep response under 200 words."""
+
+
+def _general_llm_result(query: str, direct_llm_response: str) -> dict:
+    return {
+        "type": "general",
+        "summary": "कृषि सहायता",
+        "details": {
+            "query": query
+        },
+        "advisory": [
+            "Visit nearest Krishi Vigyan Kendra for detailed guidance",
+            "Call farmer helpline: 1800-180-1551 (toll-free)",
+            "Use Kisan Suvidha mobile app"
+        ],
+        "confidence": 0.6,
+        "source": "KrishiMitra AI Assistant",
+        "message": direct_llm_response  # Pre-set the message from direct LLM call
+    }
+
+
+def _tool_fallback_message(tool_result: dict) -> str:
+    """Clean fallback text built from the tool result (not raw data)"""
+    summary = tool_result.get("summary", "")
+    raw_advisory = tool_result.get("advisory", [])
+    
+    # Use clean_advisory_text to filter out raw data
+    advisory = clean_advisory_text(raw_advisory)
+    
+    fallback_parts = []
+    if summary and not any(skip in summary.lower() for skip in ['kg/ha', 'temp [', 'rainfall [']):
+        fallback_parts.append(summary)
+    if advisory:
+        fallback_parts.append("\nसुझाव:")
+        for adv in advisory[:3]:
+            fallback_parts.append(f"• {adv}")
+    
+    return "\n".join(fallback_parts) if fallback_parts else """I can help you with your farming question. 
+            
+Please contact your local Krishi Vigyan Kendra or call the farmer helpline 1800-180-1551 for specific guidance."""
+
+
+def _final_response(tool_result: dict, llm_response: str, entities: dict, intent: str) -> dict:
+    """Combine everything into the standardized response"""
+    
+    # Clean advisory in final response too
+    clean_final_advisory = clean_advisory_text(tool_result.get("advisory", []))
+    
+    return {
+        "type": tool_result.get("type", "general"),
+        "summary": tool_result.get("summary", ""),
+        "details": tool_result.get("details", {}),
+        "advisory": clean_final_advisory,  # Use cleaned advisory
+        "confidence": tool_result.get("confidence", 0.7),
+        "source": tool_result.get("source", "KrishiMitra"),
+        "message": llm_response,  # The farmer-friendly LLM-generated response
+        "entities": entities,  # Include extracted entities for transparency
+        "intent": intent,  # Include detected intent
+        "mode": "online"  # Indicate online mode
+    }
+
+
+# =========================================================
+# STEP 3-4: Routing (one decision, sync + async dispatch)
+# =========================================================
+
+TOOLS = {
+    "disease": detect_disease,
+    "weather": get_weather,
+    "market_forecast": forecast_price,
+    "mandi_price": get_mandi_price,
+}
+
+ASYNC_TOOLS = {
+    "disease": detect_disease_async,
+    "weather": get_weather_async,
+    "market_forecast": forecast_price_async,
+    "mandi_price": get_mandi_price_async,
+}
+
+# RAG-only routes: a domain's context shorter than this tries the next domain
+MIN_RAG_CONTEXT = 50
+
+
+class ToolRoute:
+    """
+    What STEP 3-4 does for a query - decided once by _route(), executed by
+    _run_route() / _run_route_async()
+    
+    - result:  answered without any call
+    - tool:    TOOLS / ASYNC_TOOLS key, called with args / kwargs;
+               rag = (query, domain, k, max_chars) knowledge that does not
+               depend on the tool result (async fetches it concurrently),
+               enrich(tool_result) -> same tuple or None when it does
+    - domains: RAG-only route - domains tried in order, build(query, context)
+               makes the tool result; without build it is the general
+               multi-domain search with the direct LLM fallback
+    """
+    
+    def __init__(self, label: str, result: dict = None, tool: str = None, args: tuple = (),
+                 kwargs: dict = None, rag: tuple = None, enrich=None, domains: tuple = (),
+                 k: int = 3, build=None, notes: list = None):
+        self.label = label
+        self.result = result
+        self.tool = tool
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.rag = rag
+        self.enrich = enrich
+        self.domains = domains
+        self.k = k
+        self.build = build
+        self.notes = notes or []
+    
+    def rag_request(self, tool_result: dict):
+        if self.rag is not None:
+            return self.rag
+        return self.enrich(tool_result) if self.enrich else None
+
+
+def _route(intent: str, entities: dict, context: dict, query: str, image_path: str = None) -> ToolRoute:
+    """Tool / API / RAG call for the planned intent and entities"""
+    
+    # 🦠 DISEASE DETECTION
+    if intent == "disease":
+        if not image_path:
+            return ToolRoute("Disease Detection Tool", result=_disease_image_required_result())
+        
+        crop_type = entities.get("crop", "unknown") or "unknown"
+        
+        def disease_knowledge(tool_result):
+            # Enhance with RAG knowledge
+            if tool_result.get("confidence", 0) > 0.5:
+                disease_name = tool_result.get("details", {}).get("disease", "")
+                if disease_name:
+                    return f"treatment for {disease_name} in {crop_type}", "pest_disease", 2, 500
+            return None
         
-        # Add clean advisory only
-        clean_advisory = clean_advisory_text(advisory) if advisory else []
-        if clean_advisory:
-            fallback_parts.append("\n\nसुझाव (Suggestions):")
-            for i, adv in enumerate(clean_advisory[:3], 1):
-                fallback_parts.append(f"{i}. {adv}")
+        return ToolRoute("Disease Detection Tool", tool="disease", args=(image_path, crop_type.lower()),
+                         enrich=disease_knowledge)
+    
+    # 🌤️ WEATHER QUERY
+    if intent == "weather":
+        location = entities.get("location", context.get("location", "Delhi"))
+        lat = context.get("lat")
+        lng = context.get("lng")
+        
+        def weather_advisory(tool_result):
+            condition = tool_result.get("details", {}).get("condition", "normal")
+            return f"farming activities during {condition} weather", "weather_advisory", 2, 400
         
-        if fallback_parts:
-            return "\n".join(fallback_parts)
-        else:
-            return """I can help you with your farming question. Here are some general suggestions:
+        # Use lat/lng for precise weather if available
+        if lat is not None and lng is not None:
+            return ToolRoute("Weather API", tool="weather", kwargs={"location": None, "lat": lat, "lng": lng},
+                             enrich=weather_advisory, notes=[f"📍 Using coordinates: lat={lat}, lng={lng}"])
+        return ToolRoute("Weather API", tool="weather", kwargs={"location": location},
+                         enrich=weather_advisory, notes=[f"📍 Using location name: {location}"])
+    
+    # 📈 MARKET PRICE FORECAST
+    if intent == "market_forecast":
+        crop = entities.get("crop", "Potato")
+        state = entities.get("state", "Punjab")
+        return ToolRoute("Market Forecast API", tool="market_forecast", args=(crop, state),
+                         rag=(f"market trends and selling tips for {crop}", "market_knowledge", 2, 400))
+    
+    # 🏪 MANDI PRICE
+    if intent == "mandi_price":
+        crop = entities.get("crop", "Potato")
+        state = entities.get("state", "Punjab")
+        return ToolRoute("Mandi Price API", tool="mandi_price", args=(crop, state, entities.get("district")))
+    
+    # 🌱 SOIL / FERTILIZER - soil interpretation first
+    if intent == "soil":
+        return ToolRoute("Soil Knowledge RAG", domains=("soil_interpretation", "soil_knowledge"),
+                         k=3, build=_soil_result)
+    
+    # 📋 GOVERNMENT SCHEMES
+    if intent == "scheme":
+        return ToolRoute("Government Schemes RAG", domains=("govt_schemes",), k=4, build=_scheme_result)
+    
+    # 🌾 CROP ADVICE / GENERAL AGRICULTURE
+    return ToolRoute("General Agriculture RAG", domains=tuple(GENERAL_DOMAINS), k=3)
 
-1. Get your soil tested at the nearest Krishi Vigyan Kendra
-2. Follow recommended practices for your crop and region
-3. Call the farmer helpline 1800-180-1551 for specific guidance
 
-Please ask your question again for more specific advice."""
+def _add_rag_knowledge(tool_result: dict, rag_context, max_chars: int):
+    if rag_context:
+        tool_result["rag_knowledge"] = rag_context[:max_chars]
+
+
+def _run_route(route: ToolRoute, query: str):
+    """
+    Execute a route (blocking)
+    
+    Returns:
+        (final, tool_result) - `final` is a complete response when the
+        chain ends early (LLM failure -> offline answer), else None
+    """
+    print(f"   ➡️ {route.label}")
+    for note in route.notes:
+        print(f"   {note}")
+    
+    if route.result is not None:
+        return None, route.result
+    
+    if route.tool:
+        tool_result = TOOLS[route.tool](*route.args, **route.kwargs)
+        try:
+            request = route.rag_request(tool_result)
+            if request:
+                rag_query, domain, k, max_chars = request
+                _add_rag_knowledge(tool_result, retrieve_context(rag_query, domain=domain, k=k), max_chars)
+        except:
+            pass
+        return None, tool_result
+    
+    if route.build:
+        try:
+            for domain in route.domains:
+                rag_context = retrieve_context(query, domain=domain, k=route.k)
+                if rag_context and len(rag_context.strip()) >= MIN_RAG_CONTEXT:
+                    break
+        except:
+            rag_context = None
+        return None, route.build(query, rag_context)
+    
+    # One embedding + one search across all general domains, best score wins
+    try:
+        hits = retrieve_multi_domain(query, list(route.domains), k=route.k)
+        used_domain, rag_context = pick_best_domain(hits)
+        if used_domain:
+            print(f"      ✓ Found in {used_domain} (score {hits[used_domain][0][1]:.2f})")
+    except Exception as e:
+        print(f"      ⚠️ RAG search failed: {e}")
+        used_domain, rag_context = None, None
+    
+    if rag_context and rag_context.strip():
+        return None, _crop_advice_result(query, rag_context, used_domain)
+    
+    # Fallback: Use LLM directly with no RAG context
+    print(f"      ⚠️ No RAG context, using LLM directly")
+    try:
+        direct_llm_response = call_llm(_direct_llm_prompt(query))
+    except (NetworkError, Exception) as e:
+        print(f"      ⚠️ LLM failed, using offline: {e}")
+        if OFFLINE_AVAILABLE:
+            return _offline_fallback(query), None
+        direct_llm_response = "कृपया अपना प्रश्न दोबारा पूछें। Please ask your question again."
+    
+    return None, _general_llm_result(query, direct_llm_response)
+
+
+async def _run_route_async(route: ToolRoute, query: str):
+    """Execute a route without blocking the event loop - same result as _run_route()"""
+    print(f"   ➡️ {route.label}")
+    for note in route.notes:
+        print(f"   {note}")
+    
+    if route.result is not None:
+        return None, route.result
+    
+    if route.tool:
+        tool_call = ASYNC_TOOLS[route.tool](*route.args, **route.kwargs)
+        
+        if route.rag is not None:
+            # Tool and RAG knowledge are independent - run both at once
+            rag_query, domain, k, max_chars = route.rag
+            tool_result, rag_context = await asyncio.gather(
+                tool_call,
+                retrieve_context_async(rag_query, domain=domain, k=k),
+                return_exceptions=True
+            )
+            if isinstance(tool_result, Exception):
+                raise tool_result
+            if not isinstance(rag_context, Exception):
+                _add_rag_knowledge(tool_result, rag_context, max_chars)
+            return None, tool_result
+        
+        tool_result = await tool_call
+        try:
+            request = route.rag_request(tool_result)
+            if request:
+                rag_query, domain, k, max_chars = request
+                _add_rag_knowledge(tool_result, await retrieve_context_async(rag_query, domain=domain, k=k), max_chars)
+        except:
+            pass
+        return None, tool_result
+    
+    if route.build:
+        try:
+            for domain in route.domains:
+                rag_context = await retrieve_context_async(query, domain=domain, k=route.k)
+                if rag_context and len(rag_context.strip()) >= MIN_RAG_CONTEXT:
+                    break
+        except:
+            rag_context = None
+        return None, route.build(query, rag_context)
+    
+    try:
+        hits = await retrieve_multi_domain_async(query, list(route.domains), k=route.k)
+        used_domain, rag_context = pick_best_domain(hits)
+        if used_domain:
+            print(f"      ✓ Found in {used_domain} (score {hits[used_domain][0][1]:.2f})")
+    except Exception as e:
+        print(f"      ⚠️ RAG search failed: {e}")
+        used_domain, rag_context = None, None
+    
+    if rag_context and rag_context.strip():
+        return None, _crop_advice_result(query, rag_context, used_domain)
+    
+    print(f"      ⚠️ No RAG context, using LLM directly")
+    try:
+        direct_llm_response = await call_llm_async(_direct_llm_prompt(query))
+    except (NetworkError, Exception) as e:
+        print(f"      ⚠️ LLM failed, using offline: {e}")
+        if OFFLINE_AVAILABLE:
+            return await asyncio.to_thread(_offline_fallback, query), None
+        direct_llm_response = "कृपया अपना प्रश्न दोबारा पूछें। Please ask your question again."
+    
+    return None, _general_llm_result(query, direct_llm_response)
+
+
+def _answer_cache_key(query: str, context: dict, image_path: str = None):
+    """(text, partition, embedding) for the answer cache, or None if not applicable"""
+    if not ANSWER_CACHE_ENABLED or image_path:
+        return None
+    try:
+        text = normalize_query(query)
+        partition = cache_partition(text, context)
+        if partition is None:
+            return None
+        return text, partition, embed_query(text)
+    except Exception as e:
+        print(f"   ⚠️ Answer cache key failed: {e}")
+        return None
+
+
+async def _answer_cache_key_async(query: str, context: dict, image_path: str = None):
+    """Async version of _answer_cache_key() - embedding runs on the retrieval executor"""
+    if not ANSWER_CACHE_ENABLED or image_path:
+        return None
+    try:
+        text = normalize_query(query)
+        partition = cache_partition(text, context)
+        if partition is None:
+            return None
+        return text, partition, await embed_query_async(text)
+    except Exception as e:
+        print(f"   ⚠️ Answer cache key failed: {e}")
+        return None
+
+
+def _cached_answer(query: str, cache_key) -> dict:
+    if cache_key is None:
+        return None
+    cached = answer_cache.lookup(*cache_key)
+    if cached:
+        print(f"⚡ Answer cache hit ({cached['cache_similarity']:.2f}): {query}")
+    return cached
 
 
 def answer_query(query: str, image_path: str = None, user_context: dict = None):
@@ -313,12 +1078,14 @@ def answer_query(query: str, image_path: str = None, user_context: dict = None):
     2. If OFFLINE: Use FAISS retrieval with 7,000+ Q&A pairs
     3. If ONLINE: Full RAG + LLM chain
        a. Check for conversational queries (greetings, thanks)
-       b. LLaMA-3 classifies intent + extracts entities
+       b. LLaMA-3 classifies intent + extracts entities (one JSON-mode call)
        c. Route to appropriate Tool/API/RAG based on intent
        d. Get raw data from tools
        e. LLaMA-3 generates final farmer-friendly explanation
     4. Return structured response
     
+    Blocking - use answer_query_async() from the FastAPI event loop.
+    
     Args:
         query: User's question
         image_path: Optional image path for disease detection
@@ -328,16 +1095,32 @@ def answer_query(query: str, image_path: str = None, user_context: dict = None):
         Standardized response dict with: type, summary, details, advisory, confidence, source, message
     """
     
+    context = user_context or {}
+    
+    cache_key = _answer_cache_key(query, context, image_path)
+    cached = _cached_answer(query, cache_key)
+    if cached:
+        return cached
+    
+    response = _answer_query_chain(query, image_path, context)
+    
+    if cache_key is not None:
+        answer_cache.store(*cache_key, response)
+    
+    return response
+
+
+def _answer_query_chain(query: str, image_path: str, context: dict):
+    """Uncached chain behind answer_query()"""
+    
     print(f"\n{'='*60}")
     print(f"🌾 KRISHIMITRA CHAIN STARTED")
     print(f"{'='*60}")
     print(f"📝 Query: {query}")
     
-    # Initialize context
-    context = user_context or {}
-    
     # =========================================================
     # STEP 0: Check Internet Connectivity - Online vs Offline Mode
+    # (reads the connectivity monitor's circuit breaker, no socket probe)
     # =========================================================
     internet_available = is_online()
     
@@ -345,49 +1128,7 @@ def answer_query(query: str, image_path: str = None, user_context: dict = None):
         print(f"🌐 MODE: ONLINE (Internet available)")
     else:
         print(f"📴 MODE: OFFLINE (No internet connection)")
-        
-        # Use offline retrieval system
-        if OFFLINE_AVAILABLE:
-            # Initialize if not ready
-            if not is_offline_ready():
-                print("   🔄 Initializing offline system...")
-                initialize_offline_system()
-            
-            # Handle conversational queries first
-            conversational_response = handle_conversational(query)
-            if conversational_response:
-                return {
-                    "type": "conversational",
-                    "summary": "Greeting",
-                    "details": {},
-                    "advisory": [],
-                    "confidence": 1.0,
-                    "source": "KrishiMitra (Offline)",
-                    "message": conversational_response,
-                    "entities": {},
-                    "intent": "greeting",
-                    "mode": "offline"
-                }
-            
-            # Get offline answer
-            offline_result = get_offline_answer(query)
-            offline_result["mode"] = "offline"
-            offline_result["entities"] = {}
-            offline_result["intent"] = "offline_qa"
-            return offline_result
-        else:
-            return {
-                "type": "error",
-                "summary": "No internet connection",
-                "details": {"error": "Internet is required for this feature"},
-                "advisory": ["Please check your internet connection", "Connect to WiFi or mobile data"],
-                "confidence": 0.0,
-                "source": "KrishiMitra",
-                "message": "इंटरनेट कनेक्शन नहीं है। कृपया अपना इंटरनेट कनेक्शन जांचें।\n\nNo internet connection. Please check your internet connection.",
-                "entities": {},
-                "intent": "error",
-                "mode": "offline"
-            }
+        return _offline_mode_response(query)
     
     # =========================================================
     # ONLINE MODE - Full RAG + LLM Chain
@@ -400,18 +1141,7 @@ def answer_query(query: str, image_path: str = None, user_context: dict = None):
         conversational_response = handle_conversational(query)
         if conversational_response:
             print(f"   💬 Conversational response")
-            return {
-                "type": "conversational",
-                "summary": "Greeting",
-                "details": {},
-                "advisory": [],
-                "confidence": 1.0,
-                "source": "KrishiMitra",
-                "message": conversational_response,
-                "entities": {},
-                "intent": "greeting",
-                "mode": "online"
-            }
+            return _conversational_result(conversational_response, "online")
     
     # =========================================================
     # STEP 2: LLaMA-3 Intent Classification + Entity Extraction
@@ -419,22 +1149,18 @@ def answer_query(query: str, image_path: str = None, user_context: dict = None):
     print(f"\n🧠 STEP 2: LLaMA-3 analyzing intent and entities...")
     
     try:
-        intent = llm_classify_intent(query)
-        entities = llm_extract_entities(query)
+        plan = llm_plan_query(query)
+        intent = plan.intent
+        entities = plan.entities()
     except (NetworkError, Exception) as e:
         print(f"   ⚠️ LLM failed, switching to offline mode: {e}")
         # Fallback to offline retrieval
         if OFFLINE_AVAILABLE:
-            offline_result = get_offline_answer(query)
-            offline_result["mode"] = "offline_fallback"
-            return offline_result
+            return _offline_fallback(query)
         intent = "general"
         entities = {}
     
-    # Merge with user context (user context takes priority)
-    entities["crop"] = context.get("crop") or entities.get("crop") or extract_crop(query)
-    entities["location"] = context.get("location") or entities.get("location") or extract_location(query)
-    entities["state"] = context.get("state") or entities.get("state") or extract_state(query)
+    entities = _merge_entities(entities, context, query)
     
     print(f"   ➡️ Intent: {intent}")
     print(f"   ➡️ Entities: {entities}")
@@ -444,292 +1170,9 @@ def answer_query(query: str, image_path: str = None, user_context: dict = None):
     # =========================================================
     print(f"\n🔧 STEP 3-4: Routing to appropriate tool/API/RAG...")
     
-    tool_result = None
-    
-    # ---------------------------------------------------------
-    # 🦠 DISEASE DETECTION
-    # ---------------------------------------------------------
-    if intent == "disease":
-        print(f"   ➡️ Disease Detection Tool")
-        
-        if not image_path:
-            tool_result = {
-                "type": "disease",
-                "summary": "कृपया पौधे की तस्वीर अपलोड करें (Please upload plant image)",
-                "details": {"error": "No image provided", "instructions": "Take a clear photo of the affected leaf"},
-                "advisory": [
-                    "प्रभावित पत्ती की साफ फोटो लें",
-                    "अच्छी रोशनी में फोटो खींचें",
-                    "15-20 सेमी दूरी से फोटो लें",
-                    "Please upload a clear photo of the affected plant leaf"
-                ],
-                "confidence": 0.0,
-                "source": "ML Disease Detection Model"
-            }
-        else:
-            crop_type = entities.get("crop", "unknown") or "unknown"
-            tool_result = detect_disease(image_path, crop_type.lower())
-            
-            # Enhance with RAG knowledge
-            if tool_result.get("confidence", 0) > 0.5:
-                disease_name = tool_result.get("details", {}).get("disease", "")
-                if disease_name:
-                    try:
-                        rag_context = retrieve_context(
-                            f"treatment for {disease_name} in {crop_type}",
-                            domain="pest_disease",
-                            k=2
-                        )
-                        if rag_context:
-                            tool_result["rag_knowledge"] = rag_context[:500]
-                    except:
-                        pass
-    
-    # ---------------------------------------------------------
-    # 🌤️ WEATHER QUERY
-    # ---------------------------------------------------------
-    elif intent == "weather":
-        print(f"   ➡️ Weather API")
-        
-        location = entities.get("location", context.get("location", "Delhi"))
-        lat = context.get("lat")
-        lng = context.get("lng")
-        
-        # Use lat/lng for precise weather if available
-        if lat is not None and lng is not None:
-            print(f"   📍 Using coordinates: lat={lat}, lng={lng}")
-            tool_result = get_weather(location=None, lat=lat, lng=lng)
-        else:
-            print(f"   📍 Using location name: {location}")
-            tool_result = get_weather(location=location)
-        
-        # Enhance with RAG weather advisory
-        try:
-            condition = tool_result.get("details", {}).get("condition", "normal")
-            rag_context = retrieve_context(
-                f"farming activities during {condition} weather",
-                domain="weather_advisory",
-                k=2
-            )
-            if rag_context:
-                tool_result["rag_knowledge"] = rag_context[:400]
-        except:
-            pass
-    
-    # ---------------------------------------------------------
-    # 📈 MARKET PRICE FORECAST
-    # ---------------------------------------------------------
-    elif intent == "market_forecast":
-        print(f"   ➡️ Market Forecast API")
-        
-        crop = entities.get("crop", "Potato")
-        state = entities.get("state", "Punjab")
-        tool_result = forecast_price(crop, state)
-        
-        # Enhance with RAG market knowledge
-        try:
-            rag_context = retrieve_context(
-                f"market trends and selling tips for {crop}",
-                domain="market_knowledge",
-                k=2
-            )
-            if rag_context:
-                tool_result["rag_knowledge"] = rag_context[:400]
-        except:
-            pass
-    
-    # ---------------------------------------------------------
-    # 🏪 MANDI PRICE
-    # ---------------------------------------------------------
-    elif intent == "mandi_price":
-        print(f"   ➡️ Mandi Price API")
-        
-        crop = entities.get("crop", "Potato")
-        state = entities.get("state", "Punjab")
-        tool_result = get_mandi_price(crop, state)
-    
-    # ---------------------------------------------------------
-    # 🌱 SOIL / FERTILIZER
-    # ---------------------------------------------------------
-    elif intent == "soil":
-        print(f"   ➡️ Soil Knowledge RAG")
-        
-        try:
-            # Try soil interpretation first
-            rag_context = retrieve_context(query, domain="soil_interpretation", k=3)
-            
-            if not rag_context or len(rag_context.strip()) < 50:
-                rag_context = retrieve_context(query, domain="soil_knowledge", k=3)
-            
-            if rag_context and rag_context.strip():
-                lines = rag_context.split('\n')[:5]
-                advisory = [line.strip() for line in lines if line.strip() and len(line) > 20]
-                
-                tool_result = {
-                    "type": "soil",
-                    "summary": f"मिट्टी और उर्वरक संबंधी जानकारी",
-                    "details": {
-                        "query": query,
-                        "information": rag_context[:600]
-                    },
-                    "advisory": advisory if advisory else [
-                        "मिट्टी की जांच कराएं",
-                        "संतुलित उर्वरक का प्रयोग करें",
-                        "जैविक खाद का उपयोग करें"
-                    ],
-                    "confidence": 0.8,
-                    "source": "Agricultural Knowledge Base (RAG)"
-                }
-            else:
-                raise Exception("No RAG context found")
-        except:
-            tool_result = {
-                "type": "soil",
-                "summary": "Soil and fertilizer guidance",
-                "details": {"query": query},
-                "advisory": [
-                    "Get soil tested at nearest Krishi Vigyan Kendra",
-                    "Apply balanced NPK based on soil test report",
-                    "Add organic manure like FYM or compost",
-                    "Maintain soil pH between 6.0-7.5"
-                ],
-                "confidence": 0.6,
-                "source": "General Agricultural Guidelines"
-            }
-    
-    # ---------------------------------------------------------
-    # 📋 GOVERNMENT SCHEMES
-    # ---------------------------------------------------------
-    elif intent == "scheme":
-        print(f"   ➡️ Government Schemes RAG")
-        
-        try:
-            rag_context = retrieve_context(query, domain="govt_schemes", k=4)
-            
-            if rag_context and rag_context.strip():
-                lines = rag_context.split('\n')
-                advisory = [line.strip() for line in lines if line.strip() and len(line) > 20][:5]
-                
-                tool_result = {
-                    "type": "scheme",
-                    "summary": "सरकारी योजनाओं की जानकारी",
-                    "details": {
-                        "query": query,
-                        "information": rag_context[:800]
-                    },
-                    "advisory": advisory,
-                    "confidence": 0.85,
-                    "source": "Government Schemes Database (RAG)"
-                }
-            else:
-                raise Exception("No schemes found")
-        except:
-            tool_result = {
-                "type": "scheme",
-                "summary": "Government schemes information",
-                "details": {"query": query},
-                "advisory": [
-                    "PM-KISAN: ₹6000 annual direct benefit",
-                    "PMFBY: Crop insurance scheme",
-                    "KCC: Kisan Credit Card for loans",
-                    "Visit https://pmkisan.gov.in for registration",
-                    "Call 1800-180-1551 for helpline"
-                ],
-                "confidence": 0.7,
-                "source": "Government Agricultural Schemes"
-            }
-    
-    # ---------------------------------------------------------
-    # 🌾 CROP ADVICE / GENERAL AGRICULTURE
-    # ---------------------------------------------------------
-    else:
-        print(f"   ➡️ General Agriculture RAG")
-        
-        domains_to_try = [
-            "crop_recommendation",
-            "modern_farming",
-            "organic_farming",
-            "general_agri",
-            "historic_practices"
-        ]
-        
-        rag_context = None
-        used_domain = None
-        
-        for domain_name in domains_to_try:
-            try:
-                rag_context = retrieve_context(query, domain=domain_name, k=3)
-                if rag_context and len(rag_context.strip()) > 50:
-                    used_domain = domain_name
-                    print(f"      ✓ Found in {domain_name}")
-                    break
-            except:
-                continue
-        
-        if rag_context and rag_context.strip():
-            lines = rag_context.split('\n')
-            advisory = []
-            for line in lines:
-                line = line.strip()
-                if line and len(line) > 20:
-                    advisory.append(line[:200])
-                if len(advisory) >= 5:
-                    break
-            
-            tool_result = {
-                "type": "crop_advice",
-                "summary": f"कृषि संबंधी जानकारी",
-                "details": {
-                    "query": query,
-                    "information": rag_context[:700],
-                    "domain": used_domain
-                },
-                "advisory": advisory if advisory else [
-                    "Consult local agricultural extension officer",
-                    "Follow recommended practices for your region"
-                ],
-                "confidence": 0.75,
-                "source": "Agricultural Knowledge Base (RAG)"
-            }
-        else:
-            # Fallback: Use LLM directly with no RAG context
-            print(f"      ⚠️ No RAG context, using LLM directly")
-            
-            try:
-                direct_llm_response = call_llm(f"""As KrishiMitra agricultural assistant, answer this farmer's question:
-
-Question: {query}
-
-Provide practical, helpful advice in simple language. Include:
-1. Direct answer to the question
-2. Step-by-step guidance if applicable
-3. Any precautions or warnings
-4. Suggest contacting Krishi Vigyan Kendra if needed
-
-Keep response under 200 words.""")
-            except (NetworkError, Exception) as e:
-                print(f"      ⚠️ LLM failed, using offline: {e}")
-                if OFFLINE_AVAILABLE:
-                    offline_result = get_offline_answer(query)
-                    offline_result["mode"] = "offline_fallback"
-                    return offline_result
-                direct_llm_response = "कृपया अपना प्रश्न दोबारा पूछें। Please ask your question again."
-            
-            tool_result = {
-                "type": "general",
-                "summary": "कृषि सहायता",
-                "details": {
-                    "query": query
-                },
-                "advisory": [
-                    "Visit nearest Krishi Vigyan Kendra for detailed guidance",
-                    "Call farmer helpline: 1800-180-1551 (toll-free)",
-                    "Use Kisan Suvidha mobile app"
-                ],
-                "confidence": 0.6,
-                "source": "KrishiMitra AI Assistant",
-                "message": direct_llm_response  # Pre-set the message from direct LLM call
-            }
+    final, tool_result = _run_route(_route(intent, entities, context, query, image_path), query)
+    if final is not None:
+        return final
     
     print(f"   ✓ Tool result obtained")
     
@@ -758,46 +1201,147 @@ Keep response under 200 words.""")
                     offline_result["mode"] = "offline_fallback"
                     return offline_result
             
-            # Create a clean fallback response (not raw data)
-            summary = tool_result.get("summary", "")
-            raw_advisory = tool_result.get("advisory", [])
-            
-            # Use clean_advisory_text to filter out raw data
-            advisory = clean_advisory_text(raw_advisory)
-            
-            fallback_parts = []
-            if summary and not any(skip in summary.lower() for skip in ['kg/ha', 'temp [', 'rainfall [']):
-                fallback_parts.append(summary)
-            if advisory:
-                fallback_parts.append("\nसुझाव:")
-                for adv in advisory[:3]:
-                    fallback_parts.append(f"• {adv}")
-            
-            llm_response = "\n".join(fallback_parts) if fallback_parts else """I can help you with your farming question. 
-            
-Please contact your local Krishi Vigyan Kendra or call the farmer helpline 1800-180-1551 for specific guidance."""
+            llm_response = _tool_fallback_message(tool_result)
     
     print(f"   ✓ Response generated")
     
     # =========================================================
     # FINAL: Combine everything into standardized response
     # =========================================================
+    final_response = _final_response(tool_result, llm_response, entities, intent)
     
-    # Clean advisory in final response too
-    clean_final_advisory = clean_advisory_text(tool_result.get("advisory", []))
+    print(f"\n{'='*60}")
+    print(f"✅ CHAIN COMPLETE - Response ready!")
+    print(f"{'='*60}\n")
     
-    final_response = {
-        "type": tool_result.get("type", "general"),
-        "summary": tool_result.get("summary", ""),
-        "details": tool_result.get("details", {}),
-        "advisory": clean_final_advisory,  # Use cleaned advisory
-        "confidence": tool_result.get("confidence", 0.7),
-        "source": tool_result.get("source", "KrishiMitra"),
-        "message": llm_response,  # The farmer-friendly LLM-generated response
-        "entities": entities,  # Include extracted entities for transparency
-        "intent": intent,  # Include detected intent
-        "mode": "online"  # Indicate online mode
-    }
+    return final_response
+
+
+async def _prepare_answer_async(query: str, image_path: str, context: dict):
+    """
+    STEP 0-4 of the async chain (everything before final response generation)
+    
+    Returns:
+        (final, tool_result, entities, intent) - `final` is a complete response
+        when the chain ended early (offline, greeting, LLM failure), else None
+    """
+    
+    print(f"\n{'='*60}")
+    print(f"🌾 KRISHIMITRA CHAIN STARTED (async)")
+    print(f"{'='*60}")
+    print(f"📝 Query: {query}")
+    
+    # STEP 0: Online vs Offline (in-memory breaker state - no network probe)
+    if is_online():
+        print(f"🌐 MODE: ONLINE (Internet available)")
+    else:
+        print(f"📴 MODE: OFFLINE (No internet connection)")
+        return await asyncio.to_thread(_offline_mode_response, query), None, None, None
+    
+    # STEP 1: Conversational queries
+    if OFFLINE_AVAILABLE:
+        conversational_response = handle_conversational(query)
+        if conversational_response:
+            print(f"   💬 Conversational response")
+            return _conversational_result(conversational_response, "online"), None, None, None
+    
+    # STEP 2: Intent + entities (single planning call)
+    print(f"\n🧠 STEP 2: LLaMA-3 analyzing intent and entities...")
+    
+    try:
+        plan = await llm_plan_query_async(query)
+        intent = plan.intent
+        entities = plan.entities()
+    except (NetworkError, Exception) as e:
+        print(f"   ⚠️ LLM failed, switching to offline mode: {e}")
+        if OFFLINE_AVAILABLE:
+            return await asyncio.to_thread(_offline_fallback, query), None, None, None
+        intent = "general"
+        entities = {}
+    
+    entities = _merge_entities(entities, context, query)
+    
+    print(f"   ➡️ Intent: {intent}")
+    print(f"   ➡️ Entities: {entities}")
+    
+    # STEP 3-4: Route to Tools / APIs / RAG
+    print(f"\n🔧 STEP 3-4: Routing to appropriate tool/API/RAG...")
+    
+    final, tool_result = await _run_route_async(_route(intent, entities, context, query, image_path), query)
+    if final is not None:
+        return final, None, None, None
+    
+    print(f"   ✓ Tool result obtained")
+    
+    return None, tool_result, entities, intent
+
+
+async def answer_query_async(query: str, image_path: str = None, user_context: dict = None):
+    """
+    Async version of answer_query() for the FastAPI event loop
+    
+    Same flow and response shape, but nothing blocks the loop:
+    - Groq calls go through the AsyncGroq client
+    - weather / mandi / forecast / disease tools use async HTTP
+    - Chroma search + query embedding run on the retrieval executor
+    - offline FAISS fallback runs in a worker thread
+    
+    Args:
+        query: User's question
+        image_path: Optional image path for disease detection
+        user_context: Optional context (location, crop, etc.)
+    
+    Returns:
+        Standardized response dict with: type, summary, details, advisory, confidence, source, message
+    """
+    
+    context = user_context or {}
+    
+    cache_key = await _answer_cache_key_async(query, context, image_path)
+    cached = _cached_answer(query, cache_key)
+    if cached:
+        return cached
+    
+    response = await _answer_query_async_chain(query, image_path, context)
+    
+    if cache_key is not None:
+        answer_cache.store(*cache_key, response)
+    
+    return response
+
+
+async def _answer_query_async_chain(query: str, image_path: str, context: dict):
+    """Uncached chain behind answer_query_async()"""
+    
+    final, tool_result, entities, intent = await _prepare_answer_async(query, image_path, context)
+    if final is not None:
+        return final
+    
+    # STEP 5: Final response generation
+    print(f"\n💬 STEP 5: LLaMA-3 generating farmer-friendly response...")
+    
+    language = context.get("language", "en")
+    
+    if tool_result.get("message"):
+        llm_response = tool_result.get("message")
+        print(f"   ✓ Using pre-generated response")
+    else:
+        try:
+            llm_response = await llm_generate_response_async(query, tool_result, entities, language)
+        except (NetworkError, Exception) as e:
+            print(f"   ⚠️ LLM response generation failed: {e}")
+            
+            if OFFLINE_AVAILABLE:
+                offline_result = await asyncio.to_thread(get_offline_answer, query)
+                if offline_result.get("confidence", 0) > 0.3:
+                    offline_result["mode"] = "offline_fallback"
+                    return offline_result
+            
+            llm_response = _tool_fallback_message(tool_result)
+    
+    print(f"   ✓ Response generated")
+    
+    final_response = _final_response(tool_result, llm_response, entities, intent)
     
     print(f"\n{'='*60}")
     print(f"✅ CHAIN COMPLETE - Response ready!")
@@ -805,3 +1349,74 @@ Please contact your local Krishi Vigyan Kendra or call the farmer helpline 1800-
     
     return final_response
 
+
+def _stream_meta(response: dict) -> dict:
+    """Structured fields sent before any answer text"""
+    return {key: value for key, value in response.items() if key != "message"}
+
+
+async def answer_query_stream(query: str, image_path: str = None, user_context: dict = None):
+    """
+    Streaming version of answer_query_async()
+    
+    Async generator of (event, data) tuples:
+    - ("meta", dict):  type, summary, details, advisory, confidence, source,
+                       entities, intent, mode - sent as soon as STEP 3-4 finish
+    - ("token", str):  answer text as Groq generates it
+    - ("done", dict):  complete response, same shape as answer_query_async()
+    """
+    
+    context = user_context or {}
+    
+    cache_key = await _answer_cache_key_async(query, context, image_path)
+    final = _cached_answer(query, cache_key)
+    
+    if final is None:
+        final, tool_result, entities, intent = await _prepare_answer_async(query, image_path, context)
+        if final is not None and cache_key is not None:
+            answer_cache.store(*cache_key, final)
+    
+    if final is not None:
+        yield "meta", _stream_meta(final)
+        if final.get("message"):
+            yield "token", final["message"]
+        yield "done", final
+        return
+    
+    # STEP 5: Stream the final response
+    print(f"\n💬 STEP 5: LLaMA-3 streaming farmer-friendly response...")
+    
+    response = _final_response(tool_result, "", entities, intent)
+    yield "meta", _stream_meta(response)
+    
+    if tool_result.get("message"):
+        llm_response = tool_result.get("message")
+        print(f"   ✓ Using pre-generated response")
+        yield "token", llm_response
+    else:
+        language = context.get("language", "en")
+        prompt, summary, advisory = _response_prompt(query, tool_result, entities, language)
+        
+        parts = []
+        try:
+            async for token in stream_llm_async(prompt):
+                parts.append(token)
+                yield "token", token
+        except (NetworkError, Exception) as e:
+            print(f"   ⚠️ LLM streaming failed: {e}")
+            # Nothing sent yet - fall back to a complete answer; otherwise keep the partial one
+            if not parts:
+                fallback = await asyncio.to_thread(_generation_fallback, query, summary, advisory)
+                parts.append(fallback)
+                yield "token", fallback
+        
+        llm_response = "".join(parts).strip()
+    
+    response["message"] = llm_response
+    
+    if cache_key is not None:
+        answer_cache.store(*cache_key, response)
+    
+    print(f"✅ STREAM COMPLETE")
+    
+    yield "done", response
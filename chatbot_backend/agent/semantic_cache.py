@@ -0,0 +1,310 @@
+"""
+Semantic Answer Cache - serves repeat questions without running the chain
+
+Entries are keyed on:
+- the normalized query embedding (MiniLM, cosine similarity >= threshold)
+- a partition of resolved entities (crop / location / state / coordinates)
+  and the response language - only answers for the same partition can match,
+  so "onion price in Nashik" never answers "onion price in Indore"
+
+Entities for the partition come from user context + keyword extraction,
+never from the LLM, so a hit costs one embedding and a dot product. A query
+that names a place neither the gazetteer nor the keyword lists know ("onion
+price in Sitapur") is not cached at all - it has no partition of its own.
+Crops are resolved against every commodity the mandi store has seen plus a
+built-in list, so "aphids in okra" and "aphids in brinjal" never share one.
+
+Expiry is per intent (weather/mandi go stale quickly, schemes/soil don't)
+and memory is bounded with LRU eviction.
+"""
+
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.93"))
+
+# Seconds an answer stays valid, by intent
+INTENT_TTLS = {
+    "weather": 10 * 60,
+    "mandi_price": 15 * 60,
+    "market_forecast": 60 * 60,
+    "disease": 6 * 60 * 60,
+    "crop_advice": 12 * 60 * 60,
+    "general": 12 * 60 * 60,
+    "soil": 24 * 60 * 60,
+    "scheme": 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace (keeps Devanagari etc.)"""
+    # \w alone drops Devanagari vowel signs, so keep that block explicitly
+    text = re.sub(r"[^\w\s\u0900-\u097F]", " ", query.lower())
+    return " ".join(text.split())
+
+
+# "in X" / "near X" / "X में" - X is probably a place
+PLACE_PATTERNS = [
+    re.compile(r"\b(?:in|at|near|around|from)\s+([^\W\d_]+)"),
+    re.compile(r"([^\W\d_]+)\s+(?:में|mein)\b"),
+]
+
+# Words after those markers that are not places
+NON_PLACE_WORDS = {
+    "a", "an", "the", "my", "our", "this", "that", "next", "last", "coming", "future",
+    "india", "hindi", "english", "field", "farm", "fields", "soil", "market", "mandi",
+    "season", "winter", "summer", "monsoon", "rainy", "rabi", "kharif", "zaid",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "days", "week", "weeks", "month",
+    "months", "year", "today", "tomorrow", "kg", "quintal", "rupees", "rs", "hectare", "acre",
+    "sandy", "clay", "loamy", "black", "red", "alluvial", "heavy", "rain", "hot", "cold",
+    "खेत", "मंडी", "बाजार", "मौसम", "हिंदी", "भारत", "क्या", "कितना", "किस",
+}
+
+
+def mentioned_place(query: str) -> Optional[str]:
+    """Word the query introduces as a place ("in Sitapur" -> "sitapur"), or None"""
+    crops = known_crops()
+    for pattern in PLACE_PATTERNS:
+        for match in pattern.finditer(query.lower()):
+            word = match.group(1)
+            if word in NON_PLACE_WORDS or len(word) <= 2:
+                continue
+            # "aphids in okra" names a crop, not a place
+            if word in crops or word.rstrip("s") in crops:
+                continue
+            return word
+    return None
+
+
+# Crop names (English, Hinglish, Hindi) known without the mandi store
+CROP_NAMES = {
+    "potato", "onion", "wheat", "tomato", "rice", "paddy", "maize", "barley", "jowar", "bajra",
+    "ragi", "millet", "sugarcane", "cotton", "jute", "soybean", "groundnut", "mustard", "sunflower",
+    "sesame", "chickpea", "gram", "lentil", "masoor", "tur", "arhar", "moong", "urad", "peas",
+    "cabbage", "cauliflower", "brinjal", "baingan", "okra", "bhindi", "gobhi", "carrot", "radish",
+    "spinach", "palak", "cucumber", "pumpkin", "bottle gourd", "lauki", "bitter gourd", "karela",
+    "capsicum", "chilli", "garlic", "ginger", "turmeric", "coriander", "cumin", "pepper",
+    "apple", "mango", "banana", "grape", "orange", "papaya", "guava", "pomegranate", "watermelon",
+    "lemon", "coconut", "cashew", "tea", "coffee",
+    "आलू", "प्याज", "प्याज़", "गेहूं", "गेहूँ", "टमाटर", "धान", "मक्का", "गन्ना", "कपास", "सरसों",
+    "चना", "मूंग", "उड़द", "अरहर", "मटर", "भिंडी", "बैंगन", "गोभी", "गाजर", "मूली", "पालक",
+    "लौकी", "करेला", "मिर्च", "लहसुन", "अदरक", "हल्दी", "आम", "केला", "सेब",
+}
+
+# Parts of data.gov.in commodity names that are not crops ("Paddy(Dhan)(Common)")
+GENERIC_COMMODITY_WORDS = {"common", "other", "others", "green", "white", "red", "black", "dry",
+                           "local", "big", "small", "fine", "medium", "whole", "raw", "ripe"}
+
+COMMODITY_REFRESH_SECONDS = 60 * 60
+
+_store_commodities = {"names": frozenset(), "loaded_at": None}
+
+
+def _commodity_names(commodity: str) -> set:
+    """'Bhindi(Ladies Finger)' -> {'bhindi', 'ladies finger'}"""
+    names = set()
+    for part in re.split(r"[()/,]", commodity.lower()):
+        name = " ".join(part.split())
+        if len(name) > 2 and name not in GENERIC_COMMODITY_WORDS:
+            names.add(name)
+    return names
+
+
+def known_crops() -> frozenset:
+    """CROP_NAMES plus the mandi store's commodities (re-read at most hourly)"""
+    loaded_at = _store_commodities["loaded_at"]
+    if loaded_at is None or time.monotonic() - loaded_at > COMMODITY_REFRESH_SECONDS:
+        names = set()
+        try:
+            from chatbot_backend.tools import mandi_store
+            for commodity in mandi_store.query_commodities():
+                names |= _commodity_names(commodity)
+        except Exception as e:
+            print(f"   ⚠️ Could not read mandi commodities: {e}")
+        _store_commodities.update(names=frozenset(names), loaded_at=time.monotonic())
+    return CROP_NAMES | _store_commodities["names"]
+
+
+def mentioned_crops(query: str) -> list:
+    """Known crop names in the query (whole words, plain or plural), sorted"""
+    text = f" {normalize_query(query)} "
+    return sorted(
+        name for name in known_crops()
+        if any(f" {name}{suffix} " in text for suffix in ("", "s", "es"))
+    )
+
+
+def cache_partition(query: str, context: dict) -> Optional[tuple]:
+    """
+    Exact-match part of the key: resolved entities + language
+
+    None when the query names a place that cannot be resolved - without
+    the Delhi/Punjab defaults it would share a partition with every other
+    unknown town (and with queries naming no place at all). The crop part
+    is every known crop the query names, not just extract_crop's few.
+    """
+    # Imported here to avoid a circular import with answer.py
+    from chatbot_backend.agent.answer import extract_crop, extract_location, extract_state
+
+    location = extract_location(query, default=None)
+    state = extract_state(query, default=None)
+    if location is None and state is None and mentioned_place(query):
+        return None
+
+    lat, lng = context.get("lat"), context.get("lng")
+    coords = (round(lat, 2), round(lng, 2)) if lat is not None and lng is not None else None
+
+    crops = set(mentioned_crops(query))
+    if extract_crop(query):
+        crops.add(extract_crop(query).lower())
+
+    return (
+        context.get("language") or "en",
+        (context.get("crop") or ",".join(sorted(crops))).lower(),
+        (context.get("location") or location or "").lower(),
+        (context.get("state") or state or "").lower(),
+        coords
+    )
+
+
+def is_cacheable(response: dict) -> bool:
+    """Only complete online answers are cached (never offline/fallback/errors)"""
+    return (
+        isinstance(response, dict)
+        and response.get("mode") == "online"
+        and response.get("type") not in ("error", "conversational")
+        and bool(response.get("message"))
+    )
+
+
+class SemanticCache:
+    """Thread-safe LRU cache of answers matched by embedding similarity"""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # id -> entry (LRU order)
+        self._partitions = {}           # partition -> set of ids
+        self._by_text = {}              # (partition, text) -> id
+        self._next_id = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._partitions.get(entry["partition"])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._partitions[entry["partition"]]
+        self._by_text.pop((entry["partition"], entry["text"]), None)
+
+    def lookup(self, text: str, partition: tuple, embedding) -> Optional[dict]:
+        """
+        Best cached answer for this query, or None
+
+        Args:
+            text: Normalized query
+            partition: cache_partition() of the query
+            embedding: Normalized query embedding
+        """
+        query_vec = np.asarray(embedding, dtype=np.float32)
+        now = time.monotonic()
+
+        with self._lock:
+            ids = list(self._partitions.get(partition, ()))
+            live = []
+            for entry_id in ids:
+                if self._entries[entry_id]["expires_at"] <= now:
+                    self._remove(entry_id)
+                    self._stats["expired"] += 1
+                else:
+                    live.append(entry_id)
+
+            if not live:
+                self._stats["misses"] += 1
+                return None
+
+            matrix = np.stack([self._entries[entry_id]["embedding"] for entry_id in live])
+            scores = matrix @ query_vec
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            entry_id = live[best]
+            self._entries.move_to_end(entry_id)
+            self._stats["hits"] += 1
+            response = copy.deepcopy(self._entries[entry_id]["response"])
+
+        response["cached"] = True
+        response["cache_similarity"] = round(float(scores[best]), 3)
+        return response
+
+    def store(self, text: str, partition: tuple, embedding, response: dict) -> bool:
+        """Cache an answer (ignored unless is_cacheable)"""
+        if not is_cacheable(response):
+            return False
+
+        ttl = INTENT_TTLS.get(response.get("intent"), DEFAULT_TTL)
+        entry = {
+            "text": text,
+            "partition": partition,
+            "embedding": np.asarray(embedding, dtype=np.float32),
+            "response": copy.deepcopy(response),
+            "intent": response.get("intent"),
+            "expires_at": time.monotonic() + ttl
+        }
+
+        with self._lock:
+            existing = self._by_text.get((partition, text))
+            if existing is not None:
+                self._remove(existing)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._partitions.setdefault(partition, set()).add(entry_id)
+            self._by_text[(partition, text)] = entry_id
+            self._stats["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._partitions.clear()
+            self._by_text.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0
+            }
+
+
+# Process-wide cache used by answer_query / answer_query_async / answer_query_stream
+answer_cache = SemanticCache()
@@ -0,0 +1,257 @@
+"""
+In-process Crop Price Forecasting Engine
+
+The prediction pipeline of crop-price-prediction running inside the chatbot
+backend: the price dataset and the trained RandomForest models stay
+resident, so a forecast is a few model calls instead of an HTTP round trip
+to the (often cold-starting) Render service.
+
+    FORECAST_DATA_PATH   Agriculture_price_dataset.csv
+    FORECAST_MODELS_DIR  directory of {crop}_{state}.pkl models
+
+Both default to the crop-price-prediction project next to this package.
+Its utils package is imported as is - one implementation of the pipeline:
+
+- utils.dataset: the price CSV through the shared columnar cache
+- utils.series_index: daily series per (crop, state), O(1) lookups
+- utils.registry: bounded LRU of models, reloaded when a .pkl changes on
+  disk (e.g. after `python -m utils.train`)
+- utils.kernel: ring-buffer multi-day forecasts, batched across series
+
+The dataset is loaded by a background thread at startup. Until it is
+ready, or for a crop/state without a model, calls raise
+ForecastUnavailable and callers fall back to the remote API.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'crop-price-prediction'
+)
+
+# crop-price-prediction imports its modules as the top-level `utils` package
+if PROJECT_DIR not in sys.path:
+    sys.path.append(PROJECT_DIR)
+
+from utils import kernel  # noqa: E402
+from utils.dataset import load_price_data  # noqa: E402
+from utils.predict import summarize_forecast  # noqa: E402
+from utils.registry import ModelRegistry  # noqa: E402
+from utils.series_index import SeriesIndex  # noqa: E402
+
+
+def _default_data_path() -> str:
+    preferred = os.path.join(PROJECT_DIR, 'croppricedata', 'Agriculture_price_dataset.csv')
+    if os.path.exists(preferred):
+        return preferred
+    return os.path.join(PROJECT_DIR, 'data', 'Agriculture_price_dataset.csv')
+
+
+DATA_PATH = os.getenv("FORECAST_DATA_PATH") or _default_data_path()
+MODELS_DIR = os.getenv("FORECAST_MODELS_DIR") or os.path.join(PROJECT_DIR, 'models')
+
+MAX_FORECAST_DAYS = 30
+
+_series = None              # SeriesIndex of the price dataset
+_registry = None            # ModelRegistry over MODELS_DIR
+_registry_lock = threading.Lock()
+_load_lock = threading.Lock()
+_status = {"state": "idle", "rows": 0, "series": 0, "load_seconds": None, "error": None}
+
+
+class ForecastUnavailable(Exception):
+    """The local engine cannot answer (dataset not loaded or no model)"""
+
+
+# ============================================
+# Dataset & models
+# ============================================
+
+def get_registry() -> ModelRegistry:
+    """Model registry of MODELS_DIR (created on first use)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(MODELS_DIR)
+    return _registry
+
+
+def _load_worker():
+    global _series
+
+    with _load_lock:
+        _status.update(state="loading", error=None)
+        start = time.time()
+        try:
+            frame = load_price_data(DATA_PATH)
+            series = SeriesIndex(frame)
+            get_registry()
+        except Exception as e:
+            _status.update(state="failed", error=str(e))
+            print(f"⚠️ Forecast engine: could not load {DATA_PATH}: {e}")
+            return
+
+        _series = series
+        _status.update(
+            state="ready", rows=len(frame), series=len(series),
+            load_seconds=round(time.time() - start, 2)
+        )
+        print(f"📈 Forecast engine ready: {len(frame)} price rows, {len(series)} series in {_status['load_seconds']}s")
+
+
+def start_engine() -> dict:
+    """Load the dataset in the background (models load on first use)"""
+    if _status["state"] in ("loading", "ready"):
+        return {"status": f"already_{_status['state']}"}
+
+    if not os.path.exists(DATA_PATH):
+        _status.update(state="unavailable", error=f"Dataset not found: {DATA_PATH}")
+        return {"status": "unavailable", "reason": "dataset not found"}
+
+    _status["state"] = "loading"
+    threading.Thread(target=_load_worker, daemon=True).start()
+    return {"status": "loading", "data_path": DATA_PATH}
+
+
+def is_ready() -> bool:
+    return _series is not None
+
+
+def get_model(crop: str, state: str):
+    """Fitted model for crop/state from the registry's LRU (reloaded if the file changed)"""
+    try:
+        return get_registry().get(crop, state)
+    except FileNotFoundError as e:
+        raise ForecastUnavailable(str(e))
+
+
+def recent_series(crop: str, state: str) -> Tuple:
+    """
+    (last date, daily prices) for crop/state (O(1) index lookup)
+
+    Raises:
+        ForecastUnavailable: dataset not loaded yet
+        ValueError: no data for crop/state
+    """
+    if _series is None:
+        raise ForecastUnavailable(f"Forecast dataset not loaded ({_status['state']})")
+    first, values = _series.values(crop, state)
+    return (first + pd.Timedelta(days=len(values) - 1)).date(), values
+
+
+# ============================================
+# Forecasting
+# ============================================
+
+def forecast_prices(crop: str, state: str, days: int = 7) -> List[Tuple]:
+    """
+    Recursive multi-day forecast - each prediction is appended to the series
+    and feeds the next day's lag/rolling features
+
+    Returns:
+        List of (date, predicted_price)
+    """
+    model = get_model(crop, state)
+    last_date, values = recent_series(crop, state)
+    return kernel.forecast(model, values, last_date, days)
+
+
+def forecast_batch(pairs: List[Tuple[str, str]], days: int = 7) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Forecast summaries for many (crop, state) series in one lockstep pass
+    (all series scored together each day - see kernel.forecast_batch)
+
+    Returns:
+        (summaries, errors) - errors as {"crop", "state", "error"}
+
+    Raises:
+        ForecastUnavailable: dataset not loaded yet
+    """
+    if _series is None:
+        raise ForecastUnavailable(f"Forecast dataset not loaded ({_status['state']})")
+
+    days = max(1, min(int(days), MAX_FORECAST_DAYS))
+    models, kernels, ready, errors = [], [], [], []
+    for crop, state in pairs:
+        try:
+            model = get_model(crop, state)
+            last_date, values = recent_series(crop, state)
+            kernels.append(kernel.ForecastKernel(values, last_date))
+            models.append(model)
+            ready.append((crop, state))
+        except (ForecastUnavailable, ValueError) as e:
+            errors.append({"crop": crop, "state": state, "error": str(e)})
+
+    forecasts = kernel.forecast_batch(models, kernels, days)
+    summaries = [
+        _summarize(crop, state, days, forecast)
+        for (crop, state), forecast in zip(ready, forecasts)
+    ]
+    return summaries, errors
+
+
+def predict_next_day_price(crop: str, state: str) -> float:
+    """Next day's modal price (₹/quintal) for crop in state"""
+    return forecast_prices(crop, state, 1)[0][1]
+
+
+def forecast_summary(crop: str, state: str, days: int = 7) -> Dict:
+    """
+    Forecast with trend analysis - same payload as the API's /api/forecast
+
+    Raises:
+        ForecastUnavailable: dataset not loaded or no model for crop/state
+        ValueError: no / too little history for crop/state
+    """
+    days = max(1, min(int(days), MAX_FORECAST_DAYS))
+    return _summarize(crop, state, days, forecast_prices(crop, state, days))
+
+
+def _summarize(crop: str, state: str, days: int, forecast: List[Tuple]) -> Dict:
+    return {**summarize_forecast(crop, state, days, forecast), "unit": "₹ per quintal"}
+
+
+# ============================================
+# Catalogue & status
+# ============================================
+
+def available_models() -> List[Tuple[str, str]]:
+    """(crop, state) pairs that have a trained model on disk (as of the registry's last scan)"""
+    return [(entry["crop"], entry["state"]) for entry in get_registry().catalogue()]
+
+
+def available_crops() -> List[str]:
+    return get_registry().crops()
+
+
+def available_states(crop: str = None) -> List[str]:
+    return get_registry().states(crop)
+
+
+def servable_pairs(crop: str = None, state: str = None) -> List[Tuple[str, str]]:
+    """(crop, state) pairs with both a model and indexed price data"""
+    return [
+        (c, s) for c, s in available_models()
+        if (crop is None or c == crop) and (state is None or s == state)
+        and _series is not None and (c, s) in _series
+    ]
+
+
+def get_engine_status() -> dict:
+    registry = get_registry().status()
+    return {
+        **_status,
+        "data_path": DATA_PATH,
+        "models_dir": MODELS_DIR,
+        "models_on_disk": registry["models"],
+        "models_loaded": registry["loaded"],
+        "registry": registry
+    }
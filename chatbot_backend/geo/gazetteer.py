@@ -0,0 +1,237 @@
+"""
+Offline Gazetteer - location resolution without an API hop
+
+Bundled data (data/gazetteer.json): Indian states / UTs, major agricultural
+districts, tehsils and mandis with centroid coordinates and Hindi /
+transliterated aliases.
+
+Two in-memory indexes, built once on first use:
+- names:   normalized alias -> places  (free-text and exact-name lookups)
+- spatial: geohash buckets at several precisions -> places
+
+so that
+    reverse_geocode(lat, lng)   -> state / district of the nearest place
+    geocode("Nasik")            -> (lat, lng)
+    find_in_text(query)         -> place / district / state mentioned in a query
+    nearest_mandis(lat, lng)    -> closest mandis with distances
+all run locally in microseconds.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from functools import lru_cache
+
+from chatbot_backend.geo import geohash
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.json')
+
+# Finest first; each level's cells are searched together with their neighbours
+BUCKET_PRECISIONS = (4, 3, 2)
+
+# Most specific first when one name matches several places
+TYPE_RANK = {"mandi": 0, "tehsil": 1, "district": 2, "state": 3}
+
+# Aliases that are also everyday words (Hindi / Hinglish) - never matched in free text
+TEXT_MATCH_EXCLUDE = {"gaya", "गया", "sagar", "सागर", "anand"}
+
+MAX_NGRAM = 4
+EARTH_RADIUS_KM = 6371.0
+
+_places = None
+_names = {}
+_buckets = {}
+_load_lock = threading.Lock()
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace (keeps Devanagari marks)"""
+    text = re.sub(r"[^\w\s\u0900-\u097F]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _load():
+    """Read the gazetteer and build both indexes (thread-safe, once)"""
+    global _places
+    if _places is not None:
+        return _places
+
+    with _load_lock:
+        if _places is not None:
+            return _places
+
+        with open(GAZETTEER_PATH, 'r', encoding='utf-8') as f:
+            places = json.load(f)["places"]
+
+        names = {}
+        buckets = {precision: {} for precision in BUCKET_PRECISIONS}
+        for place in places:
+            for alias in {place["name"], *place.get("aliases", [])}:
+                names.setdefault(normalize_name(alias), []).append(place)
+            for precision in BUCKET_PRECISIONS:
+                cell = geohash.encode(place["lat"], place["lng"], precision)
+                buckets[precision].setdefault(cell, []).append(place)
+
+        for matches in names.values():
+            matches.sort(key=lambda place: TYPE_RANK.get(place["type"], 9))
+
+        _names.update(names)
+        _buckets.update(buckets)
+        _places = places
+        print(f"🗺️ Gazetteer loaded: {len(places)} places, {len(names)} names")
+    return _places
+
+
+@lru_cache(maxsize=16384)
+def _block(precision: int, cell: str):
+    """
+    Places in a cell + its 8 neighbours, and the radius (km) that block
+    covers for any point inside the cell: one cell side. Cached per cell.
+    """
+    places = []
+    for block_cell in [cell, *geohash.neighbors(cell)]:
+        places.extend(_buckets[precision].get(block_cell, ()))
+
+    min_lat, min_lng, max_lat, max_lng = geohash.bounds(cell)
+    lat_km = (max_lat - min_lat) * 111.0
+    lng_km = (max_lng - min_lng) * 111.0 * math.cos(math.radians((min_lat + max_lat) / 2))
+    return tuple(places), min(lat_km, lng_km)
+
+
+def _nearest(lat: float, lng: float, k: int = 1, types=None) -> list:
+    """
+    k nearest places as (distance_km, place), optionally filtered by type
+
+    Searches the point's cell and its 8 neighbours, finest precision first.
+    A result is only accepted once the k-th distance is within one cell
+    width - closer places cannot hide outside the searched block - otherwise
+    the next coarser precision is tried (and finally every place).
+    """
+    places = _load()
+    for precision in BUCKET_PRECISIONS:
+        candidates, radius_km = _block(precision, geohash.encode(lat, lng, precision))
+        if types:
+            candidates = [place for place in candidates if place["type"] in types]
+        if len(candidates) < k:
+            continue
+        ranked = sorted((haversine_km(lat, lng, p["lat"], p["lng"]), id(p), p) for p in candidates)[:k]
+        if ranked[-1][0] <= radius_km:
+            return [(distance, place) for distance, _, place in ranked]
+
+    candidates = [place for place in places if not types or place["type"] in types]
+    ranked = sorted((haversine_km(lat, lng, p["lat"], p["lng"]), id(p), p) for p in candidates)[:k]
+    return [(distance, place) for distance, _, place in ranked]
+
+
+def _public(place: dict, distance_km: float = None) -> dict:
+    result = {
+        "name": place["name"],
+        "type": place["type"],
+        "state": place["state"],
+        "district": place.get("district"),
+        "lat": place["lat"],
+        "lng": place["lng"]
+    }
+    if distance_km is not None:
+        result["distance_km"] = round(distance_km, 1)
+    return result
+
+
+def reverse_geocode(lat: float, lng: float) -> dict:
+    """
+    State / district for a coordinate, from the nearest district-level place
+
+    Returns:
+        {"state", "district", "location", "nearest": place, "distance_km"} or None
+    """
+    nearest = _nearest(lat, lng, 1, types=("district", "tehsil", "mandi"))
+    if not nearest:
+        return None
+    distance, place = nearest[0]
+    return {
+        "state": place["state"],
+        "district": place.get("district"),
+        "location": place.get("district") or place["name"],
+        "nearest": _public(place),
+        "distance_km": round(distance, 1)
+    }
+
+
+def resolve_name(name: str):
+    """Best place for an exact name / alias (most specific type first), or None"""
+    if not name:
+        return None
+    _load()
+    matches = _names.get(normalize_name(name))
+    return _public(matches[0]) if matches else None
+
+
+def geocode(name: str):
+    """(lat, lng) for a place name, or None"""
+    place = resolve_name(name)
+    return (place["lat"], place["lng"]) if place else None
+
+
+def find_in_text(text: str) -> dict:
+    """
+    Places mentioned in free text (longest alias match wins)
+
+    Returns:
+        {"location", "district", "state", "place"} - values None when absent
+    """
+    result = {"location": None, "district": None, "state": None, "place": None}
+    if not text:
+        return result
+    _load()
+
+    tokens = normalize_name(text).split()
+    found = []
+    i = 0
+    while i < len(tokens):
+        for n in range(min(MAX_NGRAM, len(tokens) - i), 0, -1):
+            phrase = " ".join(tokens[i:i + n])
+            if phrase in TEXT_MATCH_EXCLUDE:
+                continue
+            matches = _names.get(phrase)
+            if matches:
+                found.append(matches[0])
+                i += n
+                break
+        else:
+            i += 1
+
+    if not found:
+        return result
+
+    states = [place for place in found if place["type"] == "state"]
+    specific = [place for place in found if place["type"] != "state"]
+    best = min(specific, key=lambda place: TYPE_RANK[place["type"]]) if specific else states[0]
+
+    result["place"] = _public(best)
+    result["location"] = best["name"]
+    if best["type"] != "state":
+        result["district"] = best.get("district")
+    result["state"] = states[0]["name"] if states else best["state"]
+    return result
+
+
+def nearest_mandis(lat: float, lng: float, k: int = 5, max_km: float = None) -> list:
+    """Closest mandis to a point, nearest first, with distance_km"""
+    mandis = _nearest(lat, lng, k, types=("mandi",))
+    return [_public(place, distance) for distance, place in mandis if max_km is None or distance <= max_km]
+
+
+def get_gazetteer_stats() -> dict:
+    places = _load()
+    counts = {}
+    for place in places:
+        counts[place["type"]] = counts.get(place["type"], 0) + 1
+    return {"places": len(places), "names": len(_names), "by_type": counts}
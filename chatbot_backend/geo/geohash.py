@@ -0,0 +1,83 @@
+"""
+Geohash encoding - short base32 cell ids for lat/lng
+
+Nearby points share a prefix, so a geohash is a stable cache key for "the
+same place": at precision 5 a cell is ~4.9 km x 4.9 km, at 6 ~1.2 x 0.6 km.
+"""
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: i for i, char in enumerate(_BASE32)}
+
+
+def encode(lat: float, lng: float, precision: int = 5) -> str:
+    """Geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # even bits refine longitude, odd bits latitude
+
+    while len(chars) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def bounds(cell: str):
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in cell:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if (value >> shift) & 1:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def decode(cell: str):
+    """(lat, lng) of the cell centre"""
+    min_lat, min_lng, max_lat, max_lng = bounds(cell)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def neighbors(cell: str) -> list:
+    """The 8 cells surrounding a cell (same precision)"""
+    min_lat, min_lng, max_lat, max_lng = bounds(cell)
+    lat_step, lng_step = max_lat - min_lat, max_lng - min_lng
+    lat, lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+    cells = []
+    for dlat in (-lat_step, 0, lat_step):
+        for dlng in (-lng_step, 0, lng_step):
+            if dlat == 0 and dlng == 0:
+                continue
+            neighbor_lat = lat + dlat
+            if not -90 <= neighbor_lat <= 90:
+                continue
+            neighbor_lng = (lng + dlng + 180) % 360 - 180
+            cells.append(encode(neighbor_lat, neighbor_lng, len(cell)))
+    return cells
@@ -1,7 +1,8 @@
 import os
-import socket
+import httpx
 from pathlib import Path
-from groq import Groq
+from groq import Groq, AsyncGroq, APIConnectionError, APIStatusError
+from chatbot_backend.llm.connectivity import breaker, probe_connection, is_online
 
 # Load environment variables from .env file in project root
 try:
@@ -20,7 +21,14 @@ if not api_key:
         "Get your key from: https://console.groq.com/keys"
     )
 
-client = Groq(api_key=api_key)
+# Short connect timeout: an unreachable API should trip the circuit breaker
+# quickly instead of hanging the request
+_timeout = httpx.Timeout(60.0, connect=3.0)
+
+client = Groq(api_key=api_key, timeout=_timeout)
+
+# Async client for the event-loop based chat pipeline (answer_query_async)
+async_client = AsyncGroq(api_key=api_key, timeout=_timeout)
 
 MODEL_NAME = "llama-3.1-8b-instant"
 
@@ -30,23 +38,15 @@ MODEL_NAME = "llama-3.1-8b-instant"
 
 def check_internet_connection(timeout: float = 2.0) -> bool:
     """
-    Check if internet connection is available
-    Tests connection to Groq API server
+    Actively probe the Groq API server (opens a TCP connection)
+    
+    The chain uses is_online() instead, which reads the in-memory state kept
+    by the connectivity monitor - this is only for explicit checks.
     
     Returns:
         True if internet is available, False otherwise
     """
-    try:
-        # Try to connect to Groq API server
-        socket.create_connection(("api.groq.com", 443), timeout=timeout)
-        return True
-    except (socket.timeout, socket.error, OSError):
-        return False
-
-
-def is_online() -> bool:
-    """Check if we can reach the LLM API"""
-    return check_internet_connection()
+    return probe_connection(timeout)
 
 
 class NetworkError(Exception):
@@ -54,20 +54,7 @@ class NetworkError(Exception):
     pass
 
 
-def call_llm(prompt: str) -> str:
-    """
-    Calls LLaMA-3 via Groq API
-    Used ONLY for planning and explanation
-    
-    Raises:
-        NetworkError: If internet connection is not available
-    """
-    
-    # Check internet first
-    if not check_internet_connection():
-        raise NetworkError("No internet connection - LLM API unreachable")
-
-    SYSTEM_PROMPT = """You are KrishiMitra, an expert agricultural AI assistant helping Indian farmers.
+SYSTEM_PROMPT = """You are KrishiMitra, an expert agricultural AI assistant helping Indian farmers.
 
 Your capabilities:
 - Weather forecasting and farming advisories
@@ -99,25 +86,141 @@ Important:
 - Encourage soil testing and balanced fertilizer use
 - Promote organic and sustainable farming practices when appropriate"""
 
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[
-            {
-                "role": "system",
-                "content": SYSTEM_PROMPT
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0.2,
-        max_tokens=800
-    )
 
+def _build_messages(prompt: str) -> list:
+    """Chat messages sent to Groq for a single prompt"""
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def _completion_kwargs(prompt: str, json_mode: bool, max_tokens: int) -> dict:
+    kwargs = {
+        "model": MODEL_NAME,
+        "messages": _build_messages(prompt),
+        "temperature": 0.2,
+        "max_tokens": max_tokens
+    }
+    if json_mode:
+        # Groq JSON mode - the model is constrained to emit a single JSON object
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+
+def _is_connectivity_failure(error: Exception) -> bool:
+    """Connection errors/timeouts and 5xx mean the API is unreachable; 4xx means it answered"""
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def call_llm(prompt: str, json_mode: bool = False, max_tokens: int = 800) -> str:
+    """
+    Calls LLaMA-3 via Groq API
+    Used ONLY for planning and explanation
+    
+    Args:
+        prompt: User prompt (the KrishiMitra system prompt is always prepended)
+        json_mode: Ask Groq for a JSON object response (prompt must mention JSON)
+        max_tokens: Completion token budget
+    
+    Raises:
+        NetworkError: If the LLM API is unreachable (circuit open or connection failed)
+    """
+    
+    # Fail fast while the circuit is open - no socket probe per call
+    if not breaker.allow_request():
+        raise NetworkError("No internet connection - LLM API unreachable")
+
+    try:
+        response = client.chat.completions.create(**_completion_kwargs(prompt, json_mode, max_tokens))
+    except Exception as e:
+        if _is_connectivity_failure(e):
+            breaker.record_failure(str(e))
+            raise NetworkError(f"LLM API unreachable: {e}") from e
+        breaker.record_success()
+        raise
+
+    breaker.record_success()
+    return response.choices[0].message.content.strip()
+
+
+async def call_llm_async(prompt: str, json_mode: bool = False, max_tokens: int = 800) -> str:
+    """
+    Async version of call_llm() using the AsyncGroq client
+    Does not block the event loop while waiting on Groq
+    
+    Raises:
+        NetworkError: If the LLM API is unreachable (circuit open or connection failed)
+    """
+    
+    if not breaker.allow_request():
+        raise NetworkError("No internet connection - LLM API unreachable")
+    
+    try:
+        response = await async_client.chat.completions.create(**_completion_kwargs(prompt, json_mode, max_tokens))
+    except Exception as e:
+        if _is_connectivity_failure(e):
+            breaker.record_failure(str(e))
+            raise NetworkError(f"LLM API unreachable: {e}") from e
+        breaker.record_success()
+        raise
+    
+    breaker.record_success()
     return response.choices[0].message.content.strip()
 
 
+async def stream_llm_async(prompt: str, max_tokens: int = 800):
+    """
+    Stream a completion from Groq as it is generated
+    
+    Async generator yielding text deltas (tokens) in order
+    
+    Raises:
+        NetworkError: If the LLM API is unreachable (circuit open or connection failed)
+    """
+    
+    if not breaker.allow_request():
+        raise NetworkError("No internet connection - LLM API unreachable")
+    
+    try:
+        stream = await async_client.chat.completions.create(
+            **_completion_kwargs(prompt, False, max_tokens),
+            stream=True
+        )
+    except Exception as e:
+        if _is_connectivity_failure(e):
+            breaker.record_failure(str(e))
+            raise NetworkError(f"LLM API unreachable: {e}") from e
+        breaker.record_success()
+        raise
+    
+    breaker.record_success()
+    
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    except Exception as e:
+        if _is_connectivity_failure(e):
+            breaker.record_failure(str(e))
+            raise NetworkError(f"LLM stream interrupted: {e}") from e
+        raise
+    finally:
+        # Release the HTTP connection even if the client went away mid-stream
+        await stream.close()
+
+
 def enhance_response_with_llm(query: str, tool_data: dict) -> str:
     """
     Use LLM to create farmer-friendly explanation from tool/API/RAG results
@@ -152,18 +255,8 @@ Keep response concise (max 200 words) and practical."""
     return call_llm(prompt)
 
 
-def extract_entities_with_llm(query: str) -> dict:
-    """
-    Use LLM to extract structured information from natural language query
-    
-    Args:
-        query: User's natural language query
-    
-    Returns:
-        dict with extracted entities like crop, location, state, disease, etc.
-    """
-    
-    prompt = f"""Extract agricultural entities from this query: "{query}"
+def _entity_prompt(query: str) -> str:
+    return f"""Extract agricultural entities from this query: "{query}"
 
 Return ONLY a Python dictionary (no explanation) with these keys:
 - crop: crop name if mentioned (e.g., wheat, rice, potato) or None
@@ -178,8 +271,8 @@ Example: {{"crop": "wheat", "location": "Delhi", "state": "Delhi", "district": N
 Query: "{query}"
 Dictionary:"""
 
-    response = call_llm(prompt)
-    
+
+def _parse_entities(response: str) -> dict:
     try:
         # Try to parse as dict
         import ast
@@ -187,3 +280,17 @@ Dictionary:"""
     except:
         # Fallback to empty dict
         return {}
+
+
+def extract_entities_with_llm(query: str) -> dict:
+    """
+    Use LLM to extract structured information from natural language query
+    
+    Args:
+        query: User's natural language query
+    
+    Returns:
+        dict with extracted entities like crop, location, state, disease, etc.
+    """
+    
+    return _parse_entities(call_llm(_entity_prompt(query)))
@@ -0,0 +1,186 @@
+"""
+Connectivity Monitor - in-memory online/offline state for the Groq LLM API
+
+Instead of opening a TCP connection to api.groq.com before every LLM call,
+the chain reads a circuit breaker that is fed by:
+- real request outcomes (call_llm / call_llm_async report success/failure)
+- a background probe thread (faster probing while the circuit is open)
+
+Breaker states:
+- closed:    requests flow normally
+- open:      LLM considered unreachable - callers fail over to offline instantly
+- half_open: cooldown elapsed, a single trial request is let through
+"""
+
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+PROBE_HOST = "api.groq.com"
+PROBE_PORT = 443
+PROBE_TIMEOUT = 2.0
+
+# Probe every 30s while healthy, every 5s while open (fast recovery)
+PROBE_INTERVAL = int(os.getenv("CONNECTIVITY_PROBE_INTERVAL", "30"))
+PROBE_INTERVAL_OPEN = int(os.getenv("CONNECTIVITY_PROBE_INTERVAL_OPEN", "5"))
+
+# Consecutive failures before opening, seconds before a half-open trial
+FAILURE_THRESHOLD = int(os.getenv("CONNECTIVITY_FAILURE_THRESHOLD", "2"))
+RESET_TIMEOUT = int(os.getenv("CONNECTIVITY_RESET_TIMEOUT", "15"))
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._last_change = datetime.now()
+        self._last_error = None
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            print(f"🔌 Connectivity: {self._state} → {state}")
+            self._state = state
+            self._last_change = datetime.now()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_available(self) -> bool:
+        """Non-consuming check - True unless open and still cooling down"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return True
+            return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """Gate a real request - in half-open only one trial is let through"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._last_error = None
+            self._set_state(self.CLOSED)
+
+    def record_failure(self, error: str = None):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            self._last_error = error
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "last_change": self._last_change.isoformat(),
+                "last_error": self._last_error
+            }
+
+
+# Process-wide breaker for the Groq API
+breaker = CircuitBreaker()
+
+_monitor_running = False
+_monitor_thread = None
+_last_probe = None
+
+
+def probe_connection(timeout: float = PROBE_TIMEOUT) -> bool:
+    """Open (and close) a TCP connection to the Groq API server"""
+    try:
+        with socket.create_connection((PROBE_HOST, PROBE_PORT), timeout=timeout):
+            return True
+    except (socket.timeout, socket.error, OSError):
+        return False
+
+
+def run_probe() -> bool:
+    """Probe once and feed the result into the breaker"""
+    global _last_probe
+    ok = probe_connection()
+    _last_probe = datetime.now()
+    if ok:
+        breaker.record_success()
+    else:
+        breaker.record_failure("probe failed")
+    return ok
+
+
+def _monitor_worker():
+    """Background worker that keeps the breaker fresh without any traffic"""
+    print("🔄 Connectivity monitor started")
+    while _monitor_running:
+        run_probe()
+        interval = PROBE_INTERVAL_OPEN if breaker.state != CircuitBreaker.CLOSED else PROBE_INTERVAL
+        # Sleep in small steps to allow graceful shutdown
+        for _ in range(interval):
+            if not _monitor_running:
+                break
+            time.sleep(1)
+    print("🛑 Connectivity monitor stopped")
+
+
+def start_connectivity_monitor() -> dict:
+    """Start the background probe thread"""
+    global _monitor_running, _monitor_thread
+
+    if _monitor_running:
+        return {"status": "already_running"}
+
+    _monitor_running = True
+    _monitor_thread = threading.Thread(target=_monitor_worker, daemon=True)
+    _monitor_thread.start()
+
+    return {"status": "started", "interval": PROBE_INTERVAL}
+
+
+def stop_connectivity_monitor() -> dict:
+    """Stop the background probe thread"""
+    global _monitor_running
+    _monitor_running = False
+    return {"status": "stopped"}
+
+
+def is_online() -> bool:
+    """In-memory online state - never touches the network"""
+    return breaker.is_available()
+
+
+def get_connectivity_status() -> dict:
+    """Breaker + monitor state for /health and /v1/connectivity"""
+    return {
+        "online": is_online(),
+        **breaker.snapshot(),
+        "monitor_running": _monitor_running,
+        "last_probe": _last_probe.isoformat() if _last_probe else None
+    }
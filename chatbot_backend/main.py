@@ -3,9 +3,10 @@ Agricultural AI ChatBot - Main Backend Server
 FastAPI server that wraps chatbot_backend and provides REST API endpoints
 """
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from pydantic import BaseModel
 from pathlib import Path
 import os
@@ -14,8 +15,10 @@ from typing import Optional
 import json
 import threading
 import time
-import requests
+import asyncio
+import httpx
 from datetime import datetime
+from chatbot_backend.net import http_client
 
 # ============================================
 # Keep-Alive Service for Render Free Tier
@@ -35,19 +38,30 @@ _keep_alive_running = False
 _keep_alive_thread = None
 
 
+def _forecast_remote_needed() -> bool:
+    """The Render forecast API only needs warming while it is the fallback in use"""
+    from chatbot_backend.forecast import engine
+    from chatbot_backend.tools.market_forecast import REMOTE_FALLBACK
+    return REMOTE_FALLBACK and not (engine.is_ready() and engine.available_models())
+
+
 def ping_render_services():
     """Ping all Render services to keep them alive"""
     results = {}
     for service_name, url in RENDER_SERVICES.items():
+        if service_name == "price_prediction" and not _forecast_remote_needed():
+            results[service_name] = {"status": "skipped", "reason": "served in-process", "url": url}
+            continue
         try:
-            response = requests.get(url, timeout=30)
+            # No retries - the next ping is only minutes away
+            response = http_client.get(url, timeout=30, retries=0)
             results[service_name] = {
                 "status": "alive",
                 "code": response.status_code,
                 "url": url
             }
             print(f"   ✓ {service_name}: alive (HTTP {response.status_code})")
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             results[service_name] = {
                 "status": "error",
                 "error": str(e),
@@ -105,6 +119,8 @@ def stop_keep_alive():
 
 # Lazy imports - these will be loaded on first use
 answer_query = None
+answer_query_async = None
+answer_query_stream = None
 route_domain = None
 get_weather = None
 detect_disease = None
@@ -113,11 +129,13 @@ get_mandi_price = None
 
 def _lazy_import():
     """Lazy import heavy modules to speed up startup"""
-    global answer_query, route_domain, get_weather, detect_disease, forecast_price, get_mandi_price
+    global answer_query, answer_query_async, answer_query_stream, route_domain, get_weather, detect_disease, forecast_price, get_mandi_price
     if answer_query is None:
-        from chatbot_backend.agent.answer import answer_query as aq
+        from chatbot_backend.agent.answer import answer_query as aq, answer_query_async as aqa, answer_query_stream as aqs
         from chatbot_backend.agent.router import route_domain as rd
         answer_query = aq
+        answer_query_async = aqa
+        answer_query_stream = aqs
         route_domain = rd
     if get_weather is None:
         from chatbot_backend.tools.weather import get_weather as gw
@@ -133,9 +151,9 @@ def _lazy_import():
         get_mandi_price = gmp
 
 # Import lightweight disease detection directly for fast startup
-from chatbot_backend.tools.disease import detect_disease as _detect_disease
-from chatbot_backend.tools.weather import get_weather as _get_weather
-from chatbot_backend.tools.mandi_price import get_mandi_price as _get_mandi_price, get_all_commodity_prices as _get_all_prices
+from chatbot_backend.tools.disease import detect_disease as _detect_disease, detect_disease_async as _detect_disease_async
+from chatbot_backend.tools.weather import get_weather as _get_weather, get_weather_async as _get_weather_async
+from chatbot_backend.tools.mandi_price import get_mandi_price as _get_mandi_price, get_mandi_price_async as _get_mandi_price_async, get_all_commodity_prices as _get_all_prices
 from chatbot_backend.tools.market_forecast import forecast_price as _forecast_price
 
 app = FastAPI(title="Agricultural AI ChatBot API", version="1.0.0")
@@ -169,6 +187,28 @@ async def startup_event():
     result = start_keep_alive()
     print(f"✓ Keep-alive service: {result['status']}")
     
+    # Start connectivity monitor (feeds the LLM circuit breaker)
+    from chatbot_backend.llm.connectivity import start_connectivity_monitor
+    result = start_connectivity_monitor()
+    print(f"✓ Connectivity monitor: {result['status']}")
+    
+    # Start mandi store ingestion (full daily data.gov.in download)
+    if os.getenv("MANDI_INGEST_ENABLED", "1") != "0":
+        from chatbot_backend.tools.mandi_store import start_ingest_scheduler
+        result = start_ingest_scheduler()
+        print(f"✓ Mandi ingest scheduler: {result['status']}")
+    
+    # Load the in-process price forecasting engine (dataset + models)
+    if os.getenv("FORECAST_ENGINE_ENABLED", "1") != "0":
+        from chatbot_backend.forecast.engine import start_engine
+        result = start_engine()
+        print(f"✓ Forecast engine: {result['status']}")
+    
+    # Start weather pre-warmer (keeps the most requested places cached)
+    from chatbot_backend.tools.weather import start_weather_prewarmer
+    result = start_weather_prewarmer()
+    print(f"✓ Weather pre-warmer: {result['status']}")
+    
     # Pre-initialize offline system for faster fallback
     try:
         from chatbot_backend.tools.offline_retrieval import initialize_offline_system, is_offline_ready
@@ -191,6 +231,14 @@ async def startup_event():
 async def shutdown_event():
     """Stop keep-alive service when server shuts down"""
     stop_keep_alive()
+    from chatbot_backend.llm.connectivity import stop_connectivity_monitor
+    stop_connectivity_monitor()
+    from chatbot_backend.tools.mandi_store import stop_ingest_scheduler
+    stop_ingest_scheduler()
+    from chatbot_backend.tools.weather import stop_weather_prewarmer
+    stop_weather_prewarmer()
+    await http_client.close_async_clients()
+    http_client.close_sync_clients()
     print("🛑 Server shutting down, keep-alive stopped")
 
 
@@ -222,6 +270,57 @@ class ChatResponse(BaseModel):
 # Main Chatbot Endpoint
 # ============================================
 
+NO_QUERY_RESPONSE = {
+    "type": "error",
+    "summary": "No query provided",
+    "details": {},
+    "advisory": ["Please provide a question"],
+    "confidence": 0,
+    "source": "System",
+    "response": "Please provide a question to get help."
+}
+
+
+def _chat_context(request: ChatRequest) -> dict:
+    """User context passed to the chain"""
+    return {
+        "state": request.state,
+        "crop": request.crop,
+        "location": request.location,
+        "language": request.language,
+        "lat": request.lat,
+        "lng": request.lng
+    }
+
+
+def _frontend_response(result: dict) -> dict:
+    """
+    Set the 'response' field for frontend compatibility
+    Frontend expects data.response, not data.message
+    """
+    llm_response = result.get("message", "")
+    
+    # If LLM didn't generate a good response, use the details information
+    if not llm_response or len(llm_response) < 50:
+        # Build response from available data
+        info = result.get("details", {}).get("information", "")
+        advisory = result.get("advisory", [])
+        
+        if info:
+            llm_response = info[:800]
+            if advisory:
+                llm_response += "\n\n📋 Suggestions:\n" + "\n".join([f"• {a[:150]}" for a in advisory[:3]])
+        elif advisory:
+            llm_response = "\n".join([f"• {a}" for a in advisory])
+        else:
+            llm_response = result.get("summary", "I'm here to help with your agricultural queries.")
+    
+    result["response"] = llm_response
+    result["message"] = llm_response  # Keep for backward compatibility
+    
+    return result
+
+
 @app.post("/v1/chatbot")
 async def chatbot(request: ChatRequest):
     """
@@ -236,61 +335,102 @@ async def chatbot(request: ChatRequest):
         user_query = request.message or request.query
         
         if not user_query:
-            return {
-                "type": "error",
-                "summary": "No query provided",
-                "details": {},
-                "advisory": ["Please provide a question"],
-                "confidence": 0,
-                "source": "System",
-                "response": "Please provide a question to get help."
-            }
-        
-        # Prepare context
-        user_context = {
-            "state": request.state,
-            "crop": request.crop,
-            "location": request.location,
-            "language": request.language,
-            "lat": request.lat,
-            "lng": request.lng
-        }
+            return dict(NO_QUERY_RESPONSE)
         
-        # Get response from our chatbot backend
-        result = answer_query(
+        # Get response from our chatbot backend (async - never blocks the event loop)
+        result = await answer_query_async(
             query=user_query,
             image_path=None,
-            user_context=user_context
+            user_context=_chat_context(request)
         )
         
-        # IMPORTANT: Set 'response' field for frontend compatibility
-        # Frontend expects data.response, not data.message
-        llm_response = result.get("message", "")
-        
-        # If LLM didn't generate a good response, use the details information
-        if not llm_response or len(llm_response) < 50:
-            # Build response from available data
-            info = result.get("details", {}).get("information", "")
-            advisory = result.get("advisory", [])
-            
-            if info:
-                llm_response = info[:800]
-                if advisory:
-                    llm_response += "\n\n📋 Suggestions:\n" + "\n".join([f"• {a[:150]}" for a in advisory[:3]])
-            elif advisory:
-                llm_response = "\n".join([f"• {a}" for a in advisory])
-            else:
-                llm_response = result.get("summary", "I'm here to help with your agricultural queries.")
-        
-        result["response"] = llm_response
-        result["message"] = llm_response  # Keep for backward compatibility
-        
-        return result
+        return _frontend_response(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _chat_events(request: ChatRequest):
+    """
+    (event, data) stream for one chat request:
+    meta (structured fields) -> token* (answer text) -> done (full response)
+    """
+    _lazy_import()
+    
+    user_query = request.message or request.query
+    if not user_query:
+        yield "done", dict(NO_QUERY_RESPONSE)
+        return
+    
+    try:
+        async for event, data in answer_query_stream(
+            query=user_query,
+            image_path=None,
+            user_context=_chat_context(request)
+        ):
+            if event == "done":
+                data = _frontend_response(data)
+            yield event, data
+    except Exception as e:
+        print(f"❌ Chat stream error: {e}")
+        yield "error", {"detail": str(e)}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/v1/chatbot/stream")
+async def chatbot_stream(request: ChatRequest):
+    """
+    Streaming chatbot endpoint (Server-Sent Events)
+    
+    Events:
+    - meta:  type, summary, details, advisory, confidence, source, entities, intent, mode
+    - token: {"text": ...} answer text as it is generated
+    - done:  complete response (same shape as /v1/chatbot)
+    - error: {"detail": ...}
+    """
+    async def event_stream():
+        async for event, data in _chat_events(request):
+            if event == "token":
+                data = {"text": data}
+            yield _sse(event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx/Render)
+        }
+    )
+
+
+@app.websocket("/v1/chatbot/ws")
+async def chatbot_ws(websocket: WebSocket):
+    """
+    Streaming chatbot over WebSocket
+    
+    Client sends ChatRequest JSON messages; for each one the server sends
+    {"event": "meta" | "token" | "done" | "error", "data": ...} frames
+    """
+    await websocket.accept()
+    try:
+        while True:
+            payload = await websocket.receive_json()
+            try:
+                request = ChatRequest(**payload)
+            except (ValidationError, TypeError) as e:
+                await websocket.send_text(json.dumps({"event": "error", "data": {"detail": str(e)}}))
+                continue
+            
+            async for event, data in _chat_events(request):
+                await websocket.send_text(json.dumps({"event": event, "data": data}, ensure_ascii=False, default=str))
+    except WebSocketDisconnect:
+        pass
+
+
 # ============================================
 # Disease Detection Endpoint
 # ============================================
@@ -312,7 +452,7 @@ async def disease_detect(
             shutil.copyfileobj(file.file, buffer)
         
         # Detect disease using direct import
-        result = _detect_disease(
+        result = await _detect_disease_async(
             image_path=str(file_path),
             crop_type=crop.lower() if crop else "unknown"
         )
@@ -355,11 +495,11 @@ async def weather(
     try:
         # Use lat/lng for precise weather, fallback to state/location name
         if lat is not None and lng is not None:
-            result = _get_weather(location=None, lat=lat, lng=lng, language=lang)
+            result = await _get_weather_async(location=None, lat=lat, lng=lng, language=lang)
         elif location:
-            result = _get_weather(location=location, language=lang)
+            result = await _get_weather_async(location=location, language=lang)
         elif state:
-            result = _get_weather(location=state, language=lang)
+            result = await _get_weather_async(location=state, language=lang)
         else:
             return {
                 "type": "weather",
@@ -419,7 +559,6 @@ def generate_crop_advisory(crop: str, temp: float, humidity: float) -> list:
 # Text-to-Speech (TTS) Proxy Endpoint
 # ============================================
 
-from fastapi.responses import StreamingResponse
 import urllib.parse
 
 @app.get("/v1/tts")
@@ -448,7 +587,7 @@ async def text_to_speech(text: str, lang: str = "hi"):
             "Referer": "https://translate.google.com/"
         }
         
-        response = requests.get(tts_url, headers=headers, timeout=10)
+        response = await http_client.aget(tts_url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             raise HTTPException(status_code=502, detail="TTS service unavailable")
@@ -463,9 +602,11 @@ async def text_to_speech(text: str, lang: str = "hi"):
             }
         )
         
-    except requests.exceptions.Timeout:
+    except HTTPException:
+        raise
+    except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="TTS service timeout")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"TTS service error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -490,7 +631,7 @@ async def market_prices(
                 "available_crops": "Onion, Potato, Tomato, Wheat, Rice, Maize, Soybean, Cotton, Mustard, Chilli, Garlic, Ginger"
             }
         
-        result = _get_mandi_price(
+        result = await _get_mandi_price_async(
             crop=crop,
             state=state,
             district=district
@@ -502,26 +643,118 @@ async def market_prices(
 
 
 @app.get("/v1/mandi/all-prices")
-async def get_all_mandi_prices(state: Optional[str] = None):
+async def get_all_mandi_prices(state: Optional[str] = None, by_state: bool = False):
     """
     Get real-time mandi prices for ALL commodities
     
     Query params:
         state: Filter by state (optional)
+        by_state: Include per-state aggregates for each commodity (optional)
     
     Returns:
         Prices for all available commodities from data.gov.in
     """
     try:
-        result = _get_all_prices(state=state)
+        # SQLite / HTTP work - keep it off the event loop
+        result = await asyncio.to_thread(_get_all_prices, state=state, by_state=by_state)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/v1/mandi/store/status")
+async def mandi_store_status():
+    """Local mandi store contents and last ingest run"""
+    from chatbot_backend.tools.mandi_store import get_store_status
+    from chatbot_backend.tools.mandi_timeseries import get_timeseries_status
+    status = await asyncio.to_thread(get_store_status)
+    status["timeseries"] = await asyncio.to_thread(get_timeseries_status)
+    return {"ok": True, **status}
+
+
+@app.get("/v1/mandi/history")
+async def mandi_price_history(
+    commodity: str,
+    state: Optional[str] = None,
+    market: Optional[str] = None,
+    freq: str = "daily",
+    days: int = 365
+):
+    """
+    Recorded price history and trend indicators for a commodity
+    
+    Query params:
+        commodity: Commodity name (e.g., Onion)
+        state / market: Optional filters
+        freq: daily, weekly or monthly
+        days: How far back to go (max 3650)
+    """
+    from chatbot_backend.tools import mandi_timeseries
+    
+    if freq not in ("daily", "weekly", "monthly"):
+        raise HTTPException(status_code=400, detail="freq must be daily, weekly or monthly")
+    
+    days = max(1, min(days, 3650))
+    series = await asyncio.to_thread(mandi_timeseries.get_series, commodity, state, market, freq, days)
+    trend = await asyncio.to_thread(mandi_timeseries.get_trend, commodity, state, market)
+    return {
+        "ok": True,
+        "commodity": commodity,
+        "state": state,
+        "market": market,
+        "freq": freq,
+        "points": len(series),
+        "series": series,
+        "trend": trend
+    }
+
+
+@app.post("/v1/mandi/store/ingest")
+async def mandi_store_ingest():
+    """Trigger a full data.gov.in download now (runs in the background)"""
+    from chatbot_backend.tools.mandi_store import trigger_ingest
+    return {"ok": True, **trigger_ingest()}
+
+
+@app.get("/v1/geo/reverse")
+async def geo_reverse(lat: float, lng: float):
+    """Resolve coordinates to state / district with the offline gazetteer"""
+    from chatbot_backend.geo.gazetteer import reverse_geocode
+    result = reverse_geocode(lat, lng)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No place found")
+    return {"ok": True, **result}
+
+
+@app.get("/v1/geo/search")
+async def geo_search(q: str):
+    """Resolve a place name (English, Hindi or alternate spelling) to coordinates"""
+    from chatbot_backend.geo.gazetteer import find_in_text, resolve_name
+    place = resolve_name(q)
+    if place is None:
+        place = find_in_text(q)["place"]
+    if place is None:
+        raise HTTPException(status_code=404, detail=f"Unknown place: {q}")
+    return {"ok": True, "place": place}
+
+
+@app.get("/v1/geo/nearest-mandis")
+async def geo_nearest_mandis(lat: float, lng: float, k: int = 5, max_km: Optional[float] = None):
+    """Closest mandis to a position"""
+    from chatbot_backend.geo.gazetteer import nearest_mandis
+    k = max(1, min(k, 20))
+    mandis = nearest_mandis(lat, lng, k, max_km)
+    return {"ok": True, "count": len(mandis), "mandis": mandis}
+
+
 @app.get("/v1/price-forecast/crops")
 async def get_crops():
     """Get available crops for price forecasting"""
+    from chatbot_backend.forecast.engine import available_crops
+    crops = available_crops()
+    if crops:
+        return {"ok": True, "crops": crops}
+    
     # Common crops in the dataset
     crops = [
         "Potato", "Tomato", "Onion", "Wheat", "Rice", "Maize",
@@ -533,6 +766,11 @@ async def get_crops():
 @app.get("/v1/price-forecast/states")
 async def get_states(crop: Optional[str] = None):
     """Get available states for a crop"""
+    from chatbot_backend.forecast.engine import available_states
+    states = available_states(crop)
+    if states:
+        return {"ok": True, "states": states}
+    
     # Major agricultural states
     states = [
         "Punjab", "Haryana", "Uttar Pradesh", "Madhya Pradesh",
@@ -542,57 +780,89 @@ async def get_states(crop: Optional[str] = None):
     return {"ok": True, "states": states}
 
 
+def _dates_from_tomorrow(daily_forecast: list) -> list:
+    """Relabel forecast days to start tomorrow (the price dataset ends in the past)"""
+    from datetime import timedelta
+    return [
+        {
+            "date": (datetime.now() + timedelta(days=i+1)).strftime("%Y-%m-%d"),
+            "price": day.get("price", 0)
+        }
+        for i, day in enumerate(daily_forecast)
+    ]
+
+
+@app.get("/v1/price-forecast/batch")
+async def price_forecast_batch(
+    crop: Optional[str] = None,
+    state: Optional[str] = None,
+    states: Optional[str] = None,
+    crops: Optional[str] = None,
+    days: int = 7
+):
+    """Forecasts for one crop across states (or one state across crops) in one call"""
+    if bool(crop) == bool(state):
+        raise HTTPException(status_code=400, detail="Give either crop or state")
+    days = max(1, min(days, 30))
+    
+    names = states if crop else crops
+    names = [n.strip() for n in names.split(",") if n.strip()] if names else None
+    
+    from chatbot_backend.tools.market_forecast import forecast_batch_async
+    result = await forecast_batch_async(crop=crop, state=state, names=names, days=days)
+    if result is None:
+        return {"ok": False, "success": False, "error": "Forecast service unavailable"}
+    
+    forecasts = result["forecasts"]
+    for forecast in forecasts:
+        forecast["daily_forecast"] = _dates_from_tomorrow(forecast.get("daily_forecast", []))
+    
+    return {
+        "ok": True,
+        "success": True,
+        "crop": crop,
+        "state": state,
+        "days": days,
+        "count": len(forecasts),
+        "forecasts": forecasts,
+        "errors": result["errors"],
+        "source": result["source"]
+    }
+
+
 @app.get("/v1/price-forecast/forecast")
 async def price_forecast(crop: str, state: str, days: Optional[int] = 7):
-    """Get price forecast for a crop in a state from Render API"""
+    """Get price forecast for a crop in a state (in-process model, Render API fallback)"""
     try:
-        import requests
         from datetime import datetime, timedelta
         
-        # Try to get real forecast from Render API first
-        render_api_url = "https://agri-price-forecast.onrender.com/api/forecast"
+        # In-process forecasting engine first, Render API as fallback
+        from chatbot_backend.tools.market_forecast import forecast_summary_async
+        data = await forecast_summary_async(crop, state, days)
         
-        try:
-            response = requests.get(
-                render_api_url,
-                params={"crop": crop, "state": state, "days": days},
-                timeout=60  # Longer timeout for Render free tier
-            )
+        if data is not None:
+            # Fix dates to start from tomorrow (the dataset ends in the past)
+            data["daily_forecast"] = _dates_from_tomorrow(data.get("daily_forecast", []))
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    # Fix dates to start from tomorrow if API returns old dates
-                    daily_forecast = data.get("daily_forecast", [])
-                    if daily_forecast:
-                        # Update dates to start from tomorrow
-                        updated_forecast = []
-                        for i, day in enumerate(daily_forecast):
-                            new_date = datetime.now() + timedelta(days=i+1)
-                            updated_forecast.append({
-                                "date": new_date.strftime("%Y-%m-%d"),
-                                "price": day.get("price", 0)
-                            })
-                        data["daily_forecast"] = updated_forecast
-                    
-                    return {
-                        "ok": True,
-                        "success": True,
-                        "crop": data.get("crop", crop),
-                        "state": data.get("state", state),
-                        "days": data.get("days", days),
-                        "start_price": data.get("start_price", 0),
-                        "end_price": data.get("end_price", 0),
-                        "percent_change": data.get("percent_change", 0),
-                        "trend": data.get("trend", "Stable"),
-                        "trend_emoji": data.get("trend_emoji", "➡️"),
-                        "daily_forecast": data.get("daily_forecast", []),
-                        "advisory": []
-                    }
-        except Exception as e:
-            print(f"   Render API error: {e}, falling back to local simulation")
-        
-        # Fallback: Use local prediction with simulation
+            return {
+                "ok": True,
+                "success": True,
+                "crop": data.get("crop", crop),
+                "state": data.get("state", state),
+                "days": data.get("days", days),
+                "start_price": data.get("start_price", 0),
+                "end_price": data.get("end_price", 0),
+                "percent_change": data.get("percent_change", 0),
+                "trend": data.get("trend", "Stable"),
+                "trend_emoji": data.get("trend_emoji", "➡️"),
+                "daily_forecast": data.get("daily_forecast", []),
+                "advisory": [],
+                "source": data["source"]
+            }
+        
+        print(f"   No model forecast for {crop}/{state}, falling back to local simulation")
+        
+        # Fallback: simulate around the single-day prediction
         result = _forecast_price(crop=crop, state=state)
         predicted_price = result.get("details", {}).get("predicted_price", 0) if result else 0
         
@@ -730,6 +1000,8 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "chatbot": "/v1/chatbot",
+            "chatbot_stream": "/v1/chatbot/stream",
+            "chatbot_ws": "/v1/chatbot/ws",
             "disease_detection": "/v1/disease/detect",
             "weather": "/v1/weather",
             "market_prices": "/v1/market/prices",
@@ -743,11 +1015,13 @@ async def root():
 @app.get("/health")
 async def health():
     """Detailed health check including connectivity status"""
-    # Check internet connectivity
+    # Check internet connectivity (in-memory state from the connectivity monitor)
     internet_status = False
+    connectivity = {}
     try:
-        from chatbot_backend.llm.client import is_online
-        internet_status = is_online()
+        from chatbot_backend.llm.connectivity import get_connectivity_status
+        connectivity = get_connectivity_status()
+        internet_status = connectivity["online"]
     except:
         pass
     
@@ -761,6 +1035,43 @@ async def health():
     except:
         pass
     
+    http_metrics = http_client.get_http_metrics()
+    
+    # Semantic answer cache (only if the chain has been loaded)
+    answer_cache_stats = {}
+    try:
+        if answer_query is not None:
+            from chatbot_backend.agent.semantic_cache import answer_cache
+            answer_cache_stats = answer_cache.stats()
+    except:
+        pass
+    
+    upstream_caches = {}
+    try:
+        from chatbot_backend.tools.mandi_price import get_mandi_cache_stats
+        upstream_caches["mandi"] = get_mandi_cache_stats()
+    except:
+        pass
+    try:
+        from chatbot_backend.tools.weather import get_weather_cache_stats
+        upstream_caches["weather"] = get_weather_cache_stats()
+    except:
+        pass
+    
+    forecast_engine = {}
+    try:
+        from chatbot_backend.forecast.engine import get_engine_status
+        forecast_engine = get_engine_status()
+    except:
+        pass
+    
+    embedding_stats = {}
+    try:
+        from chatbot_backend.rag.embedding_service import get_embedding_stats
+        embedding_stats = get_embedding_stats()
+    except:
+        pass
+    
     return {
         "status": "healthy",
         "mode": "online" if internet_status else "offline",
@@ -776,6 +1087,12 @@ async def health():
             "keep_alive_service": "running" if _keep_alive_running else "stopped"
         },
         "offline": offline_status,
+        "connectivity": connectivity,
+        "http": http_metrics,
+        "answer_cache": answer_cache_stats,
+        "embeddings": embedding_stats,
+        "upstream_caches": upstream_caches,
+        "forecast_engine": forecast_engine,
         "keep_alive": {
             "running": _keep_alive_running,
             "interval_minutes": KEEP_ALIVE_INTERVAL // 60,
@@ -788,12 +1105,15 @@ async def health():
 async def connectivity_check():
     """Check internet connectivity status"""
     try:
-        from chatbot_backend.llm.client import is_online
-        connected = is_online()
+        from chatbot_backend.llm.connectivity import get_connectivity_status
+        status = get_connectivity_status()
+        connected = status["online"]
         return {
             "ok": True,
             "internet_connected": connected,
-            "mode": "online" if connected else "offline"
+            "mode": "online" if connected else "offline",
+            "circuit": status["state"],
+            "last_probe": status["last_probe"]
         }
     except Exception as e:
         return {
@@ -804,6 +1124,29 @@ async def connectivity_check():
         }
 
 
+@app.get("/v1/cache/stats")
+async def answer_cache_stats():
+    """Semantic answer cache hit/miss metrics"""
+    _lazy_import()
+    from chatbot_backend.agent.semantic_cache import answer_cache
+    return {"ok": True, **answer_cache.stats()}
+
+
+@app.post("/v1/cache/clear")
+async def answer_cache_clear():
+    """Drop all cached answers"""
+    _lazy_import()
+    from chatbot_backend.agent.semantic_cache import answer_cache
+    answer_cache.clear()
+    return {"ok": True}
+
+
+@app.get("/v1/http/metrics")
+async def http_metrics():
+    """Per-destination latency/error metrics for outbound HTTP calls"""
+    return {"ok": True, **http_client.get_http_metrics()}
+
+
 # ============================================
 # Keep-Alive Endpoints (for Render Free Tier)
 # ============================================
@@ -824,7 +1167,7 @@ async def keep_alive_status():
 async def keep_alive_ping():
     """Manually trigger a ping to all Render services"""
     print(f"⏰ [{datetime.now().strftime('%H:%M:%S')}] Manual keep-alive ping triggered...")
-    results = ping_render_services()
+    results = await asyncio.to_thread(ping_render_services)
     return {
         "ok": True,
         "timestamp": datetime.now().isoformat(),
@@ -0,0 +1,296 @@
+"""
+Shared HTTP Client Layer - pooled outbound HTTP for all tools and proxies
+
+Every outbound call (weather, mandi, forecast, disease, TTS, keep-alive)
+goes through this module instead of bare requests.get/post:
+
+- one keep-alive connection pool per destination host (HTTP/2 when the
+  optional `h2` package is installed) so repeat calls skip TCP+TLS handshakes
+- per-host concurrency limits (e.g. data.gov.in is rate-limited)
+- retry with jittered exponential backoff for idempotent GETs
+- per-host latency / error metrics (exposed on /v1/http/metrics)
+
+Sync callers use get()/post(), async callers use aget()/apost().
+Both return httpx.Response objects and raise httpx.HTTPError subclasses.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401 - only needed to enable HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_TIMEOUT = 10.0
+
+# Connection pool sizing per host
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+KEEPALIVE_EXPIRY = 90.0
+
+# Concurrent in-flight requests per host (requests beyond this wait their turn)
+DEFAULT_HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", "16"))
+HOST_CONCURRENCY = {
+    "api.data.gov.in": 4,   # rate-limited (429) - keep the fan-in low
+    "data.gov.in": 4,
+    "enam.gov.in": 4,
+    "translate.google.com": 8,
+}
+
+# Retry policy for idempotent GETs
+GET_RETRIES = 2
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = {429, 502, 503, 504}
+
+LATENCY_WINDOW = 200
+
+
+class HostMetrics:
+    """Rolling latency/error counters for one destination host"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.status_counts = {}
+        self.last_error = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, latency: float, status: int = None, error: Exception = None):
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            if status is not None:
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if error is not None or (status is not None and status >= 500):
+                self.errors += 1
+                self.last_error = str(error) if error is not None else f"HTTP {status}"
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            count = len(latencies)
+
+            def pct(p):
+                return round(latencies[min(count - 1, int(p * count))] * 1000, 1) if count else None
+
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "error_rate": round(self.errors / self.requests, 3) if self.requests else 0.0,
+                "retries": self.retries,
+                "status_counts": dict(self.status_counts),
+                "latency_ms": {
+                    "avg": round(sum(latencies) / count * 1000, 1) if count else None,
+                    "p50": pct(0.50),
+                    "p95": pct(0.95),
+                    "max": round(latencies[-1] * 1000, 1) if count else None
+                },
+                "last_error": self.last_error
+            }
+
+
+_lock = threading.Lock()
+_metrics = {}
+_sync_clients = {}
+_sync_limits = {}
+
+# Async pools are bound to the event loop that created them, so each loop
+# (server loop, background jobs using asyncio.run) gets its own
+_async_pools = weakref.WeakKeyDictionary()  # loop -> (clients, limits)
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.netloc.lower()
+
+
+def _host_concurrency(host: str) -> int:
+    return HOST_CONCURRENCY.get(host.split(":")[0], DEFAULT_HOST_CONCURRENCY)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+
+
+def _get_metrics(host: str) -> HostMetrics:
+    metrics = _metrics.get(host)
+    if metrics is None:
+        with _lock:
+            metrics = _metrics.setdefault(host, HostMetrics())
+    return metrics
+
+
+def _sync_pool(host: str):
+    client = _sync_clients.get(host)
+    if client is None:
+        with _lock:
+            client = _sync_clients.get(host)
+            if client is None:
+                client = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    limits=_limits(),
+                    timeout=DEFAULT_TIMEOUT,
+                    follow_redirects=True
+                )
+                _sync_clients[host] = client
+                _sync_limits[host] = threading.BoundedSemaphore(_host_concurrency(host))
+    return client, _sync_limits[host]
+
+
+def _async_pool(host: str):
+    loop = asyncio.get_running_loop()
+    clients, limits = _async_pools.setdefault(loop, ({}, {}))
+    client = clients.get(host)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=_limits(),
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True
+        )
+        clients[host] = client
+        limits[host] = asyncio.Semaphore(_host_concurrency(host))
+    return client, limits[host]
+
+
+def _backoff_delay(attempt: int, response: httpx.Response = None) -> float:
+    """Full-jitter exponential backoff, honouring a short Retry-After"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit() and int(retry_after) <= BACKOFF_MAX:
+            return float(retry_after)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _max_retries(method: str, retries) -> int:
+    if retries is not None:
+        return retries
+    return GET_RETRIES if method.upper() == "GET" else 0
+
+
+def request(method: str, url: str, retries: int = None, **kwargs) -> httpx.Response:
+    """
+    Blocking pooled request
+
+    Args:
+        method: HTTP method
+        url: Absolute URL
+        retries: Override retry count (default: GET_RETRIES for GET, 0 otherwise)
+        **kwargs: Passed to httpx (params, data, files, headers, timeout, ...)
+    """
+    host = _host_key(url)
+    client, limit = _sync_pool(host)
+    metrics = _get_metrics(host)
+    max_retries = _max_retries(method, retries)
+
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            with limit:
+                response = client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            metrics.record(time.perf_counter() - start, error=e)
+            if attempt >= max_retries:
+                raise
+            delay = _backoff_delay(attempt)
+        else:
+            metrics.record(time.perf_counter() - start, status=response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                return response
+            delay = _backoff_delay(attempt, response)
+        metrics.record_retry()
+        attempt += 1
+        time.sleep(delay)
+
+
+async def arequest(method: str, url: str, retries: int = None, **kwargs) -> httpx.Response:
+    """Async pooled request - same semantics as request()"""
+    host = _host_key(url)
+    client, limit = _async_pool(host)
+    metrics = _get_metrics(host)
+    max_retries = _max_retries(method, retries)
+
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            async with limit:
+                response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            metrics.record(time.perf_counter() - start, error=e)
+            if attempt >= max_retries:
+                raise
+            delay = _backoff_delay(attempt)
+        else:
+            metrics.record(time.perf_counter() - start, status=response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                return response
+            delay = _backoff_delay(attempt, response)
+        metrics.record_retry()
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> httpx.Response:
+    return request("POST", url, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
+
+
+def get_http_metrics() -> dict:
+    """Per-host metrics snapshot"""
+    with _lock:
+        hosts = dict(_metrics)
+    return {
+        "http2": HTTP2_AVAILABLE,
+        "hosts": {host: metrics.snapshot() for host, metrics in sorted(hosts.items())}
+    }
+
+
+def close_sync_clients():
+    """Close pooled sync connections (server shutdown)"""
+    with _lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+        _sync_limits.clear()
+    for client in clients:
+        client.close()
+
+
+async def close_async_clients():
+    """Close the running loop's pooled async connections (shutdown / end of a job)"""
+    clients, _ = _async_pools.pop(asyncio.get_running_loop(), ({}, {}))
+    for client in clients.values():
+        await client.aclose()
@@ -0,0 +1,294 @@
+"""
+Stale-While-Revalidate Cache for upstream API responses
+
+- bounded size with LRU eviction
+- monotonic-clock TTLs (immune to wall-clock changes)
+- single-flight: concurrent misses for one key share a single upstream call
+- stale-while-revalidate: for `stale_ttl` seconds after expiry the old value
+  is served immediately while one background refresh runs
+- hit / miss / refresh counters for /health
+
+Loaders return the value to cache, or None when the upstream had nothing
+usable - None is returned to the caller but never cached, and a failed
+background refresh keeps serving the stale value.
+
+Works from both worlds over the same entries:
+    cache.get(key, loader)            # sync loader, blocking callers
+    await cache.aget(key, aloader)    # async loader, event-loop callers
+
+on_store(value), when given, runs right after a loaded value was stored
+(miss or background refresh) - the place to start follow-up writes that
+must land on top of the new entry, not be overwritten by it.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Result of an async flight whose leader was cancelled - followers load again
+_LEADER_CANCELLED = object()
+
+
+class _Flight:
+    """An in-progress sync load that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SWRCache:
+    """Bounded LRU cache with TTL, single-flight loads and background refresh"""
+
+    def __init__(self, name: str, max_entries: int = 256, ttl: float = 1800, stale_ttl: float = 6 * 3600):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, fetched_at)
+        self._flights = {}              # key -> _Flight (sync loads)
+        self._async_flights = {}        # key -> asyncio.Future (async loads)
+        self._refreshing = set()        # keys with a background refresh running
+        self._refresh_tasks = set()     # strong refs to async refresh tasks
+        self._executor = None
+
+        self._stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+            "loads": 0, "load_errors": 0, "refreshes": 0, "refresh_errors": 0,
+            "evictions": 0
+        }
+
+    # ----- internal helpers (call with self._lock held) -----
+
+    def _lookup(self, key):
+        """(value, state) where state is 'fresh', 'stale' or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        value, fetched_at = entry
+        age = time.monotonic() - fetched_at
+        if age < self.ttl:
+            self._entries.move_to_end(key)
+            return value, "fresh"
+        if age < self.ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            return value, "stale"
+        del self._entries[key]
+        return None, None
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _store_value(self, key, value):
+        if value is not None:
+            self._store(key, value)
+
+    def _stored(self, key, value, on_store):
+        """Run the on_store hook (outside the lock) for a value that was cached"""
+        if on_store is None or value is None:
+            return
+        try:
+            on_store(value)
+        except Exception as e:
+            print(f"   ⚠️ {self.name} cache on_store failed for {key}: {e}")
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"swr-{self.name}")
+        return self._executor
+
+    # ----- public API -----
+
+    def peek(self, key):
+        """Cached value (fresh or stale) without loading or touching counters"""
+        with self._lock:
+            value, _ = self._lookup(key)
+            return value
+
+    def set(self, key, value):
+        if value is None:
+            return
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key=None):
+        """Drop one key (or everything)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get(self, key, loader, on_store=None):
+        """
+        Cached value for key, calling loader() on a miss (blocking)
+
+        Args:
+            key: Cache key
+            loader: Zero-arg callable returning the value (or None)
+            on_store: Optional callable(value) run after a loaded value is stored
+        """
+        with self._lock:
+            value, state = self._lookup(key)
+            if state == "fresh":
+                self._stats["hits"] += 1
+                return value
+            if state == "stale":
+                self._stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._get_executor().submit(self._refresh, key, loader, on_store)
+                return value
+
+            self._stats["misses"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            with self._lock:
+                self._stats["loads"] += 1
+                self._store_value(key, flight.value)
+            self._stored(key, flight.value, on_store)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats["load_errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _refresh(self, key, loader, on_store=None):
+        """Background revalidation of a stale entry (sync loader)"""
+        try:
+            value = loader()
+            with self._lock:
+                self._stats["refreshes"] += 1
+                self._store_value(key, value)
+            self._stored(key, value, on_store)
+        except Exception as e:
+            print(f"   ⚠️ {self.name} cache refresh failed for {key}: {e}")
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key, loader, on_store=None):
+        """Background revalidation of a stale entry (async loader)"""
+        try:
+            value = await loader()
+            with self._lock:
+                self._stats["refreshes"] += 1
+                self._store_value(key, value)
+            self._stored(key, value, on_store)
+        except Exception as e:
+            print(f"   ⚠️ {self.name} cache refresh failed for {key}: {e}")
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def aget(self, key, loader, on_store=None):
+        """
+        Async version of get()
+
+        Args:
+            key: Cache key
+            loader: Zero-arg coroutine function returning the value (or None)
+            on_store: Optional callable(value) run after a loaded value is stored
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            value, state = self._lookup(key)
+            if state == "fresh":
+                self._stats["hits"] += 1
+                return value
+            if state == "stale":
+                self._stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = loop.create_task(self._refresh_async(key, loader, on_store))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return value
+
+            self._stats["misses"] += 1
+            future = self._async_flights.get(key)
+            leader = future is None or future.get_loop() is not loop
+            if leader:
+                future = loop.create_future()
+                self._async_flights[key] = future
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            value = await asyncio.shield(future)
+            if value is _LEADER_CANCELLED:
+                # The leader's caller went away, not ours - one follower leads a new load
+                return await self.aget(key, loader, on_store)
+            return value
+
+        try:
+            value = await loader()
+            with self._lock:
+                self._stats["loads"] += 1
+                self._store_value(key, value)
+            self._stored(key, value, on_store)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Cancelling the shared future would cancel every coalesced caller
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except Exception as e:
+            with self._lock:
+                self._stats["load_errors"] += 1
+            future.set_exception(e)
+            # Followers re-raise it; mark retrieved so asyncio doesn't warn
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                if self._async_flights.get(key) is future:
+                    del self._async_flights[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+            served = self._stats["hits"] + self._stats["stale_hits"]
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                **self._stats,
+                "hit_rate": round(served / lookups, 3) if lookups else 0.0
+            }
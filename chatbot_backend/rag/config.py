@@ -10,3 +10,6 @@ VECTOR_DB_DIR = str(PROJECT_ROOT / "vector_db")
 
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 80
+
+# Worker threads for embedding + vector search from the async chat pipeline
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
@@ -1,8 +1,5 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from .config import EMBEDDING_MODEL
+from .embedding_service import ServiceEmbeddings
 
 def get_embedding_model():
-    return HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
-        encode_kwargs={"normalize_embeddings": True}
-    )
+    """LangChain embeddings backed by the shared process-wide embedding service"""
+    return ServiceEmbeddings()
@@ -0,0 +1,134 @@
+"""
+Embedding Service - one MiniLM model per process
+
+Used by the Chroma retriever (through the LangChain adapter below), the
+offline FAISS retrieval system and the semantic answer cache, so the model
+is loaded once and a query embedded by one of them is an LRU hit for the rest.
+
+All embeddings are L2-normalized (all-MiniLM-L6-v2 normalizes anyway).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import EMBEDDING_MODEL
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+ENCODE_BATCH_SIZE = 64
+
+_model = None
+_model_lock = threading.Lock()
+
+# Model calls are serialized; concurrent callers queue here instead of
+# oversubscribing the CPU with parallel forward passes
+_encode_lock = threading.Lock()
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "encode_calls": 0}
+
+
+def get_model():
+    """Load the SentenceTransformer once (thread-safe)"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"📦 Loading embedding model: {EMBEDDING_MODEL}")
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+
+def _encode_batch(texts: List[str], batch_size: int) -> np.ndarray:
+    model = get_model()
+    with _encode_lock:
+        _stats["encode_calls"] += 1
+        vectors = model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+    return vectors.astype(np.float32)
+
+
+def encode(texts: List[str], batch_size: int = ENCODE_BATCH_SIZE, use_cache: bool = True) -> np.ndarray:
+    """
+    Embed texts in batches (thread-safe)
+
+    Args:
+        texts: Strings to embed
+        batch_size: Model batch size
+        use_cache: Serve/store single texts in the LRU cache (turn off for bulk corpora)
+
+    Returns:
+        float32 array of shape (len(texts), dim), rows L2-normalized
+    """
+    if not texts:
+        return np.zeros((0, get_model().get_sentence_embedding_dimension()), dtype=np.float32)
+
+    if not use_cache:
+        return _encode_batch(list(texts), batch_size)
+
+    results = [None] * len(texts)
+    missing = {}
+    with _cache_lock:
+        for i, text in enumerate(texts):
+            vector = _cache.get(text)
+            if vector is not None:
+                _cache.move_to_end(text)
+                _stats["hits"] += 1
+                results[i] = vector
+            else:
+                _stats["misses"] += 1
+                missing.setdefault(text, []).append(i)
+
+    if missing:
+        unique = list(missing)
+        vectors = _encode_batch(unique, batch_size)
+        with _cache_lock:
+            for text, vector in zip(unique, vectors):
+                vector.setflags(write=False)
+                _cache[text] = vector
+                _cache.move_to_end(text)
+                for i in missing[text]:
+                    results[i] = vector
+            while len(_cache) > EMBEDDING_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return np.vstack(results)
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Normalized embedding of a single query (LRU cached)"""
+    return encode([text])[0]
+
+
+def get_embedding_stats() -> dict:
+    with _cache_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "model": EMBEDDING_MODEL,
+            "loaded": _model is not None,
+            "cache_size": len(_cache),
+            "cache_max": EMBEDDING_CACHE_SIZE,
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+
+class ServiceEmbeddings(Embeddings):
+    """LangChain Embeddings adapter over the shared service (for Chroma)"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return encode(texts, use_cache=False).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return embed_query(text).tolist()
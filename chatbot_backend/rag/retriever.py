@@ -1,8 +1,11 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from langchain_chroma import Chroma
 from .embedder import get_embedding_model
-from .config import VECTOR_DB_DIR
+from . import embedding_service
+from .config import VECTOR_DB_DIR, RETRIEVAL_WORKERS
 
-# Load embedding model once
+# Shared embedding service (one model for RAG, offline retrieval and the answer cache)
 _embedding_model = get_embedding_model()
 
 # Load persisted Chroma DB
@@ -11,6 +14,11 @@ _vectordb = Chroma(
     embedding_function=_embedding_model
 )
 
+# Dedicated pool for query embedding + Chroma search (CPU-bound),
+# so async callers never run them on the event loop thread
+_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rag")
+
+
 def retrieve_context(query: str, domain: str, k: int = 3) -> str:
     if not domain:
         raise ValueError("Domain must be provided for retrieval")
@@ -26,3 +34,86 @@ def retrieve_context(query: str, domain: str, k: int = 3) -> str:
         texts.append(doc.page_content.strip())
 
     return "\n\n".join(texts)
+
+
+def _distance_to_score(distance: float) -> float:
+    """
+    Chroma's default space is squared L2; on normalized embeddings
+    d = 2 - 2*cos, so the cosine similarity is 1 - d/2
+    """
+    return 1.0 - float(distance) / 2.0
+
+
+def retrieve_multi_domain(query: str, domains: list, k: int = 3) -> dict:
+    """
+    Search several domains in one pass
+    
+    The query is embedded once and a single `$in`-filtered search covers
+    all domains (k hits per domain on average).
+    
+    Returns:
+        {domain: [(text, score), ...]} - hits ranked by cosine score,
+        domains ordered by their best hit (best first)
+    """
+    if not domains:
+        raise ValueError("At least one domain must be provided for retrieval")
+    
+    embedding = embedding_service.embed_query(query).tolist()
+    results = _vectordb.similarity_search_by_vector_with_relevance_scores(
+        embedding=embedding,
+        k=k * len(domains),
+        filter={"domain": {"$in": list(domains)}}
+    )
+    
+    hits = {}
+    for doc, distance in results:
+        domain = doc.metadata.get("domain")
+        ranked = hits.setdefault(domain, [])
+        if len(ranked) < k:
+            ranked.append((doc.page_content.strip(), _distance_to_score(distance)))
+    
+    for ranked in hits.values():
+        ranked.sort(key=lambda hit: hit[1], reverse=True)
+    
+    return dict(sorted(hits.items(), key=lambda item: item[1][0][1], reverse=True))
+
+
+def pick_best_domain(hits: dict, min_chars: int = 50):
+    """
+    Best domain from retrieve_multi_domain() hits - highest score whose
+    context is substantial (> min_chars), else the best non-empty one
+    
+    Returns:
+        (domain, context) or (None, None)
+    """
+    fallback = (None, None)
+    for domain, ranked in hits.items():
+        context = "\n\n".join(text for text, _ in ranked)
+        if len(context.strip()) > min_chars:
+            return domain, context
+        if context.strip() and fallback[0] is None:
+            fallback = (domain, context)
+    return fallback
+
+
+async def retrieve_multi_domain_async(query: str, domains: list, k: int = 3) -> dict:
+    """Async wrapper around retrieve_multi_domain() - runs on the retrieval executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, retrieve_multi_domain, query, domains, k)
+
+
+def embed_query(query: str):
+    """Normalized MiniLM embedding of a query (same model as the vector DB)"""
+    return embedding_service.embed_query(query)
+
+
+async def embed_query_async(query: str) -> list:
+    """Async wrapper around embed_query() - runs on the retrieval executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, embed_query, query)
+
+
+async def retrieve_context_async(query: str, domain: str, k: int = 3) -> str:
+    """Async wrapper around retrieve_context() - runs on the retrieval executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, retrieve_context, query, domain, k)
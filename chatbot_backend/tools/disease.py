@@ -1,6 +1,8 @@
-import requests
+import asyncio
 import os
+from pathlib import Path
 from dotenv import load_dotenv
+from chatbot_backend.net import http_client
 
 # Load environment variables
 load_dotenv()
@@ -106,6 +108,72 @@ def get_advisory_for_disease(disease_name: str):
         "Maintain field hygiene and proper crop management."
     ]
 
+def _format_disease_response(result: dict, crop_type: str):
+    """Turn the disease API prediction into the standardized AI response"""
+    
+    # Extract disease info
+    disease_class = result.get("class", "Unknown")
+    confidence = result.get("confidence", 0.0)
+    
+    # Parse disease name (format: Crop___Disease_name)
+    disease_parts = disease_class.split("___")
+    disease_name = disease_parts[-1].replace("_", " ").title() if len(disease_parts) > 1 else disease_class
+    
+    # Determine if healthy
+    is_healthy = "healthy" in disease_class.lower()
+    
+    # Get treatment advisory
+    advisory = get_advisory_for_disease(disease_class)
+    
+    # Generate summary
+    if is_healthy:
+        summary = f"✓ {crop_type.title()} plant is healthy"
+    else:
+        summary = f"⚠ {disease_name} detected in {crop_type.title()}"
+    
+    return {
+        "type": "disease",
+        "class": disease_class,  # For frontend compatibility
+        "summary": summary,
+        "details": {
+            "crop": crop_type,
+            "disease": disease_name,
+            "full_classification": disease_class,
+            "is_healthy": is_healthy
+        },
+        "advisory": advisory,
+        "confidence": round(confidence, 2),
+        "source": "ML Disease Detection Model"
+    }
+
+
+def _image_not_found_response(image_path: str):
+    return {
+        "type": "disease",
+        "summary": f"Image file not found: {image_path}",
+        "details": {"error": "File not found", "image_path": image_path},
+        "advisory": ["Check image path and try again"],
+        "confidence": 0.0,
+        "source": "ML Disease Detection Model"
+    }
+
+
+def _disease_error_response(crop_type: str, error: Exception):
+    return {
+        "type": "disease",
+        "summary": f"Failed to detect disease in {crop_type}",
+        "details": {"error": str(error), "crop": crop_type},
+        "advisory": [
+            "Check image quality (clear, well-lit photo of affected area)",
+            "Ensure image shows disease symptoms clearly",
+            "Try again after some time (API may be starting up)",
+            "Consult local agricultural expert if problem persists"
+        ],
+        "confidence": 0.0,
+        "source": "ML Disease Detection Model"
+    }
+
+
 def detect_disease(
     image_path: str,
     crop_type: str = "potato"
@@ -125,7 +193,7 @@ def detect_disease(
             files = {"file": ("image.jpg", image_file, "image/jpeg")}
             data = {"crop": crop_type.lower()}
 
-            response = requests.post(
+            response = http_client.post(
                 DISEASE_API_URL,
                 files=files,
                 data=data,
@@ -133,63 +201,38 @@ def detect_disease(
             )
 
             response.raise_for_status()
-            result = response.json()
-            
-            # Extract disease info
-            disease_class = result.get("class", "Unknown")
-            confidence = result.get("confidence", 0.0)
-            
-            # Parse disease name (format: Crop___Disease_name)
-            disease_parts = disease_class.split("___")
-            disease_name = disease_parts[-1].replace("_", " ").title() if len(disease_parts) > 1 else disease_class
-            
-            # Determine if healthy
-            is_healthy = "healthy" in disease_class.lower()
+            return _format_disease_response(response.json(), crop_type)
             
-            # Get treatment advisory
-            advisory = get_advisory_for_disease(disease_class)
-            
-            # Generate summary
-            if is_healthy:
-                summary = f"✓ {crop_type.title()} plant is healthy"
-            else:
-                summary = f"⚠ {disease_name} detected in {crop_type.title()}"
-            
-            return {
-                "type": "disease",
-                "class": disease_class,  # For frontend compatibility
-                "summary": summary,
-                "details": {
-                    "crop": crop_type,
-                    "disease": disease_name,
-                    "full_classification": disease_class,
-                    "is_healthy": is_healthy
-                },
-                "advisory": advisory,
-                "confidence": round(confidence, 2),
-                "source": "ML Disease Detection Model"
-            }
+    except FileNotFoundError:
+        return _image_not_found_response(image_path)
+    except Exception as e:
+        return _disease_error_response(crop_type, e)
+
+
+async def detect_disease_async(
+    image_path: str,
+    crop_type: str = "potato"
+):
+    """
+    Async version of detect_disease() - the upload to the Render model
+    (up to 120s on a cold start) does not block the event loop.
+    """
+    try:
+        image_bytes = await asyncio.to_thread(Path(image_path).read_bytes)
+        files = {"file": ("image.jpg", image_bytes, "image/jpeg")}
+        data = {"crop": crop_type.lower()}
+
+        response = await http_client.apost(
+            DISEASE_API_URL,
+            files=files,
+            data=data,
+            timeout=120  # Render cold start
+        )
+
+        response.raise_for_status()
+        return _format_disease_response(response.json(), crop_type)
             
     except FileNotFoundError:
-        return {
-            "type": "disease",
-            "summary": f"Image file not found: {image_path}",
-            "details": {"error": "File not found", "image_path": image_path},
-            "advisory": ["Check image path and try again"],
-            "confidence": 0.0,
-            "source": "ML Disease Detection Model"
-        }
+        return _image_not_found_response(image_path)
     except Exception as e:
-        return {
-            "type": "disease",
-            "summary": f"Failed to detect disease in {crop_type}",
-            "details": {"error": str(e), "crop": crop_type},
-            "advisory": [
-                "Check image quality (clear, well-lit photo of affected area)",
-                "Ensure image shows disease symptoms clearly",
-                "Try again after some time (API may be starting up)",
-                "Consult local agricultural expert if problem persists"
-            ],
-            "confidence": 0.0,
-            "source": "ML Disease Detection Model"
-        }
+        return _disease_error_response(crop_type, e)
@@ -1,11 +1,18 @@
-import requests
+import httpx
+import asyncio
 import pandas as pd
 import os
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
 import json
+from chatbot_backend.net import http_client
+from chatbot_backend.net.swr_cache import SWRCache
+from chatbot_backend.tools import mandi_store, mandi_timeseries
 
 # Real-time Mandi Price Sources
 # 1. AgMarknet - Official Indian Government source (web scraping)
@@ -41,8 +48,226 @@ STATE_CODES = {
 
 
 # Cache for mandi prices (to avoid hitting API too frequently)
-_mandi_cache = {}
+# Fresh for 30 min, then served stale for up to 6 h while a background refresh runs
 _cache_expiry = 30 * 60  # 30 minutes
+_cache_stale = 6 * 60 * 60
+_mandi_cache = SWRCache("mandi", max_entries=512, ttl=_cache_expiry, stale_ttl=_cache_stale)
+
+TREND_EMOJI = {"rising": "📈", "falling": "📉", "stable": "📊"}
+
+
+def _price_trends(commodities: list, state: str = None) -> dict:
+    """Trend indicators from the price time-series ({} if there is no history)"""
+    try:
+        return mandi_timeseries.get_trends(commodities, state)
+    except Exception as e:
+        print(f"   ⚠️ Price trend lookup failed: {e}")
+        return {}
+
+
+def _trend_text(indicators: dict) -> str:
+    """'Rising (+3.1% week-over-week)'"""
+    text = indicators["trend"].title()
+    if indicators.get("change_wow_pct") is not None:
+        text += f" ({indicators['change_wow_pct']:+.1f}% week-over-week)"
+    return text
+
+
+# =========================================================
+# Upstream sources - queried concurrently (see _fanout / _fanout_async)
+# =========================================================
+
+# Data.gov.in "daily price report" resource used by the AgMarket source
+AGMARKET_API = "https://data.gov.in/ogpl_other_api/wc_api.php"
+AGMARKET_RESOURCE_ID = "35985678-0d79-46b4-9ed6-6f13308a1d24"
+
+ENAM_API = "https://enam.gov.in/web/Ajax_ctrl/trade_data_pdf"
+ENAM_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "application/json",
+    "Referer": "https://enam.gov.in/"
+}
+
+# A source scoring below this is treated as having no usable answer
+MIN_SOURCE_QUALITY = 0.35
+
+# Markets needed for full coverage credit in the quality score
+QUALITY_FULL_COVERAGE = 10
+
+
+def _record_matches(record: dict, commodity: str = None, state: str = None) -> bool:
+    if commodity and commodity.lower() not in str(record.get("commodity", "")).lower():
+        return False
+    if state and state.lower() != str(record.get("state", "")).strip().lower():
+        return False
+    return True
+
+
+def _record_price(record: dict) -> float:
+    try:
+        return float(record.get("modal_price") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _record_age_days(record: dict):
+    value = str(record.get("arrival_date", "")).strip()[:10]
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return (datetime.now() - datetime.strptime(value, fmt)).days
+        except ValueError:
+            continue
+    return None
+
+
+def _score_records(records: list, commodity: str = None, state: str = None, weight: float = 1.0):
+    """
+    Quality of one source's answer: freshness, market coverage and the
+    share of usable records, scaled by how much the source is trusted
+    
+    Returns:
+        (score 0..1, usable records)
+    """
+    if not records:
+        return 0.0, []
+    
+    usable = [r for r in records if _record_matches(r, commodity, state) and _record_price(r) > 0]
+    if not usable:
+        return 0.0, []
+    
+    ages = [age for age in map(_record_age_days, usable) if age is not None]
+    newest = min(ages) if ages else None
+    if newest is None:
+        freshness = 0.5
+    elif newest <= 1:
+        freshness = 1.0
+    elif newest <= mandi_store.MAX_AGE_DAYS:
+        freshness = 0.6
+    else:
+        freshness = 0.2
+    
+    coverage = min(1.0, len({r.get("market") for r in usable}) / QUALITY_FULL_COVERAGE)
+    validity = len(usable) / len(records)
+    
+    score = weight * (0.4 * freshness + 0.3 * coverage + 0.3 * validity)
+    return round(score, 3), usable
+
+
+def _data_gov_request(commodity: str = None, state: str = None, limit: int = 50):
+    return DATA_GOV_API, {"params": _mandi_api_params(commodity, state, limit)}
+
+
+def _data_gov_records(data) -> list:
+    return data.get("records", []) if isinstance(data, dict) else []
+
+
+def _enam_request(commodity: str = None, state: str = None, limit: int = 50):
+    return ENAM_API, {"headers": ENAM_HEADERS}
+
+
+def _enam_records(data) -> list:
+    """eNAM trade rows -> data.gov.in record shape"""
+    rows = data if isinstance(data, list) else (data.get("data", []) if isinstance(data, dict) else [])
+    records = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        records.append({
+            "state": row.get("state", ""),
+            "district": row.get("district", ""),
+            "market": row.get("apmc") or row.get("market", ""),
+            "commodity": row.get("commodity", ""),
+            "variety": row.get("variety", ""),
+            "arrival_date": row.get("created_at") or row.get("arrival_date", ""),
+            "min_price": row.get("min_price"),
+            "max_price": row.get("max_price"),
+            "modal_price": row.get("modal_price")
+        })
+    return records
+
+
+def _agmarket_request(commodity: str = None, state: str = None, limit: int = 50):
+    return AGMARKET_API, {"params": {
+        "resource_id": AGMARKET_RESOURCE_ID,
+        "api-key": DATA_GOV_API_KEY,
+        "format": "json",
+        "limit": max(limit, 100)
+    }}
+
+
+# name, request builder, response -> records, deadline (s), trust weight
+MANDI_SOURCES = [
+    {"name": "data.gov.in", "request": _data_gov_request, "records": _data_gov_records,
+     "deadline": 8.0, "weight": 1.0},
+    {"name": "eNAM", "request": _enam_request, "records": _enam_records,
+     "deadline": 5.0, "weight": 0.9},
+    {"name": "AgMarket", "request": _agmarket_request, "records": _data_gov_records,
+     "deadline": 5.0, "weight": 0.85},
+]
+SOURCES_BY_NAME = {source["name"]: source for source in MANDI_SOURCES}
+
+_source_stats = {
+    source["name"]: {"requests": 0, "valid": 0, "wins": 0, "merged": 0, "errors": 0, "timeouts": 0}
+    for source in MANDI_SOURCES
+}
+_source_stats_lock = threading.Lock()
+
+
+def _count(source: dict, key: str):
+    with _source_stats_lock:
+        _source_stats[source["name"]][key] += 1
+
+
+def _accept(source: dict, data, commodity: str = None, state: str = None):
+    """Score a decoded response; usable records tagged with the source, or None"""
+    score, usable = _score_records(source["records"](data), commodity, state, source["weight"])
+    if score < MIN_SOURCE_QUALITY:
+        print(f"   ⚠️ {source['name']}: no usable records (quality {score})")
+        return None
+    _count(source, "valid")
+    print(f"   ✓ {source['name']}: {len(usable)} records (quality {score})")
+    return [{**record, "source": source["name"]} for record in usable]
+
+
+def _fetch_source(source: dict, commodity: str = None, state: str = None, limit: int = 50):
+    """Blocking fetch of one source within its deadline -> records or None"""
+    _count(source, "requests")
+    try:
+        url, kwargs = source["request"](commodity, state, limit)
+        response = http_client.get(url, timeout=source["deadline"], retries=0, **kwargs)
+        if response.status_code != 200:
+            print(f"   ⚠️ {source['name']} returned status {response.status_code}")
+            return None
+        return _accept(source, response.json(), commodity, state)
+    except httpx.TimeoutException:
+        _count(source, "timeouts")
+        print(f"   ⏱️ {source['name']} missed its {source['deadline']:.0f}s deadline")
+    except Exception as e:
+        _count(source, "errors")
+        print(f"   ⚠️ {source['name']} error: {e}")
+    return None
+
+
+async def _fetch_source_async(source: dict, commodity: str = None, state: str = None, limit: int = 50):
+    """Async fetch of one source, hard-capped at its deadline -> records or None"""
+    _count(source, "requests")
+    try:
+        url, kwargs = source["request"](commodity, state, limit)
+        response = await asyncio.wait_for(
+            http_client.aget(url, timeout=source["deadline"], retries=0, **kwargs),
+            timeout=source["deadline"]
+        )
+        if response.status_code != 200:
+            print(f"   ⚠️ {source['name']} returned status {response.status_code}")
+            return None
+        return _accept(source, response.json(), commodity, state)
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        _count(source, "timeouts")
+        print(f"   ⏱️ {source['name']} missed its {source['deadline']:.0f}s deadline")
+    except Exception as e:
+        _count(source, "errors")
+        print(f"   ⚠️ {source['name']} error: {e}")
+    return None
 
 
 def fetch_enam_prices(commodity: str = None, state: str = None, limit: int = 50):
@@ -50,67 +275,20 @@ def fetch_enam_prices(commodity: str = None, state: str = None, limit: int = 50)
     Fetch real-time prices from eNAM (National Agriculture Market) API
     eNAM is a pan-India electronic trading portal for agricultural commodities
     
-    Args:
-        commodity: Commodity name
-        state: State name  
-        limit: Number of records
-        
     Returns:
-        List of price records
+        List of price records (data.gov.in shape)
     """
-    try:
-        # eNAM public API endpoint
-        enam_url = "https://enam.gov.in/web/Ajax_ctrl/trade_data_pdf"
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "application/json",
-            "Referer": "https://enam.gov.in/"
-        }
-        
-        response = requests.get(enam_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                return data if isinstance(data, list) else []
-            except:
-                return []
-        return []
-    except Exception as e:
-        print(f"   eNAM API error: {e}")
-        return []
+    return _fetch_source(SOURCES_BY_NAME["eNAM"], commodity, state, limit) or []
 
 
-def fetch_commodity_prices_from_agmarket():
+def fetch_commodity_prices_from_agmarket(commodity: str = None, state: str = None, limit: int = 100):
     """
-    Fetch latest commodity prices from AgriMarket India API
-    This is a more reliable source for real-time prices
+    Fetch latest commodity prices from the data.gov.in daily price report
     
     Returns:
-        Dict with commodity prices
+        List of price records
     """
-    try:
-        # This API provides daily price reports
-        api_url = "https://data.gov.in/ogpl_other_api/wc_api.php"
-        
-        params = {
-            "resource_id": "35985678-0d79-46b4-9ed6-6f13308a1d24",
-            "api-key": DATA_GOV_API_KEY,
-            "format": "json",
-            "limit": 100
-        }
-        
-        response = requests.get(api_url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if "records" in data:
-                return data["records"]
-        return []
-    except Exception as e:
-        print(f"   AgMarket API error: {e}")
-        return []
+    return _fetch_source(SOURCES_BY_NAME["AgMarket"], commodity, state, limit) or []
 
 
 def get_sample_realtime_prices():
@@ -173,6 +351,9 @@ def get_sample_realtime_prices():
     # Generate prices with slight daily variation (seeded by date for consistency)
     random.seed(today.toordinal())
     
+    # Trends come from the recorded price history, not from the estimate
+    trends = _price_trends(list(base_prices))
+    
     result = {}
     for commodity, info in base_prices.items():
         daily_factor = random.uniform(0.95, 1.05)  # ±5% daily variation
@@ -188,19 +369,162 @@ def get_sample_realtime_prices():
             "unit": "₹ per " + info["unit"],
             "date": today.strftime("%d-%m-%Y"),
             "markets": mandis,
-            "trend": random.choice(["stable", "rising", "falling"])
+            "trend": trends.get(commodity.lower(), {}).get("trend", "stable"),
+            "trend_indicators": trends.get(commodity.lower())
         }
     
     return result
 
 
+def _mandi_cache_key(commodity: str = None, state: str = None) -> str:
+    return f"{(commodity or 'all').lower()}_{(state or 'all').lower()}"
+
+
+def _mandi_api_params(commodity: str = None, state: str = None, limit: int = 50):
+    params = {
+        "api-key": DATA_GOV_API_KEY,
+        "format": "json",
+        "limit": limit,
+        "offset": 0
+    }
+    
+    if state:
+        params["filters[state]"] = state
+    if commodity:
+        params["filters[commodity]"] = commodity
+    
+    return params
+
+
+def _record_key(record: dict) -> tuple:
+    return tuple(
+        str(record.get(field, "")).strip().lower()
+        for field in ("state", "market", "commodity", "variety", "arrival_date")
+    )
+
+
+def _new_records(current: list, records) -> list:
+    """Records not already in current (by state / market / commodity / variety / date)"""
+    seen = {_record_key(record) for record in current}
+    return [record for record in records or [] if _record_key(record) not in seen]
+
+
+_merge_lock = threading.Lock()
+
+
+def _merge_late(cache_key: str, source: dict, future):
+    """Fold a source that answered after the winner into the stored cache entry"""
+    if future.cancelled() or not future.result():
+        return
+    with _merge_lock:
+        current = _mandi_cache.peek(cache_key)
+        if current is None:
+            return
+        extra = _new_records(current, future.result())
+        if extra:
+            _mandi_cache.set(cache_key, current + extra)
+            _count(source, "merged")
+            print(f"   ➕ Merged {len(extra)} late records from {source['name']}")
+
+
+def _merge_when_done(cache_key: str, late: list):
+    """
+    Merge the sources still running into cache_key as they finish
+
+    Passed to the cache as on_store, so it runs only after the winner was
+    stored - a late merge can never be overwritten by the winner, and a
+    stale refresh merges into the new entry, not the old one.
+    """
+    for future, source in late:
+        future.add_done_callback(lambda f, source=source: _merge_late(cache_key, source, f))
+
+
+_source_executor = ThreadPoolExecutor(max_workers=2 * len(MANDI_SOURCES), thread_name_prefix="mandi-src")
+
+# Strong refs to async source tasks still running after a winner was returned
+_late_tasks = set()
+
+
+def _take_batch(winner, ranked, sources: dict):
+    """Winner of one finished batch plus every other valid answer of that batch folded in"""
+    for future in ranked:
+        if winner is None:
+            winner = future.result()
+            _count(sources[future], "wins")
+            continue
+        extra = _new_records(winner, future.result())
+        if extra:
+            winner = winner + extra
+            _count(sources[future], "merged")
+    return winner
+
+
+def _fanout(commodity: str = None, state: str = None, limit: int = 50):
+    """
+    Query every source concurrently; return the first valid answer
+    
+    Valid answers that finished together with the winner are part of it;
+    the sources still running are returned as (future, source) pairs so
+    the caller can merge them once the winner is cached. Worst case the
+    caller waits for the longest deadline, not the sum of them.
+    
+    Returns:
+        (records or None, late sources)
+    """
+    futures = {
+        _source_executor.submit(_fetch_source, source, commodity, state, limit): source
+        for source in MANDI_SOURCES
+    }
+    deadline_at = time.monotonic() + max(source["deadline"] for source in MANDI_SOURCES)
+    pending = set(futures)
+    winner = None
+    
+    while pending and winner is None:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        ranked = sorted(
+            (f for f in done if f.result()),
+            key=lambda f: futures[f]["weight"], reverse=True
+        )
+        winner = _take_batch(winner, ranked, futures)
+    
+    late = [(future, futures[future]) for future in pending] if winner else []
+    return winner, late
+
+
+async def _fanout_async(commodity: str = None, state: str = None, limit: int = 50):
+    """Async version of _fanout() - same sources, same winner / merge rules"""
+    tasks = {
+        asyncio.ensure_future(_fetch_source_async(source, commodity, state, limit)): source
+        for source in MANDI_SOURCES
+    }
+    pending = set(tasks)
+    winner = None
+    
+    while pending and winner is None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        ranked = sorted(
+            (t for t in done if t.result()),
+            key=lambda t: tasks[t]["weight"], reverse=True
+        )
+        winner = _take_batch(winner, ranked, tasks)
+    
+    for task in pending:
+        _late_tasks.add(task)
+        task.add_done_callback(_late_tasks.discard)
+    late = [(task, tasks[task]) for task in pending] if winner else []
+    return winner, late
+
+
 def fetch_realtime_mandi_prices(commodity: str = None, state: str = None, limit: int = 50):
     """
-    Fetch real-time mandi prices - tries multiple sources
+    Fetch real-time mandi prices from all sources concurrently
     
-    Priority:
-    1. data.gov.in API (official, but rate-limited)
-    2. Sample real-time prices based on current market trends
+    data.gov.in, eNAM and AgMarket are queried in parallel, each within its
+    own deadline; the first valid (quality-scored) answer is returned and
+    cached, later answers are merged into the cache entry.
     
     Args:
         commodity: Commodity name (optional)
@@ -208,59 +532,65 @@ def fetch_realtime_mandi_prices(commodity: str = None, state: str = None, limit:
         limit: Number of records to fetch
         
     Returns:
-        Dict with price data or None
+        List of records, or None (never cached) so callers use sample data
     """
-    cache_key = f"{commodity or 'all'}_{state or 'all'}"
+    cache_key = _mandi_cache_key(commodity, state)
+    late = []
+    
+    def load():
+        records, running = _fanout(commodity, state, limit)
+        late.extend(running)
+        return records
     
-    # Check cache first
-    if cache_key in _mandi_cache:
-        cached_data, cached_time = _mandi_cache[cache_key]
-        if (datetime.now() - cached_time).seconds < _cache_expiry:
-            print(f"   📦 Using cached mandi data (expires in {_cache_expiry - (datetime.now() - cached_time).seconds}s)")
-            return cached_data
+    return _mandi_cache.get(cache_key, load, on_store=lambda _: _merge_when_done(cache_key, late))
+
+
+async def fetch_realtime_mandi_prices_async(commodity: str = None, state: str = None, limit: int = 50):
+    """Async version of fetch_realtime_mandi_prices() - same cache, same return value"""
+    cache_key = _mandi_cache_key(commodity, state)
+    late = []
+    
+    async def load():
+        records, running = await _fanout_async(commodity, state, limit)
+        late.extend(running)
+        return records
     
-    # Try data.gov.in API first
+    return await _mandi_cache.aget(cache_key, load, on_store=lambda _: _merge_when_done(cache_key, late))
+
+
+def get_mandi_cache_stats() -> dict:
+    """Hit/miss/refresh counters of the mandi cache, plus per-source counters"""
+    with _source_stats_lock:
+        sources = {name: dict(stats) for name, stats in _source_stats.items()}
+    return {**_mandi_cache.stats(), "sources": sources}
+
+
+LIVE_SOURCE = "Real-Time Mandi Data (data.gov.in)"
+STORE_SOURCE = "Mandi Price Store (data.gov.in daily)"
+
+
+def _live_source(records) -> str:
+    """'Real-Time Mandi Data (data.gov.in, eNAM)' from the records' source tags"""
+    names = sorted({record.get("source") for record in records or [] if record.get("source")})
+    return f"Real-Time Mandi Data ({', '.join(names)})" if names else LIVE_SOURCE
+
+
+def _local_records(crop: str, state: str = None, district: str = None) -> list:
+    """Latest records from the local mandi store (district first, then state)"""
     try:
-        params = {
-            "api-key": DATA_GOV_API_KEY,
-            "format": "json",
-            "limit": limit,
-            "offset": 0
-        }
-        
-        if state:
-            params["filters[state]"] = state
-        if commodity:
-            params["filters[commodity]"] = commodity
-        
-        response = requests.get(DATA_GOV_API, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            records = data.get("records", [])
-            if records and len(records) > 0:
-                print(f"   ✓ Got {len(records)} records from data.gov.in API")
-                _mandi_cache[cache_key] = (records, datetime.now())
-                return records
-            else:
-                print("   ⚠️ API returned no records")
-        elif response.status_code == 429:
-            print("   ⚠️ API rate limited, using backup data")
-        else:
-            print(f"   ⚠️ API returned status {response.status_code}")
-            
-    except requests.exceptions.RequestException as e:
-        print(f"   ⚠️ API error: {e}")
+        records = mandi_store.query_latest_prices(crop, state, district)
+        if not records and district:
+            records = mandi_store.query_latest_prices(crop, state)
+        return records
     except Exception as e:
-        print(f"   ⚠️ Error parsing API response: {e}")
-    
-    # Return None to trigger sample data usage
-    return None
+        print(f"   ⚠️ Mandi store query failed: {e}")
+        return []
 
 
 def get_mandi_price(crop: str, state: str = None, district: str = None):
     """
-    Fetches mandi price data - tries real-time API, then sample market data.
+    Fetches mandi price data - local mandi store first, then the real-time
+    API, then sample market data.
     
     Args:
         crop: Commodity name (e.g., Rice, Wheat, Potato, Onion, Tomato)
@@ -271,19 +601,54 @@ def get_mandi_price(crop: str, state: str = None, district: str = None):
         Standardized response with type, summary, details, advisory, confidence, source
     """
     
-    # Normalize crop name
-    crop_lower = crop.lower().strip()
-    crop_title = crop.title()
+    print(f"🔍 Fetching mandi prices for {crop.title()}...")
+    
+    # =========================================================
+    # STEP 1: Local store (full daily download, every market)
+    # =========================================================
+    local_data = _local_records(crop.title(), state, district)
+    if local_data:
+        return _build_mandi_price_response(crop, state, local_data, STORE_SOURCE)
     
     # =========================================================
-    # STEP 1: Try Real-Time API First
+    # STEP 2: Real-time sources (store empty or stale)
     # =========================================================
-    print(f"🔍 Fetching mandi prices for {crop_title}...")
+    realtime_data = fetch_realtime_mandi_prices(commodity=crop.title(), state=state, limit=100)
+    
+    return _build_mandi_price_response(crop, state, realtime_data, _live_source(realtime_data))
+
+
+async def get_mandi_price_async(crop: str, state: str = None, district: str = None):
+    """
+    Async version of get_mandi_price() - store queries and the fallback chain
+    (which may read the local CSV) run in a worker thread, the upstream
+    source fan-out on the event loop.
+    """
+    print(f"🔍 Fetching mandi prices for {crop.title()}...")
     
-    realtime_data = fetch_realtime_mandi_prices(commodity=crop_title, state=state, limit=100)
+    local_data = await asyncio.to_thread(_local_records, crop.title(), state, district)
+    if local_data:
+        return await asyncio.to_thread(_build_mandi_price_response, crop, state, local_data, STORE_SOURCE)
+    
+    realtime_data = await fetch_realtime_mandi_prices_async(commodity=crop.title(), state=state, limit=100)
+    
+    return await asyncio.to_thread(
+        _build_mandi_price_response, crop, state, realtime_data, _live_source(realtime_data)
+    )
+
+
+def _build_mandi_price_response(crop: str, state: str, realtime_data, source: str = LIVE_SOURCE):
+    """
+    Build the mandi price response from real-time (or stored) records, falling
+    back to market trend data, the local CSV and finally a helpful message.
+    """
+    
+    # Normalize crop name
+    crop_lower = crop.lower().strip()
+    crop_title = crop.title()
     
     if realtime_data and len(realtime_data) > 0:
-        print(f"   ✓ Got {len(realtime_data)} real-time records from API")
+        print(f"   ✓ Got {len(realtime_data)} records from {source}")
         
         # Process real-time data
         prices = []
@@ -309,7 +674,7 @@ def get_mandi_price(crop: str, state: str = None, district: str = None):
                 continue
         
         if prices:
-            return _format_price_response(crop_title, prices, state, "Real-Time Mandi Data (data.gov.in)")
+            return _format_price_response(crop_title, prices, state, source)
     
     # =========================================================
     # STEP 2: Use Sample Market Prices (based on current trends)
@@ -359,7 +724,7 @@ def get_mandi_price(crop: str, state: str = None, district: str = None):
         
         # Generate trend advisory
         trend = price_data.get("trend", "stable")
-        trend_emoji = {"rising": "📈", "falling": "📉", "stable": "📊"}.get(trend, "📊")
+        trend_emoji = TREND_EMOJI.get(trend, "📊")
         
         advisory = []
         if trend == "rising":
@@ -392,6 +757,7 @@ def get_mandi_price(crop: str, state: str = None, district: str = None):
                 "price_range": f"₹{min_price:.0f} - ₹{max_price:.0f}",
                 "unit": "₹ per quintal",
                 "trend": trend,
+                "trend_indicators": price_data.get("trend_indicators"),
                 "top_markets": market_details,
                 "date": today.strftime("%d %B %Y"),
                 "data_source": "Market Trend Estimate",
@@ -530,6 +896,11 @@ def _format_price_response(crop: str, prices: list, state: str, source: str):
     market_details = [f"{p['market']}: ₹{p['modal']:.0f}/q" for p in prices[:5]]
     location_str = state.title() if state else "All India"
     
+    indicators = _price_trends([crop], state).get(crop.lower())
+    trend_line = ""
+    if indicators:
+        trend_line = f"\n{TREND_EMOJI[indicators['trend']]} **Trend:** {_trend_text(indicators)}"
+    
     advisory = []
     if current_modal > avg_price * 1.1:
         advisory.append(f"📈 Prices are HIGH! Good time to sell.")
@@ -557,6 +928,8 @@ def _format_price_response(crop: str, prices: list, state: str, source: str):
             "unit": "₹ per quintal",
             "markets_covered": len(prices),
             "top_markets": market_details,
+            "trend": indicators["trend"] if indicators else None,
+            "trend_indicators": indicators,
             "data_source": source,
             "last_updated": datetime.now().strftime("%d %B %Y, %I:%M %p")
         },
@@ -569,7 +942,7 @@ def _format_price_response(crop: str, prices: list, state: str, source: str):
 
 💰 **Current Price:** ₹{current_modal:.0f} per quintal
 📊 **Price Range:** ₹{overall_min:.0f} - ₹{overall_max:.0f}
-📈 **Average:** ₹{avg_price:.0f} per quintal
+📈 **Average:** ₹{avg_price:.0f} per quintal{trend_line}
 
 **Top Markets:**
 {chr(10).join(['• ' + m for m in market_details])}
@@ -582,13 +955,51 @@ _Data from {len(prices)} markets_
     }
 
 
-def get_all_commodity_prices(state: str = None, limit_per_commodity: int = 10):
+PRICE_COLUMNS = ["commodity", "state", "market", "min_price", "max_price", "modal_price"]
+
+
+def _price_frame(records) -> pd.DataFrame:
+    """API records (list of dicts) or a store frame -> clean columnar frame"""
+    frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+    frame = frame.reindex(columns=PRICE_COLUMNS)
+    for column in ("min_price", "max_price", "modal_price"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    for column in ("commodity", "state", "market"):
+        frame[column] = frame[column].fillna("Unknown")
+    return frame[frame["modal_price"] > 0]
+
+
+def aggregate_prices(frame: pd.DataFrame, by: list) -> pd.DataFrame:
+    """
+    Modal price statistics per group (group-by kernels, no Python loops)
+    
+    Args:
+        frame: Output of _price_frame()
+        by: Group keys, e.g. ["commodity"] or ["commodity", "state"]
+        
+    Returns:
+        One row per group: price (mean), median, min/max, p10/p90, markets
+    """
+    grouped = frame.groupby(by, sort=True)
+    modal = grouped["modal_price"]
+    
+    stats = modal.agg(["mean", "median", "min", "max"])
+    quantiles = modal.quantile([0.1, 0.9]).unstack()
+    quantiles.columns = ["p10", "p90"]
+    stats = stats.join(quantiles).round(0)
+    stats.columns = ["price", "median", "min_price", "max_price", "p10", "p90"]
+    stats["markets"] = grouped["market"].nunique()
+    return stats.reset_index()
+
+
+def get_all_commodity_prices(state: str = None, limit_per_commodity: int = 10, by_state: bool = False):
     """
     Get prices for multiple commodities at once
     
     Args:
         state: State filter (optional)
         limit_per_commodity: Max records per commodity
+        by_state: Also return per-state aggregates for each commodity
         
     Returns:
         Standardized response with prices for all available commodities
@@ -597,58 +1008,55 @@ def get_all_commodity_prices(state: str = None, limit_per_commodity: int = 10):
     today = datetime.now()
     location_str = state.title() if state else "All India"
     
-    # Try to fetch from API first
+    # Local store first (full day, all markets), then the API's first page
     try:
-        realtime_data = fetch_realtime_mandi_prices(state=state, limit=200)
+        frame = _price_frame(mandi_store.query_all_latest_frame(state))
+        data_source = "data.gov.in (Daily Store)"
+        if frame.empty:
+            live_records = fetch_realtime_mandi_prices(state=state, limit=mandi_store.PAGE_SIZE)
+            frame = _price_frame(live_records or [])
+            data_source = _live_source(live_records)
         
-        if realtime_data and len(realtime_data) > 0:
-            # Group by commodity
-            commodity_prices = {}
+        if not frame.empty:
+            start = time.perf_counter()
+            all_prices = aggregate_prices(frame, ["commodity"]).to_dict("records")
+            state_prices = aggregate_prices(frame, ["commodity", "state"]) if by_state else None
+            aggregation_ms = round((time.perf_counter() - start) * 1000, 1)
             
-            for record in realtime_data:
-                commodity = record.get("commodity", "Unknown")
-                try:
-                    price = float(record.get("modal_price", 0))
-                    if price > 0:
-                        if commodity not in commodity_prices:
-                            commodity_prices[commodity] = []
-                        commodity_prices[commodity].append({
-                            "price": price,
-                            "market": record.get("market", "Unknown"),
-                            "state": record.get("state", "Unknown")
-                        })
-                except:
-                    continue
+            trends = _price_trends([p["commodity"] for p in all_prices], state)
+            for p in all_prices:
+                indicators = trends.get(p["commodity"].lower())
+                p["trend"] = indicators["trend"] if indicators else None
+                p["change_wow_pct"] = indicators["change_wow_pct"] if indicators else None
             
-            if commodity_prices:
-                # Calculate averages
-                all_prices = []
-                for commodity, prices in commodity_prices.items():
-                    avg_price = sum(p["price"] for p in prices) / len(prices)
-                    all_prices.append({
-                        "commodity": commodity,
-                        "price": round(avg_price, 0),
-                        "markets": len(prices)
-                    })
-                
-                all_prices.sort(key=lambda x: x["commodity"])
-                
-                price_lines = [f"• **{p['commodity']}**: ₹{p['price']:.0f}/quintal" for p in all_prices[:15]]
-                
-                return {
-                    "type": "market",
-                    "summary": f"Today's prices for {len(all_prices)} commodities in {location_str}",
-                    "details": {
-                        "commodities": len(all_prices),
-                        "state": location_str,
-                        "prices": all_prices[:20],
-                        "data_source": "data.gov.in (Live)",
-                        "last_updated": today.strftime("%d %B %Y, %I:%M %p")
-                    },
-                    "advisory": ["Prices vary by market and quality grade", "Compare across nearby mandis"],
-                    "confidence": 0.95,
-                    "source": "Real-Time Mandi Data",
-                    "message": f"""
+            price_lines = [
+                f"• **{p['commodity']}**: ₹{p['price']:.0f}/quintal {TREND_EMOJI.get(p['trend'], '')}".rstrip()
+                for p in all_prices[:15]
+            ]
+            
+            details = {
+                "commodities": len(all_prices),
+                "state": location_str,
+                "prices": all_prices,
+                "records": len(frame),
+                "aggregation_ms": aggregation_ms,
+                "data_source": data_source,
+                "last_updated": today.strftime("%d %B %Y, %I:%M %p")
+            }
+            if state_prices is not None:
+                details["by_state"] = {
+                    commodity: group.drop(columns="commodity").to_dict("records")
+                    for commodity, group in state_prices.groupby("commodity", sort=False)
+                }
+            
+            return {
+                "type": "market",
+                "summary": f"Today's prices for {len(all_prices)} commodities in {location_str}",
+                "details": details,
+                "advisory": ["Prices vary by market and quality grade", "Compare across nearby mandis"],
+                "confidence": 0.95,
+                "source": "Real-Time Mandi Data",
+                "message": f"""
 **Today's Market Prices** 🌾📊
 📍 {location_str} | 📅 {today.strftime("%d %B %Y")}
 
@@ -657,7 +1065,7 @@ def get_all_commodity_prices(state: str = None, limit_per_commodity: int = 10):
 ---
 💡 Prices vary by quality grade. Visit agmarknet.gov.in for more.
 """
-                }
+            }
     except Exception as e:
         print(f"   API error: {e}")
     
@@ -679,9 +1087,8 @@ def get_all_commodity_prices(state: str = None, limit_per_commodity: int = 10):
     
     # Format price lines with trend
     price_lines = []
-    trend_emoji = {"rising": "📈", "falling": "📉", "stable": "📊"}
     for p in all_prices:
-        emoji = trend_emoji.get(p.get("trend", "stable"), "📊")
+        emoji = TREND_EMOJI.get(p.get("trend", "stable"), "📊")
         price_lines.append(f"• **{p['commodity']}**: ₹{p['price']:.0f}/q {emoji}")
     
     return {
@@ -0,0 +1,435 @@
+"""
+Local Mandi Price Store - bulk daily download of data.gov.in into SQLite
+
+A background ingestion job pages through the COMPLETE daily mandi resource
+(all states / markets / commodities) with concurrent requests and upserts it
+into an indexed SQLite table. get_mandi_price() and get_all_commodity_prices()
+then answer from local queries - request latency no longer depends on the
+rate-limited upstream API, and every market is covered, not just the first page.
+
+Schedule: runs on startup and every MANDI_INGEST_INTERVAL seconds (default 6 h)
+on a daemon thread, like the keep-alive service.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from chatbot_backend.net import http_client
+
+DATA_GOV_API = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+DATA_GOV_API_KEY = os.getenv("DATA_GOV_API_KEY", "579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b")
+
+DB_PATH = os.getenv(
+    "MANDI_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'mandi_prices.db')
+)
+
+INGEST_INTERVAL = int(os.getenv("MANDI_INGEST_INTERVAL", str(6 * 60 * 60)))
+PAGE_SIZE = int(os.getenv("MANDI_INGEST_PAGE_SIZE", "1000"))
+PAGE_CONCURRENCY = 4      # matches the api.data.gov.in host limit in http_client
+PAGE_TIMEOUT = 30
+
+# Records older than this are not served as "today's" prices
+MAX_AGE_DAYS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mandi_prices (
+    state        TEXT NOT NULL COLLATE NOCASE,
+    district     TEXT NOT NULL COLLATE NOCASE,
+    market       TEXT NOT NULL COLLATE NOCASE,
+    commodity    TEXT NOT NULL COLLATE NOCASE,
+    variety      TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    grade        TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    arrival_date TEXT NOT NULL,              -- ISO yyyy-mm-dd
+    min_price    REAL,
+    max_price    REAL,
+    modal_price  REAL,
+    ingested_at  TEXT NOT NULL,
+    PRIMARY KEY (state, district, market, commodity, variety, grade, arrival_date)
+);
+CREATE INDEX IF NOT EXISTS idx_mandi_commodity_state_date ON mandi_prices (commodity, state, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_mandi_state_date ON mandi_prices (state, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_mandi_district ON mandi_prices (district, commodity);
+CREATE INDEX IF NOT EXISTS idx_mandi_market ON mandi_prices (market, commodity);
+CREATE INDEX IF NOT EXISTS idx_mandi_arrival_date ON mandi_prices (arrival_date);
+
+CREATE TABLE IF NOT EXISTS ingest_runs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at   TEXT NOT NULL,
+    finished_at  TEXT,
+    status       TEXT NOT NULL,
+    total        INTEGER,
+    records      INTEGER,
+    pages        INTEGER,
+    failed_pages INTEGER,
+    error        TEXT
+);
+"""
+
+_RECORD_COLUMNS = (
+    "state", "district", "market", "commodity", "variety", "grade",
+    "arrival_date", "min_price", "max_price", "modal_price"
+)
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+_ingest_running = False
+_ingest_thread = None
+_ingest_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """New connection (one per call/thread - sqlite3 connections are not shared)"""
+    global _schema_ready
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                # WAL: readers keep answering while an ingest is writing
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _schema_ready = True
+    return conn
+
+
+@contextmanager
+def _db():
+    """Connection that commits on success and is always closed"""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _parse_date(value: str):
+    """data.gov.in dates are dd/mm/yyyy - store as ISO so they sort"""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_price(value):
+    try:
+        price = float(value)
+        return price if price > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalize_record(record: dict):
+    """API record -> row tuple, or None if unusable"""
+    arrival_date = _parse_date(record.get("arrival_date", ""))
+    modal_price = _parse_price(record.get("modal_price"))
+    if not arrival_date or modal_price is None or not record.get("commodity"):
+        return None
+    return (
+        (record.get("state") or "").strip(),
+        (record.get("district") or "").strip(),
+        (record.get("market") or "").strip(),
+        record["commodity"].strip(),
+        (record.get("variety") or "").strip(),
+        (record.get("grade") or "").strip(),
+        arrival_date,
+        _parse_price(record.get("min_price")),
+        _parse_price(record.get("max_price")),
+        modal_price
+    )
+
+
+def upsert_records(records: list, touched_dates: set = None) -> int:
+    """
+    Insert/replace API records; returns rows written
+
+    Args:
+        records: data.gov.in records
+        touched_dates: Optional set that collects the ISO arrival dates written
+    """
+    rows = [row for row in map(_normalize_record, records) if row is not None]
+    if not rows:
+        return 0
+    if touched_dates is not None:
+        touched_dates.update(row[6] for row in rows)
+    ingested_at = datetime.now().isoformat(timespec="seconds")
+    with _db() as conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO mandi_prices ({', '.join(_RECORD_COLUMNS)}, ingested_at) "
+            f"VALUES ({', '.join('?' * len(_RECORD_COLUMNS))}, ?)",
+            [row + (ingested_at,) for row in rows]
+        )
+    return len(rows)
+
+
+# =========================================================
+# Ingestion
+# =========================================================
+
+async def _fetch_page(offset: int, limit: int) -> dict:
+    response = await http_client.aget(
+        DATA_GOV_API,
+        params={"api-key": DATA_GOV_API_KEY, "format": "json", "limit": limit, "offset": offset},
+        timeout=PAGE_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def ingest_daily() -> dict:
+    """
+    Download the complete daily resource and upsert it
+
+    The first page reports the total; the remaining pages are fetched
+    concurrently (bounded) and written as they arrive. The arrival dates
+    written are then appended to the price time-series.
+    """
+    from chatbot_backend.tools import mandi_timeseries
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    print(f"📥 [{datetime.now().strftime('%H:%M:%S')}] Mandi ingest started...")
+
+    first = await _fetch_page(0, PAGE_SIZE)
+    total = int(first.get("total") or 0)
+    touched_dates = set()
+    written = await asyncio.to_thread(upsert_records, first.get("records", []), touched_dates)
+
+    offsets = list(range(PAGE_SIZE, total, PAGE_SIZE))
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+    failed_pages = 0
+
+    async def fetch_and_store(offset):
+        async with semaphore:
+            page = await _fetch_page(offset, PAGE_SIZE)
+        return await asyncio.to_thread(upsert_records, page.get("records", []), touched_dates)
+
+    results = await asyncio.gather(*(fetch_and_store(offset) for offset in offsets), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            failed_pages += 1
+            print(f"   ⚠️ Mandi ingest page failed: {result}")
+        else:
+            written += result
+
+    series_rows = await asyncio.to_thread(mandi_timeseries.append_days, touched_dates)
+    await asyncio.to_thread(mandi_timeseries.warm_trends)
+
+    summary = {
+        "started_at": started_at,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "status": "ok" if failed_pages == 0 else "partial",
+        "total": total,
+        "records": written,
+        "pages": len(offsets) + 1,
+        "failed_pages": failed_pages,
+        "series_rows": series_rows,
+        "seconds": round(time.perf_counter() - start, 1)
+    }
+    await asyncio.to_thread(_record_run, summary)
+    print(f"   ✓ Mandi ingest: {written}/{total} records, {summary['pages']} pages in {summary['seconds']}s")
+    return summary
+
+
+def _record_run(summary: dict, error: str = None):
+    with _db() as conn:
+        conn.execute(
+            "INSERT INTO ingest_runs (started_at, finished_at, status, total, records, pages, failed_pages, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (summary.get("started_at"), summary.get("finished_at"), summary.get("status"),
+             summary.get("total"), summary.get("records"), summary.get("pages"),
+             summary.get("failed_pages"), error)
+        )
+
+
+async def _ingest_and_close() -> dict:
+    try:
+        return await ingest_daily()
+    finally:
+        # This loop ends with asyncio.run - release its pooled connections
+        await http_client.close_async_clients()
+
+
+def run_ingest() -> dict:
+    """Blocking ingest (scheduler thread / manual trigger); never runs twice at once"""
+    if not _ingest_lock.acquire(blocking=False):
+        return {"status": "already_running"}
+    try:
+        return asyncio.run(_ingest_and_close())
+    except Exception as e:
+        print(f"   ❌ Mandi ingest failed: {e}")
+        summary = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "status": "error"
+        }
+        try:
+            _record_run(summary, str(e))
+        except Exception:
+            pass
+        return {**summary, "error": str(e)}
+    finally:
+        _ingest_lock.release()
+
+
+def _ingest_worker():
+    """Background worker: ingest now, then every INGEST_INTERVAL"""
+    print(f"🔄 Mandi ingest scheduler started (every {INGEST_INTERVAL // 3600}h)")
+    while _ingest_running:
+        run_ingest()
+        # Sleep in small intervals to allow graceful shutdown
+        for _ in range(INGEST_INTERVAL):
+            if not _ingest_running:
+                break
+            time.sleep(1)
+    print("🛑 Mandi ingest scheduler stopped")
+
+
+def start_ingest_scheduler() -> dict:
+    global _ingest_running, _ingest_thread
+
+    if _ingest_running:
+        return {"status": "already_running"}
+
+    _ingest_running = True
+    _ingest_thread = threading.Thread(target=_ingest_worker, daemon=True)
+    _ingest_thread.start()
+
+    return {"status": "started", "interval": INGEST_INTERVAL}
+
+
+def trigger_ingest() -> dict:
+    """Start a one-off ingest in the background (manual refresh endpoint)"""
+    if _ingest_lock.locked():
+        return {"status": "already_running"}
+    threading.Thread(target=run_ingest, daemon=True).start()
+    return {"status": "started"}
+
+
+def stop_ingest_scheduler() -> dict:
+    global _ingest_running
+    _ingest_running = False
+    return {"status": "stopped"}
+
+
+# =========================================================
+# Queries (same record shape as the data.gov.in API)
+# =========================================================
+
+def _rows_to_records(rows) -> list:
+    return [
+        {
+            "state": row["state"],
+            "district": row["district"],
+            "market": row["market"],
+            "commodity": row["commodity"],
+            "variety": row["variety"],
+            "grade": row["grade"],
+            "arrival_date": datetime.strptime(row["arrival_date"], "%Y-%m-%d").strftime("%d/%m/%Y"),
+            "min_price": row["min_price"],
+            "max_price": row["max_price"],
+            "modal_price": row["modal_price"]
+        }
+        for row in rows
+    ]
+
+
+def _min_date() -> str:
+    return (datetime.now() - timedelta(days=MAX_AGE_DAYS)).strftime("%Y-%m-%d")
+
+
+def _latest_per_market(columns: str, state: str = None, commodity: str = None, district: str = None):
+    """
+    SELECT for every market x commodity on its own latest arrival date in
+    the MAX_AGE_DAYS window - markets report on different days, so one
+    global MAX(arrival_date) would drop everything that didn't report on it
+    """
+    where = ["arrival_date >= ?"]
+    params = [_min_date()]
+    for column, value in (("commodity", commodity), ("state", state), ("district", district)):
+        if value:
+            where.append(f"{column} = ?")
+            params.append(value)
+    clause = " AND ".join(where)
+
+    sql = (
+        f"SELECT {columns} FROM mandi_prices AS p "
+        f"JOIN (SELECT state, district, market, commodity, MAX(arrival_date) AS latest "
+        f"      FROM mandi_prices WHERE {clause} "
+        f"      GROUP BY state, district, market, commodity) AS l "
+        f"ON p.state = l.state AND p.district = l.district AND p.market = l.market "
+        f"AND p.commodity = l.commodity AND p.arrival_date = l.latest"
+    )
+    return sql, params
+
+
+def query_latest_prices(commodity: str, state: str = None, district: str = None) -> list:
+    """
+    Records for a commodity, each market on its latest arrival date (within MAX_AGE_DAYS)
+
+    Returns:
+        List of API-shaped records (empty if the store has nothing recent)
+    """
+    sql, params = _latest_per_market("p.*", state, commodity, district)
+    with _db() as conn:
+        rows = conn.execute(f"{sql} ORDER BY p.modal_price DESC", params).fetchall()
+    return _rows_to_records(rows)
+
+
+def query_all_latest(state: str = None) -> list:
+    """All commodities, each market on its latest arrival date (optionally for one state)"""
+    sql, params = _latest_per_market("p.*", state)
+    with _db() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return _rows_to_records(rows)
+
+
+def query_all_latest_frame(state: str = None) -> pd.DataFrame:
+    """
+    query_all_latest() as a columnar frame (no per-row dicts) for aggregation
+
+    Returns:
+        DataFrame with commodity, state, district, market, min/max/modal_price
+        (empty if the store has nothing recent)
+    """
+    sql, params = _latest_per_market(
+        "p.commodity, p.state, p.district, p.market, p.min_price, p.max_price, p.modal_price", state
+    )
+    with _db() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def query_commodities() -> list:
+    """Distinct commodity names in the store (data.gov.in spelling, e.g. 'Bhindi(Ladies Finger)')"""
+    with _db() as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT commodity FROM mandi_prices")]
+
+
+def get_store_status() -> dict:
+    """Row counts, latest date and last ingest run"""
+    try:
+        with _db() as conn:
+            rows, latest = conn.execute("SELECT COUNT(*), MAX(arrival_date) FROM mandi_prices").fetchone()
+            last_run = conn.execute("SELECT * FROM ingest_runs ORDER BY id DESC LIMIT 1").fetchone()
+        return {
+            "db_path": DB_PATH,
+            "rows": rows,
+            "latest_arrival_date": latest,
+            "scheduler_running": _ingest_running,
+            "ingest_in_progress": _ingest_lock.locked(),
+            "last_run": dict(last_run) if last_run else None
+        }
+    except sqlite3.Error as e:
+        return {"db_path": DB_PATH, "error": str(e)}
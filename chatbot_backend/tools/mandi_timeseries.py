@@ -0,0 +1,446 @@
+"""
+Mandi Price Time-Series - daily history with weekly / monthly rollups
+
+Every ingest appends its arrival dates from the raw mandi_prices table into a
+compact per commodity x market series (one row per market per day, varieties
+and grades averaged), then refreshes the weekly and monthly rollups for the
+touched periods.
+
+Tables live in the mandi store's SQLite file and are WITHOUT ROWID, i.e. the
+rows are stored clustered in primary-key order:
+
+    price_daily    (commodity, state, market, day)          day = days since 1970-01-01
+    price_weekly   (commodity, state, market, week_start)   week_start = Monday's day
+    price_monthly  (commodity, state, market, month)        month = 'YYYY-MM'
+
+so a lookup for any commodity / state / market is a B-tree seek (O(log n)) plus
+a range scan over only the requested window, however many years accumulate.
+
+Trend, volatility and week-over-week change are computed with vectorized
+pandas rolling windows over the daily series (gaps forward-filled).
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from chatbot_backend.tools.mandi_store import _db
+
+_EPOCH = date(1970, 1, 1)
+
+# Rolling windows (days)
+SHORT_WINDOW = 7
+LONG_WINDOW = 28
+VOLATILITY_WINDOW = 30
+HISTORY_DAYS = 120
+
+# Short MA this far above / below the long MA (%) counts as a trend
+TREND_THRESHOLD_PCT = 2.0
+
+# Fewer observed days than this -> no trend
+MIN_DAYS = SHORT_WINDOW + 1
+
+# Commodities per IN (...) query (stays under SQLite's variable limit)
+TREND_QUERY_CHUNK = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_daily (
+    commodity    TEXT NOT NULL COLLATE NOCASE,
+    state        TEXT NOT NULL COLLATE NOCASE,
+    market       TEXT NOT NULL COLLATE NOCASE,
+    day          INTEGER NOT NULL,
+    modal_price  REAL NOT NULL,
+    min_price    REAL,
+    max_price    REAL,
+    records      INTEGER NOT NULL,
+    PRIMARY KEY (commodity, state, market, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_daily_commodity_state_day ON price_daily (commodity, state, day, modal_price);
+CREATE INDEX IF NOT EXISTS idx_daily_commodity_day ON price_daily (commodity, day, modal_price);
+CREATE INDEX IF NOT EXISTS idx_daily_day ON price_daily (day);
+
+CREATE TABLE IF NOT EXISTS price_weekly (
+    commodity    TEXT NOT NULL COLLATE NOCASE,
+    state        TEXT NOT NULL COLLATE NOCASE,
+    market       TEXT NOT NULL COLLATE NOCASE,
+    week_start   INTEGER NOT NULL,
+    modal_mean   REAL NOT NULL,
+    modal_min    REAL NOT NULL,
+    modal_max    REAL NOT NULL,
+    days         INTEGER NOT NULL,
+    PRIMARY KEY (commodity, state, market, week_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS price_monthly (
+    commodity    TEXT NOT NULL COLLATE NOCASE,
+    state        TEXT NOT NULL COLLATE NOCASE,
+    market       TEXT NOT NULL COLLATE NOCASE,
+    month        TEXT NOT NULL,
+    modal_mean   REAL NOT NULL,
+    modal_min    REAL NOT NULL,
+    modal_max    REAL NOT NULL,
+    days         INTEGER NOT NULL,
+    PRIMARY KEY (commodity, state, market, month)
+) WITHOUT ROWID;
+"""
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# (commodity, state) -> indicators (None = not enough history); cleared by append_days()
+_trend_cache = {}
+_trend_generation = 0
+_trend_lock = threading.Lock()
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                conn.executescript(_SCHEMA)
+                _schema_ready = True
+
+
+def to_day(value) -> int:
+    """ISO date string / date -> day number"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d").date()
+    return (value - _EPOCH).days
+
+
+def from_day(day: int) -> str:
+    return (_EPOCH + timedelta(days=int(day))).isoformat()
+
+
+def _week_start(day: int) -> int:
+    # 1970-01-01 was a Thursday -> Monday-based weekday is (day + 3) % 7
+    return day - (day + 3) % 7
+
+
+def _month_bounds(day: int):
+    first = (_EPOCH + timedelta(days=day)).replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first.strftime("%Y-%m"), to_day(first), to_day(next_month) - 1
+
+
+# =========================================================
+# Appending
+# =========================================================
+
+def append_days(dates) -> int:
+    """
+    Roll the raw records of the given arrival dates into the daily series,
+    then refresh the weekly / monthly rollups they fall into
+
+    Args:
+        dates: ISO yyyy-mm-dd arrival dates (e.g. the dates an ingest touched)
+
+    Returns:
+        Daily rows written
+    """
+    days = sorted({to_day(d) for d in dates})
+    if not days:
+        return 0
+
+    written = 0
+    with _db() as conn:
+        _ensure_schema(conn)
+        for day in days:
+            cursor = conn.execute(
+                "INSERT OR REPLACE INTO price_daily "
+                "(commodity, state, market, day, modal_price, min_price, max_price, records) "
+                "SELECT commodity, state, market, ?, AVG(modal_price), MIN(min_price), MAX(max_price), COUNT(*) "
+                "FROM mandi_prices WHERE arrival_date = ? GROUP BY commodity, state, market",
+                (day, from_day(day))
+            )
+            written += cursor.rowcount
+
+        for week_start in sorted({_week_start(day) for day in days}):
+            conn.execute(
+                "INSERT OR REPLACE INTO price_weekly "
+                "(commodity, state, market, week_start, modal_mean, modal_min, modal_max, days) "
+                "SELECT commodity, state, market, ?, AVG(modal_price), MIN(modal_price), MAX(modal_price), COUNT(*) "
+                "FROM price_daily WHERE day BETWEEN ? AND ? GROUP BY commodity, state, market",
+                (week_start, week_start, week_start + 6)
+            )
+
+        for month, first, last in sorted({_month_bounds(day) for day in days}):
+            conn.execute(
+                "INSERT OR REPLACE INTO price_monthly "
+                "(commodity, state, market, month, modal_mean, modal_min, modal_max, days) "
+                "SELECT commodity, state, market, ?, AVG(modal_price), MIN(modal_price), MAX(modal_price), COUNT(*) "
+                "FROM price_daily WHERE day BETWEEN ? AND ? GROUP BY commodity, state, market",
+                (month, first, last)
+            )
+
+    _invalidate_trends()
+    return written
+
+
+def rebuild() -> int:
+    """Rebuild the series and rollups from every date in the raw store"""
+    with _db() as conn:
+        dates = [row[0] for row in conn.execute("SELECT DISTINCT arrival_date FROM mandi_prices")]
+    print(f"🔨 Rebuilding mandi time-series from {len(dates)} arrival dates...")
+    return append_days(dates)
+
+
+# =========================================================
+# Queries
+# =========================================================
+
+def _filters(commodity: str, state: str = None, market: str = None):
+    where = ["commodity = ?"]
+    params = [commodity]
+    if state:
+        where.append("state = ?")
+        params.append(state)
+    if market:
+        where.append("market = ?")
+        params.append(market)
+    return where, params
+
+
+def _daily_frame(commodity: str, state: str = None, market: str = None, days: int = HISTORY_DAYS) -> pd.DataFrame:
+    """Per-market daily rows (day, market, modal_price) for the last `days` days"""
+    where, params = _filters(commodity, state, market)
+    where.append("day >= ?")
+    params.append(to_day(date.today()) - days)
+
+    with _db() as conn:
+        _ensure_schema(conn)
+        rows = conn.execute(
+            f"SELECT day, market, modal_price FROM price_daily WHERE {' AND '.join(where)}",
+            params
+        ).fetchall()
+    return pd.DataFrame([tuple(row) for row in rows], columns=["day", "market", "modal_price"])
+
+
+def _daily_series(frame: pd.DataFrame) -> pd.Series:
+    """
+    One price per calendar day: the median across markets (robust to which
+    markets happened to report), gaps forward-filled
+    """
+    observed = frame.groupby("day")["modal_price"].median().sort_index()
+    full_range = np.arange(observed.index[0], observed.index[-1] + 1)
+    return observed.reindex(full_range).ffill()
+
+
+def compute_indicators(series: pd.Series, observed_days: int = None) -> dict:
+    """
+    Trend, volatility and week-over-week change of a daily price series
+
+    Args:
+        series: Price per consecutive day number (no gaps)
+        observed_days: Days with real observations (defaults to len(series))
+
+    Returns:
+        Indicator dict, or None if the history is too short
+    """
+    observed_days = len(series) if observed_days is None else observed_days
+    if observed_days < MIN_DAYS:
+        return None
+
+    ma_short = series.rolling(SHORT_WINDOW, min_periods=1).mean()
+    ma_long = series.rolling(LONG_WINDOW, min_periods=LONG_WINDOW // 2).mean()
+    returns = series.pct_change()
+    volatility = returns.rolling(VOLATILITY_WINDOW, min_periods=SHORT_WINDOW).std()
+    week_ago = ma_short.shift(SHORT_WINDOW)
+
+    latest_short = float(ma_short.iloc[-1])
+    latest_long = ma_long.iloc[-1]
+    # Short history: compare with last week's short MA instead of the long MA
+    baseline = float(latest_long) if not np.isnan(latest_long) else float(week_ago.iloc[-1])
+
+    wow = week_ago.iloc[-1]
+    change_wow_pct = (latest_short / wow - 1) * 100 if not np.isnan(wow) and wow else None
+    momentum_pct = (latest_short / baseline - 1) * 100 if not np.isnan(baseline) and baseline else 0.0
+
+    if momentum_pct > TREND_THRESHOLD_PCT:
+        trend = "rising"
+    elif momentum_pct < -TREND_THRESHOLD_PCT:
+        trend = "falling"
+    else:
+        trend = "stable"
+
+    vol = volatility.iloc[-1]
+    return {
+        "trend": trend,
+        "momentum_pct": round(momentum_pct, 2),
+        "change_wow_pct": round(float(change_wow_pct), 2) if change_wow_pct is not None else None,
+        "volatility_pct": round(float(vol) * 100, 2) if not np.isnan(vol) else None,
+        "latest_price": round(float(series.iloc[-1]), 2),
+        "ma_7": round(latest_short, 2),
+        "ma_28": round(float(latest_long), 2) if not np.isnan(latest_long) else None,
+        "as_of": from_day(series.index[-1]),
+        "days_of_data": int(observed_days)
+    }
+
+
+def get_trend(commodity: str, state: str = None, market: str = None):
+    """
+    Indicators for a commodity (optionally one state / market)
+
+    Returns:
+        compute_indicators() dict, or None without enough history
+    """
+    if not market:
+        return get_trends([commodity], state).get(commodity.lower())
+
+    frame = _daily_frame(commodity, state, market)
+    if frame.empty:
+        return None
+    return compute_indicators(_daily_series(frame), observed_days=frame["day"].nunique())
+
+
+def get_trends(commodities: list, state: str = None) -> dict:
+    """
+    Indicators for many commodities with one query
+
+    Results are memoized until the next append_days() - they only change
+    when an ingest adds data, and listing every commodity would otherwise
+    re-read months of rows on each request.
+
+    Returns:
+        {commodity.lower(): indicators} for those with enough history
+    """
+    state_key = (state or "").lower()
+    trends, missing = {}, []
+    with _trend_lock:
+        for commodity in {c.lower() for c in commodities}:
+            if (commodity, state_key) in _trend_cache:
+                if _trend_cache[(commodity, state_key)]:
+                    trends[commodity] = _trend_cache[(commodity, state_key)]
+            else:
+                missing.append(commodity)
+
+    if not missing:
+        return trends
+
+    generation = _trend_generation
+    computed = dict.fromkeys(missing)
+    for i in range(0, len(missing), TREND_QUERY_CHUNK):
+        chunk = missing[i:i + TREND_QUERY_CHUNK]
+        where = [f"commodity IN ({', '.join('?' * len(chunk))})", "day >= ?"]
+        params = chunk + [to_day(date.today()) - HISTORY_DAYS]
+        if state:
+            where.append("state = ?")
+            params.append(state)
+
+        with _db() as conn:
+            _ensure_schema(conn)
+            rows = conn.execute(
+                f"SELECT commodity, day, modal_price FROM price_daily WHERE {' AND '.join(where)}",
+                params
+            ).fetchall()
+        if not rows:
+            continue
+
+        frame = pd.DataFrame([tuple(row) for row in rows], columns=["commodity", "day", "modal_price"])
+        frame["commodity"] = frame["commodity"].str.lower()
+        for commodity, group in frame.groupby("commodity"):
+            computed[commodity] = compute_indicators(_daily_series(group), observed_days=group["day"].nunique())
+
+    with _trend_lock:
+        # Don't memoize results computed from data an ingest has since replaced
+        if generation == _trend_generation:
+            for commodity, indicators in computed.items():
+                _trend_cache[(commodity, state_key)] = indicators
+    trends.update({commodity: indicators for commodity, indicators in computed.items() if indicators})
+    return trends
+
+
+def _invalidate_trends():
+    global _trend_generation
+    with _trend_lock:
+        _trend_cache.clear()
+        _trend_generation += 1
+
+
+def warm_trends() -> int:
+    """Precompute national trends for every commodity (after an ingest)"""
+    with _db() as conn:
+        _ensure_schema(conn)
+        commodities = [
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT commodity FROM price_daily WHERE day >= ?",
+                (to_day(date.today()) - HISTORY_DAYS,)
+            )
+        ]
+    return len(get_trends(commodities))
+
+
+def get_series(commodity: str, state: str = None, market: str = None, freq: str = "daily", days: int = 365) -> list:
+    """
+    Price history at daily / weekly / monthly resolution
+
+    Daily points are the median across matching markets; weekly / monthly
+    points come from the rollup tables (mean of the markets' period means).
+    """
+    since = to_day(date.today()) - days
+
+    if freq == "daily":
+        frame = _daily_frame(commodity, state, market, days)
+        if frame.empty:
+            return []
+        grouped = frame.groupby("day")["modal_price"].agg(["median", "min", "max", "count"])
+        return [
+            {"date": from_day(day), "modal_price": round(row["median"], 2), "min_price": round(row["min"], 2),
+             "max_price": round(row["max"], 2), "markets": int(row["count"])}
+            for day, row in grouped.iterrows()
+        ]
+
+    where, params = _filters(commodity, state, market)
+    if freq == "weekly":
+        table, period = "price_weekly", "week_start"
+        where.append("week_start >= ?")
+        params.append(_week_start(since))
+    elif freq == "monthly":
+        table, period = "price_monthly", "month"
+        where.append("month >= ?")
+        params.append(from_day(since)[:7])
+    else:
+        raise ValueError(f"Unknown frequency: {freq}")
+
+    with _db() as conn:
+        _ensure_schema(conn)
+        rows = conn.execute(
+            f"SELECT {period} AS period, AVG(modal_mean) AS modal_price, MIN(modal_min) AS min_price, "
+            f"MAX(modal_max) AS max_price, COUNT(*) AS markets "
+            f"FROM {table} WHERE {' AND '.join(where)} GROUP BY {period} ORDER BY {period}",
+            params
+        ).fetchall()
+
+    return [
+        {
+            "period": from_day(row["period"]) if freq == "weekly" else row["period"],
+            "modal_price": round(row["modal_price"], 2),
+            "min_price": round(row["min_price"], 2),
+            "max_price": round(row["max_price"], 2),
+            "markets": row["markets"]
+        }
+        for row in rows
+    ]
+
+
+def get_timeseries_status() -> dict:
+    with _db() as conn:
+        _ensure_schema(conn)
+        rows, first, last = conn.execute("SELECT COUNT(*), MIN(day), MAX(day) FROM price_daily").fetchone()
+        weekly = conn.execute("SELECT COUNT(*) FROM price_weekly").fetchone()[0]
+        monthly = conn.execute("SELECT COUNT(*) FROM price_monthly").fetchone()[0]
+    return {
+        "daily_rows": rows,
+        "weekly_rows": weekly,
+        "monthly_rows": monthly,
+        "first_date": from_day(first) if first is not None else None,
+        "last_date": from_day(last) if last is not None else None
+    }
+
+
+if __name__ == "__main__":
+    print(f"✓ {rebuild()} daily rows written")
+    print(get_timeseries_status())
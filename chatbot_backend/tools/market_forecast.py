@@ -1,6 +1,98 @@
-import requests
+"""
+Crop Price Forecasts
+
+Served by the in-process engine (chatbot_backend.forecast.engine) when it
+has the dataset and a model for the crop/state; the Render-hosted forecast
+API is only an optional fallback (FORECAST_REMOTE_FALLBACK=0 disables it).
+"""
+
+import asyncio
+import os
+
+from chatbot_backend.forecast import engine
+from chatbot_backend.net import http_client
 
 MARKET_FORECAST_API_URL = "https://agri-price-forecast.onrender.com/api/predict"
+FORECAST_SUMMARY_API_URL = "https://agri-price-forecast.onrender.com/api/forecast"
+FORECAST_BATCH_API_URL = "https://agri-price-forecast.onrender.com/api/forecast/batch"
+
+REMOTE_FALLBACK = os.getenv("FORECAST_REMOTE_FALLBACK", "1") != "0"
+
+
+def _local_prediction(crop: str, state: str):
+    """Next-day prediction payload from the local engine, or None"""
+    try:
+        price = engine.predict_next_day_price(crop, state)
+    except engine.ForecastUnavailable:
+        return None
+    except Exception as e:
+        print(f"   ⚠️ Local forecast failed for {crop}/{state}: {e}")
+        return None
+    return {"predicted_price": price, "unit": "₹ per quintal", "horizon": "next day"}
+
+
+def _local_summary(crop: str, state: str, days: int):
+    """Multi-day forecast summary from the local engine, or None"""
+    try:
+        return engine.forecast_summary(crop, state, days)
+    except engine.ForecastUnavailable:
+        return None
+    except Exception as e:
+        print(f"   ⚠️ Local forecast failed for {crop}/{state}: {e}")
+        return None
+
+
+def _format_forecast_response(crop: str, state: str, data: dict):
+    """Turn the prediction API payload into the standardized AI response"""
+    
+    # Extract price prediction
+    predicted_price = data.get("predicted_price", 0)
+    
+    # Generate advisory based on price
+    advisory = []
+    if predicted_price > 1500:
+        advisory.append(f"Good time to sell {crop}. Prices are favorable.")
+        advisory.append("Consider selling in bulk to maximize profits.")
+    elif predicted_price > 800:
+        advisory.append(f"Moderate prices expected for {crop}.")
+        advisory.append("Monitor market trends before selling.")
+    else:
+        advisory.append(f"Low prices predicted for {crop}.")
+        advisory.append("Consider holding stock if storage is available.")
+        advisory.append("Explore value-added processing options.")
+    
+    advisory.append(f"Check local mandi rates in {state} before selling.")
+    
+    return {
+        "type": "market",
+        "summary": f"{crop} price forecast: ₹{predicted_price:.2f} per quintal in {state}",
+        "details": {
+            "crop": crop,
+            "state": state,
+            "predicted_price": predicted_price,
+            "unit": data.get("unit", "₹ per quintal"),
+            "horizon": data.get("horizon", "next day")
+        },
+        "advisory": advisory,
+        "confidence": 0.85,
+        "source": "ML Price Prediction Model"
+    }
+
+
+def _forecast_error_response(crop: str, state: str, error: Exception):
+    return {
+        "type": "market",
+        "summary": f"Failed to fetch price forecast for {crop} in {state}",
+        "details": {"error": str(error), "crop": crop, "state": state},
+        "advisory": [
+            "Check internet connection",
+            "Verify crop and state names",
+            "Try again after some time (API may be starting up)"
+        ],
+        "confidence": 0.0,
+        "source": "ML Price Prediction Model"
+    }
+
 
 def forecast_price(crop: str, state: str = "Punjab"):
     """
@@ -13,60 +105,129 @@ def forecast_price(crop: str, state: str = "Punjab"):
     Returns:
         Standardized response with type, summary, details, advisory, confidence, source
     """
+    local = _local_prediction(crop, state)
+    if local is not None:
+        return _format_forecast_response(crop, state, local)
+    
+    if not REMOTE_FALLBACK:
+        return _forecast_error_response(crop, state, engine.ForecastUnavailable("No local model"))
+    
     params = {"crop": crop, "state": state}
     
     try:
-        response = requests.get(
+        response = http_client.get(
             MARKET_FORECAST_API_URL,
             params=params,
             timeout=30
         )
         response.raise_for_status()
-        data = response.json()
-        
-        # Extract price prediction
-        predicted_price = data.get("predicted_price", 0)
+        return _format_forecast_response(crop, state, response.json())
         
-        # Generate advisory based on price
-        advisory = []
-        if predicted_price > 1500:
-            advisory.append(f"Good time to sell {crop}. Prices are favorable.")
-            advisory.append("Consider selling in bulk to maximize profits.")
-        elif predicted_price > 800:
-            advisory.append(f"Moderate prices expected for {crop}.")
-            advisory.append("Monitor market trends before selling.")
-        else:
-            advisory.append(f"Low prices predicted for {crop}.")
-            advisory.append("Consider holding stock if storage is available.")
-            advisory.append("Explore value-added processing options.")
-        
-        advisory.append(f"Check local mandi rates in {state} before selling.")
-        
-        return {
-            "type": "market",
-            "summary": f"{crop} price forecast: ₹{predicted_price:.2f} per quintal in {state}",
-            "details": {
-                "crop": crop,
-                "state": state,
-                "predicted_price": predicted_price,
-                "unit": data.get("unit", "₹ per quintal"),
-                "horizon": data.get("horizon", "next day")
-            },
-            "advisory": advisory,
-            "confidence": 0.85,
-            "source": "ML Price Prediction Model"
-        }
+    except Exception as e:
+        return _forecast_error_response(crop, state, e)
+
+
+async def forecast_price_async(crop: str, state: str = "Punjab"):
+    """
+    Async version of forecast_price() - the local model runs in a worker
+    thread, and the (often cold-starting) Render fallback is awaited
+    without blocking the event loop.
+    """
+    local = await asyncio.to_thread(_local_prediction, crop, state)
+    if local is not None:
+        return _format_forecast_response(crop, state, local)
+    
+    if not REMOTE_FALLBACK:
+        return _forecast_error_response(crop, state, engine.ForecastUnavailable("No local model"))
+    
+    params = {"crop": crop, "state": state}
+    
+    try:
+        response = await http_client.aget(MARKET_FORECAST_API_URL, params=params, timeout=30)
+        response.raise_for_status()
+        return _format_forecast_response(crop, state, response.json())
         
     except Exception as e:
-        return {
-            "type": "market",
-            "summary": f"Failed to fetch price forecast for {crop} in {state}",
-            "details": {"error": str(e), "crop": crop, "state": state},
-            "advisory": [
-                "Check internet connection",
-                "Verify crop and state names",
-                "Try again after some time (API may be starting up)"
-            ],
-            "confidence": 0.0,
-            "source": "ML Price Prediction Model"
-        }
+        return _forecast_error_response(crop, state, e)
+
+
+async def forecast_summary_async(crop: str, state: str, days: int = 7):
+    """
+    Multi-day forecast summary (start/end price, trend, daily_forecast)
+    
+    Returns:
+        The summary dict (with "source": "local" or "remote"), or None when
+        neither the local engine nor the remote API could answer
+    """
+    summary = await asyncio.to_thread(_local_summary, crop, state, days)
+    if summary is not None:
+        return {**summary, "source": "local"}
+    
+    if not REMOTE_FALLBACK:
+        return None
+    
+    try:
+        response = await http_client.aget(
+            FORECAST_SUMMARY_API_URL,
+            params={"crop": crop, "state": state, "days": days},
+            timeout=60  # Longer timeout for Render free tier
+        )
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("success"):
+                return {**data, "source": "remote"}
+    except Exception as e:
+        print(f"   Render API error: {e}")
+    return None
+
+
+def _local_batch(crop: str, state: str, names: list, days: int):
+    if not engine.is_ready():
+        return None
+    if crop:
+        pairs = [(crop, name) for name in names] if names else engine.servable_pairs(crop=crop)
+    else:
+        pairs = [(name, state) for name in names] if names else engine.servable_pairs(state=state)
+    summaries, errors = engine.forecast_batch(pairs, days)
+    return {"forecasts": summaries, "errors": errors}
+
+
+async def forecast_batch_async(crop: str = None, state: str = None, names: list = None, days: int = 7):
+    """
+    Forecasts for one crop across states (or one state across crops) in a
+    single pass of the local engine
+    
+    Args:
+        crop / state: Exactly one of them
+        names: States (for crop) or crops (for state); default: all with a model
+        days: Days to forecast
+    
+    Returns:
+        {"forecasts": [...], "errors": [...], "source": ...}, or None when
+        neither the local engine nor the remote API could answer
+    """
+    result = await asyncio.to_thread(_local_batch, crop, state, names, days)
+    if result is not None:
+        return {**result, "source": "local"}
+    
+    if not REMOTE_FALLBACK:
+        return None
+    
+    params = {"days": days}
+    if crop:
+        params["crop"] = crop
+        if names:
+            params["states"] = ",".join(names)
+    else:
+        params["state"] = state
+        if names:
+            params["crops"] = ",".join(names)
+    
+    try:
+        response = await http_client.aget(FORECAST_BATCH_API_URL, params=params, timeout=60)
+        if response.status_code == 200:
+            data = response.json()
+            return {"forecasts": data.get("forecasts", []), "errors": data.get("errors", []), "source": "remote"}
+    except Exception as e:
+        print(f"   Render API error: {e}")
+    return None
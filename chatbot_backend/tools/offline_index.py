@@ -0,0 +1,271 @@
+"""
+Persistent ANN Index for the Offline Retrieval System
+
+Built once (offline or on first boot), then memory-mapped at startup:
+
+    data/offline_index/
+    ├── manifest.json    # content hash, model, index type, params
+    ├── embeddings.npy   # float32 question embeddings (np.load mmap_mode='r')
+    └── index.faiss      # faiss.write_index output (HNSW / IVF-PQ / flat)
+
+The manifest's content hash covers the Q&A dataset bytes and the embedding
+model; together with the requested index type, any change triggers a rebuild.
+
+Index types (OFFLINE_INDEX_TYPE):
+- hnsw:  graph index, ~log(N) search, exact L2 distances (default)
+- ivfpq: inverted lists + product quantization, smallest memory; candidates
+         are re-ranked with exact distances from the mmapped embeddings
+- flat:  brute-force IndexFlatL2 (reference / tiny corpora)
+
+Build offline with:
+    python -m chatbot_backend.tools.offline_index --type hnsw
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from chatbot_backend.rag import embedding_service
+from chatbot_backend.rag.config import EMBEDDING_MODEL
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'offline_index')
+MANIFEST_PATH = os.path.join(INDEX_DIR, 'manifest.json')
+EMBEDDINGS_PATH = os.path.join(INDEX_DIR, 'embeddings.npy')
+INDEX_PATH = os.path.join(INDEX_DIR, 'index.faiss')
+
+INDEX_TYPE = os.getenv("OFFLINE_INDEX_TYPE", "hnsw").lower()
+INDEX_FORMAT_VERSION = 1
+
+# HNSW
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+
+# IVF-PQ (384-dim MiniLM -> 48 sub-quantizers of 8 dims, 8 bits each)
+IVFPQ_SUBQUANTIZERS = 48
+IVFPQ_BITS = 8
+IVFPQ_NPROBE = 16
+IVFPQ_RERANK_FACTOR = 4
+
+# Below this many vectors IVF training is unreliable - use HNSW instead
+IVFPQ_MIN_VECTORS = 10000
+
+EMBED_BATCH_SIZE = 512
+
+
+def _index_params(index_type: str) -> dict:
+    if index_type == "hnsw":
+        return {"M": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION, "ef_search": HNSW_EF_SEARCH}
+    if index_type == "ivfpq":
+        return {"m": IVFPQ_SUBQUANTIZERS, "bits": IVFPQ_BITS, "nprobe": IVFPQ_NPROBE}
+    return {}
+
+
+def content_hash(data_path: str) -> str:
+    """SHA-256 over the dataset bytes + embedding model + index format"""
+    digest = hashlib.sha256()
+    digest.update(f"{EMBEDDING_MODEL}|v{INDEX_FORMAT_VERSION}|".encode())
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_write(path: str, writer):
+    """Write via a temp file + os.replace so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    writer(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _embed_questions(questions: list) -> np.ndarray:
+    batches = []
+    for i in range(0, len(questions), EMBED_BATCH_SIZE):
+        batches.append(embedding_service.encode(questions[i:i + EMBED_BATCH_SIZE], use_cache=False))
+        if (i // EMBED_BATCH_SIZE) % 10 == 0:
+            print(f"    Progress: {min(i + EMBED_BATCH_SIZE, len(questions))}/{len(questions)}")
+    return np.vstack(batches).astype('float32')
+
+
+def _create_index(embeddings: np.ndarray, index_type: str):
+    import faiss
+
+    count, dimension = embeddings.shape
+
+    if index_type == "ivfpq" and count >= IVFPQ_MIN_VECTORS:
+        nlist = max(1, int(4 * math.sqrt(count)))
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, IVFPQ_SUBQUANTIZERS, IVFPQ_BITS)
+        index.train(embeddings)
+        index.add(embeddings)
+        index.nprobe = IVFPQ_NPROBE
+        return index, "ivfpq"
+
+    if index_type in ("hnsw", "ivfpq"):
+        if index_type == "ivfpq":
+            print(f"  ⚠️ {count} vectors is too few for IVF-PQ, using HNSW")
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.add(embeddings)
+        return index, "hnsw"
+
+    index = faiss.IndexFlatL2(dimension)
+    index.add(embeddings)
+    return index, "flat"
+
+
+def build_index(data: list, data_path: str, index_type: str = INDEX_TYPE) -> dict:
+    """
+    Embed all questions, build the index and persist everything
+
+    Returns:
+        The written manifest
+    """
+    import faiss
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    start = time.time()
+
+    print(f"  🔨 Generating embeddings for {len(data)} questions...")
+    embeddings = _embed_questions([item['question'] for item in data])
+
+    print(f"  🔨 Building {index_type} index...")
+    index, built_type = _create_index(embeddings, index_type)
+
+    def write_embeddings(path):
+        with open(path, 'wb') as f:
+            np.save(f, embeddings)
+
+    _atomic_write(EMBEDDINGS_PATH, write_embeddings)
+    _atomic_write(INDEX_PATH, lambda path: faiss.write_index(index, path))
+
+    manifest = {
+        "content_hash": content_hash(data_path),
+        "model": EMBEDDING_MODEL,
+        "requested_type": index_type,
+        "index_type": built_type,
+        "params": _index_params(built_type),
+        "count": int(embeddings.shape[0]),
+        "dimension": int(embeddings.shape[1]),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "build_seconds": round(time.time() - start, 1)
+    }
+
+    def write_manifest(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    # Manifest last - it is what marks the index as valid
+    _atomic_write(MANIFEST_PATH, write_manifest)
+
+    print(f"  💾 Offline index saved ({built_type}, {manifest['count']} vectors, {manifest['build_seconds']}s)")
+    return manifest
+
+
+def _manifest_is_valid(manifest, data_path: str, index_type: str) -> bool:
+    return (
+        manifest is not None
+        and manifest.get("requested_type") == index_type
+        and manifest.get("content_hash") == content_hash(data_path)
+        and os.path.exists(INDEX_PATH)
+        and os.path.exists(EMBEDDINGS_PATH)
+    )
+
+
+def _read_index_mmap(path: str):
+    import faiss
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Not every index type supports mmap - fall back to a normal read
+        return faiss.read_index(path)
+
+
+class OfflineIndex:
+    """Loaded index + memory-mapped embeddings"""
+
+    def __init__(self, index, embeddings: np.ndarray, manifest: dict):
+        self.index = index
+        self.embeddings = embeddings
+        self.manifest = manifest
+        self.index_type = manifest["index_type"]
+
+        if self.index_type == "hnsw":
+            self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        elif self.index_type == "ivfpq":
+            self.index.nprobe = IVFPQ_NPROBE
+
+    def search(self, query_embedding: np.ndarray, top_k: int):
+        """
+        Nearest questions by squared L2 distance (same scale as IndexFlatL2)
+
+        Returns:
+            (distances, indices) arrays of shape (top_k,)
+        """
+        query = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+
+        if self.index_type != "ivfpq":
+            distances, indices = self.index.search(query, top_k)
+            return distances[0], indices[0]
+
+        # PQ distances are approximate - re-rank candidates exactly
+        distances, indices = self.index.search(query, top_k * IVFPQ_RERANK_FACTOR)
+        candidates = indices[0][indices[0] >= 0]
+        exact = ((self.embeddings[candidates] - query) ** 2).sum(axis=1)
+        order = np.argsort(exact)[:top_k]
+        return exact[order], candidates[order]
+
+
+def load_or_build(data: list, data_path: str, index_type: str = INDEX_TYPE) -> OfflineIndex:
+    """Memory-map the persisted index, rebuilding it if the dataset changed"""
+    manifest = _read_manifest()
+
+    if _manifest_is_valid(manifest, data_path, index_type):
+        print(f"  📦 Loading persisted {manifest['index_type']} index ({manifest['count']} vectors)...")
+    else:
+        if manifest is not None:
+            print("  ♻️ Offline index is stale (dataset or settings changed), rebuilding...")
+        manifest = build_index(data, data_path, index_type)
+
+    embeddings = np.load(EMBEDDINGS_PATH, mmap_mode='r')
+    index = _read_index_mmap(INDEX_PATH)
+    return OfflineIndex(index, embeddings, manifest)
+
+
+def index_status() -> dict:
+    manifest = _read_manifest()
+    return {
+        "index_dir": INDEX_DIR,
+        "index_exists": os.path.exists(INDEX_PATH),
+        "index_type": manifest.get("index_type") if manifest else None,
+        "vectors": manifest.get("count") if manifest else 0,
+        "built_at": manifest.get("built_at") if manifest else None
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from chatbot_backend.tools.offline_retrieval import DATA_PATH
+
+    parser = argparse.ArgumentParser(description="Build the persistent offline ANN index")
+    parser.add_argument("--type", default=INDEX_TYPE, choices=["hnsw", "ivfpq", "flat"])
+    parser.add_argument("--data", default=DATA_PATH)
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    build_index(dataset, args.data, args.type)
@@ -3,43 +3,40 @@ Offline Retrieval-Based Chatbot System
 Uses FAISS vector search for fast semantic similarity matching
 Works without internet connection - fallback for when LLM/APIs are unavailable
 
-OPTIMIZATION: Pre-computes and caches embeddings to avoid recalculating on every start
+OPTIMIZATION: The ANN index + embeddings are persisted (tools/offline_index.py)
+and memory-mapped at startup instead of being rebuilt on every boot
+Embeddings come from the shared embedding service (same model instance as RAG)
 """
 
 import json
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 import os
-import pickle
+from chatbot_backend.rag import embedding_service
+from chatbot_backend.tools import offline_index
 
 # Lazy load heavy dependencies
-_model = None
 _index = None
 _data = None
-_embeddings = None
 _initialized = False
 
 # Data path
 DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'finaldata_dipsiv.json')
-CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'offline_cache.pkl')
 
 
 def _lazy_init():
-    """Lazy initialization of model and index with caching"""
-    global _model, _index, _data, _embeddings, _initialized
+    """Lazy initialization of model and persisted index"""
+    global _index, _data, _initialized
     
     if _initialized:
         return True
     
     try:
-        from sentence_transformers import SentenceTransformer
-        import faiss
-        
         print("🔄 Initializing Offline Retrieval System...")
         
-        # Load model (smaller, faster model for offline use)
+        # Shared model (already loaded if the RAG retriever is up)
         print("  📦 Loading embedding model...")
-        _model = SentenceTransformer('all-MiniLM-L6-v2')
+        embedding_service.get_model()
         
         # Load dataset
         print(f"  📂 Loading dataset from: {DATA_PATH}")
@@ -52,55 +49,8 @@ def _lazy_init():
         
         print(f"  ✅ Loaded {len(_data)} Q&A pairs")
         
-        # Check for cached embeddings
-        if os.path.exists(CACHE_PATH):
-            print("  📦 Loading cached embeddings...")
-            try:
-                with open(CACHE_PATH, 'rb') as f:
-                    cache = pickle.load(f)
-                    if cache.get('data_hash') == len(_data):  # Simple validation
-                        _embeddings = cache['embeddings']
-                        print(f"  ✅ Loaded cached embeddings ({len(_embeddings)} vectors)")
-            except Exception as e:
-                print(f"  ⚠️ Cache load failed: {e}")
-                _embeddings = None
-        
-        # Generate embeddings if not cached
-        if _embeddings is None:
-            print("  🔨 Generating embeddings (this may take a few minutes first time)...")
-            questions = [item['question'] for item in _data]
-            
-            # Encode in batches to show progress and avoid memory issues
-            batch_size = 512
-            all_embeddings = []
-            for i in range(0, len(questions), batch_size):
-                batch = questions[i:i+batch_size]
-                batch_embeddings = _model.encode(batch, show_progress_bar=False)
-                all_embeddings.append(batch_embeddings)
-                if (i // batch_size) % 10 == 0:
-                    print(f"    Progress: {min(i + batch_size, len(questions))}/{len(questions)}")
-            
-            _embeddings = np.vstack(all_embeddings).astype('float32')
-            
-            # Cache embeddings for faster future loading
-            print("  💾 Caching embeddings for faster startup...")
-            try:
-                with open(CACHE_PATH, 'wb') as f:
-                    pickle.dump({
-                        'embeddings': _embeddings,
-                        'data_hash': len(_data)
-                    }, f)
-                print("  ✅ Embeddings cached!")
-            except Exception as e:
-                print(f"  ⚠️ Could not cache embeddings: {e}")
-        
-        _embeddings = _embeddings.astype('float32')
-        
-        # Build FAISS index
-        print("  🔨 Building FAISS index...")
-        dimension = _embeddings.shape[1]
-        _index = faiss.IndexFlatL2(dimension)
-        _index.add(_embeddings)
+        # Memory-map the persisted ANN index (built once, validated by content hash)
+        _index = offline_index.load_or_build(_data, DATA_PATH)
         
         _initialized = True
         print("  ✅ Offline Retrieval System ready!")
@@ -122,7 +72,7 @@ def get_offline_status() -> Dict:
         "initialized": _initialized,
         "data_path": DATA_PATH,
         "data_exists": os.path.exists(DATA_PATH),
-        "cache_exists": os.path.exists(CACHE_PATH),
+        **offline_index.index_status(),
         "qa_pairs": len(_data) if _data else 0
     }
 
@@ -151,14 +101,14 @@ def search_offline(query: str, top_k: int = 3) -> List[Dict]:
     
     try:
         # Encode query
-        query_embedding = _model.encode([query]).astype('float32')
+        query_embedding = embedding_service.embed_query(query)
         
         # Search in FAISS index
         distances, indices = _index.search(query_embedding, top_k)
         
         # Prepare results
         results = []
-        for idx, dist in zip(indices[0], distances[0]):
+        for idx, dist in zip(indices, distances):
             if idx < 0 or idx >= len(_data):
                 continue
             
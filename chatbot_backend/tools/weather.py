@@ -1,11 +1,182 @@
-import requests
 import os
+import threading
+import time
+from datetime import datetime
+
+from chatbot_backend.geo import gazetteer, geohash
+from chatbot_backend.net import http_client
+from chatbot_backend.net.swr_cache import SWRCache
 
 # Use environment variable (no fallback - must be configured)
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
 
 BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
 
+# Weather cache - users in the same ~5 km geohash cell (or asking for the same
+# place name) share one OpenWeatherMap call per 10 minutes; concurrent misses
+# for one key coalesce into a single upstream request. A key is served stale
+# (while one refresh runs) for at most 2 minutes past its TTL, so no answer
+# is more than 12 minutes old.
+WEATHER_CACHE_TTL = 10 * 60
+WEATHER_STALE_TTL = 2 * 60
+GEOHASH_PRECISION = 5
+_weather_cache = SWRCache("weather", max_entries=4096, ttl=WEATHER_CACHE_TTL, stale_ttl=WEATHER_STALE_TTL)
+
+# Pre-warmer - keeps the most requested places fresh before they expire
+PREWARM_TOP_N = int(os.getenv("WEATHER_PREWARM_TOP_N", "50"))
+PREWARM_INTERVAL = 8 * 60   # < WEATHER_CACHE_TTL, so warm keys never go stale
+
+_demand = {}                # cache key -> {"score": float, "params": dict}
+_demand_lock = threading.Lock()
+
+_prewarm_running = False
+_prewarm_thread = None
+_prewarm_stats = {"cycles": 0, "warmed": 0, "errors": 0, "last_run": None}
+
+def _build_weather_params(location: str = None, lat: float = None, lng: float = None, language: str = "en"):
+    """Build OpenWeatherMap query params - lat/lng preferred, location name as fallback"""
+    if lat is not None and lng is not None:
+        return {
+            "lat": lat,
+            "lon": lng,
+            "appid": OPENWEATHER_API_KEY,
+            "units": "metric",
+            "lang": language
+        }
+    if location:
+        return {
+            "q": f"{location},IN",
+            "appid": OPENWEATHER_API_KEY,
+            "units": "metric",
+            "lang": language
+        }
+    return None
+
+
+def _weather_key(location: str = None, lat: float = None, lng: float = None, language: str = "en"):
+    """
+    (cache key, OpenWeatherMap params) for a lookup, or (None, None)
+    
+    Coordinates are snapped to the centre of their geohash cell so every
+    user in the cell maps to the same key and the same upstream query.
+    Place names known to the offline gazetteer are turned into coordinates
+    locally (no OpenWeatherMap geocoding, and they share the cell's entry).
+    """
+    if (lat is None or lng is None) and location:
+        try:
+            coords = gazetteer.geocode(location)
+        except Exception as e:
+            print(f"   ⚠️ Gazetteer lookup failed: {e}")
+            coords = None
+        if coords:
+            lat, lng = coords
+    
+    if lat is not None and lng is not None:
+        cell = geohash.encode(lat, lng, GEOHASH_PRECISION)
+        cell_lat, cell_lng = geohash.decode(cell)
+        params = _build_weather_params(None, round(cell_lat, 4), round(cell_lng, 4), language)
+        return f"gh:{cell}:{language}", params
+    if location:
+        name = " ".join(location.lower().split())
+        return f"loc:{name}:{language}", _build_weather_params(name, language=language)
+    return None, None
+
+
+def _record_demand(key: str, params: dict):
+    with _demand_lock:
+        entry = _demand.setdefault(key, {"score": 0.0, "params": params})
+        entry["score"] += 1
+
+
+def _fetch_weather(params: dict) -> dict:
+    response = http_client.get(BASE_URL, params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _fetch_weather_async(params: dict) -> dict:
+    response = await http_client.aget(BASE_URL, params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def _missing_location_response():
+    return {
+        "type": "weather",
+        "summary": "Location not provided",
+        "details": {"error": "Either location name or lat/lng coordinates are required"},
+        "advisory": ["Please provide your location for weather information"],
+        "confidence": 0.0,
+        "source": "OpenWeatherMap API"
+    }
+
+
+def _weather_error_response(location: str, error: Exception):
+    return {
+        "type": "weather",
+        "summary": f"Failed to fetch weather data for {location}",
+        "details": {"error": str(error)},
+        "advisory": ["Check internet connection and try again"],
+        "confidence": 0.0,
+        "source": "OpenWeatherMap API"
+    }
+
+
+def _format_weather_response(data: dict):
+    """Turn raw OpenWeatherMap JSON into the standardized AI response"""
+
+    # Extract weather info
+    temp = round(data["main"]["temp"])
+    humidity = data["main"]["humidity"]
+    condition = data["weather"][0]["main"]
+    description = data["weather"][0]["description"]
+    wind = round(data["wind"]["speed"])
+    rain_chance = data.get("clouds", {}).get("all", 0)
+
+    # Generate advisory based on weather
+    advisory = []
+    if rain_chance > 70:
+        advisory.append("High chance of rain. Postpone spraying pesticides.")
+        advisory.append("Ensure proper drainage in fields.")
+    elif rain_chance > 40:
+        advisory.append("Moderate rain expected. Plan irrigation accordingly.")
+    
+    if temp > 35:
+        advisory.append("High temperature. Increase irrigation frequency.")
+        advisory.append("Monitor crops for heat stress.")
+    elif temp < 10:
+        advisory.append("Low temperature. Protect sensitive crops from cold.")
+    
+    if humidity > 80:
+        advisory.append("High humidity. Monitor for fungal diseases.")
+    elif humidity < 30:
+        advisory.append("Low humidity. Increase irrigation.")
+    
+    if wind > 20:
+        advisory.append("Strong winds. Secure crop covers and structures.")
+
+    if not advisory:
+        advisory.append("Weather conditions are favorable for farming activities.")
+
+    # Build standardized response
+    return {
+        "type": "weather",
+        "summary": f"{condition} in {data.get('name')}: {temp}°C, {humidity}% humidity, {description}",
+        "details": {
+            "location": data.get("name"),
+            "temperature": temp,
+            "humidity": humidity,
+            "condition": condition,
+            "description": description,
+            "wind_speed": wind,
+            "rain_probability": rain_chance
+        },
+        "advisory": advisory,
+        "confidence": 1.0,
+        "source": "OpenWeatherMap API"
+    }
+
+
 def get_weather(location: str = None, lat: float = None, lng: float = None, language: str = "en"):
     """
     Fetches weather data and returns standardized AI response.
@@ -22,94 +193,114 @@ def get_weather(location: str = None, lat: float = None, lng: float = None, lang
     """
 
     try:
-        # Use lat/lng if provided for more accurate weather
-        if lat is not None and lng is not None:
-            params = {
-                "lat": lat,
-                "lon": lng,
-                "appid": OPENWEATHER_API_KEY,
-                "units": "metric",
-                "lang": language
-            }
-        elif location:
-            params = {
-                "q": f"{location},IN",
-                "appid": OPENWEATHER_API_KEY,
-                "units": "metric",
-                "lang": language
-            }
-        else:
-            return {
-                "type": "weather",
-                "summary": "Location not provided",
-                "details": {"error": "Either location name or lat/lng coordinates are required"},
-                "advisory": ["Please provide your location for weather information"],
-                "confidence": 0.0,
-                "source": "OpenWeatherMap API"
-            }
-
-        response = requests.get(BASE_URL, params=params, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-
-        # Extract weather info
-        temp = round(data["main"]["temp"])
-        humidity = data["main"]["humidity"]
-        condition = data["weather"][0]["main"]
-        description = data["weather"][0]["description"]
-        wind = round(data["wind"]["speed"])
-        rain_chance = data.get("clouds", {}).get("all", 0)
-
-        # Generate advisory based on weather
-        advisory = []
-        if rain_chance > 70:
-            advisory.append("High chance of rain. Postpone spraying pesticides.")
-            advisory.append("Ensure proper drainage in fields.")
-        elif rain_chance > 40:
-            advisory.append("Moderate rain expected. Plan irrigation accordingly.")
-        
-        if temp > 35:
-            advisory.append("High temperature. Increase irrigation frequency.")
-            advisory.append("Monitor crops for heat stress.")
-        elif temp < 10:
-            advisory.append("Low temperature. Protect sensitive crops from cold.")
-        
-        if humidity > 80:
-            advisory.append("High humidity. Monitor for fungal diseases.")
-        elif humidity < 30:
-            advisory.append("Low humidity. Increase irrigation.")
-        
-        if wind > 20:
-            advisory.append("Strong winds. Secure crop covers and structures.")
-
-        if not advisory:
-            advisory.append("Weather conditions are favorable for farming activities.")
-
-        # Build standardized response
-        return {
-            "type": "weather",
-            "summary": f"{condition} in {data.get('name')}: {temp}°C, {humidity}% humidity, {description}",
-            "details": {
-                "location": data.get("name"),
-                "temperature": temp,
-                "humidity": humidity,
-                "condition": condition,
-                "description": description,
-                "wind_speed": wind,
-                "rain_probability": rain_chance
-            },
-            "advisory": advisory,
-            "confidence": 1.0,
-            "source": "OpenWeatherMap API"
-        }
+        key, params = _weather_key(location, lat, lng, language)
+        if key is None:
+            return _missing_location_response()
+
+        _record_demand(key, params)
+        data = _weather_cache.get(key, lambda: _fetch_weather(params))
+
+        return _format_weather_response(data)
 
     except Exception as e:
-        return {
-            "type": "weather",
-            "summary": f"Failed to fetch weather data for {location}",
-            "details": {"error": str(e)},
-            "advisory": ["Check internet connection and try again"],
-            "confidence": 0.0,
-            "source": "OpenWeatherMap API"
-        }
+        return _weather_error_response(location, e)
+
+
+async def get_weather_async(location: str = None, lat: float = None, lng: float = None, language: str = "en"):
+    """
+    Async version of get_weather() - same arguments and response shape,
+    but the OpenWeatherMap call does not block the event loop.
+    """
+
+    try:
+        key, params = _weather_key(location, lat, lng, language)
+        if key is None:
+            return _missing_location_response()
+
+        _record_demand(key, params)
+        data = await _weather_cache.aget(key, lambda: _fetch_weather_async(params))
+
+        return _format_weather_response(data)
+
+    except Exception as e:
+        return _weather_error_response(location, e)
+
+
+# =========================================================
+# Pre-warmer
+# =========================================================
+
+def _top_demand() -> list:
+    """Top-N (key, params) by demand; scores decay so old favourites fade"""
+    with _demand_lock:
+        ranked = sorted(_demand.items(), key=lambda item: item[1]["score"], reverse=True)
+        top = [(key, entry["params"]) for key, entry in ranked[:PREWARM_TOP_N]]
+        for key in list(_demand):
+            _demand[key]["score"] /= 2
+            if _demand[key]["score"] < 0.1:
+                del _demand[key]
+    return top
+
+
+def prewarm_once() -> int:
+    """Refresh the most requested places now; returns entries warmed"""
+    warmed = 0
+    for key, params in _top_demand():
+        try:
+            _weather_cache.set(key, _fetch_weather(params))
+            warmed += 1
+        except Exception as e:
+            _prewarm_stats["errors"] += 1
+            print(f"   ⚠️ Weather pre-warm failed for {key}: {e}")
+    _prewarm_stats["cycles"] += 1
+    _prewarm_stats["warmed"] += warmed
+    _prewarm_stats["last_run"] = datetime.now().isoformat(timespec="seconds")
+    return warmed
+
+
+def _prewarm_worker():
+    """Background worker: re-fetch the top-N places every PREWARM_INTERVAL"""
+    print(f"🔄 Weather pre-warmer started (top {PREWARM_TOP_N}, every {PREWARM_INTERVAL // 60} min)")
+    while _prewarm_running:
+        # Sleep in small intervals to allow graceful shutdown
+        for _ in range(PREWARM_INTERVAL):
+            if not _prewarm_running:
+                break
+            time.sleep(1)
+        if _prewarm_running:
+            warmed = prewarm_once()
+            if warmed:
+                print(f"🌤️ [{datetime.now().strftime('%H:%M:%S')}] Pre-warmed weather for {warmed} places")
+    print("🛑 Weather pre-warmer stopped")
+
+
+def start_weather_prewarmer() -> dict:
+    global _prewarm_running, _prewarm_thread
+
+    if _prewarm_running:
+        return {"status": "already_running"}
+    if not OPENWEATHER_API_KEY or PREWARM_TOP_N <= 0:
+        return {"status": "disabled"}
+
+    _prewarm_running = True
+    _prewarm_thread = threading.Thread(target=_prewarm_worker, daemon=True)
+    _prewarm_thread.start()
+
+    return {"status": "started", "top_n": PREWARM_TOP_N, "interval": PREWARM_INTERVAL}
+
+
+def stop_weather_prewarmer() -> dict:
+    global _prewarm_running
+    _prewarm_running = False
+    return {"status": "stopped"}
+
+
+def get_weather_cache_stats() -> dict:
+    """Cache counters plus pre-warmer state"""
+    with _demand_lock:
+        tracked = len(_demand)
+    return {
+        **_weather_cache.stats(),
+        "geohash_precision": GEOHASH_PRECISION,
+        "prewarm": {"running": _prewarm_running, "top_n": PREWARM_TOP_N, "tracked_keys": tracked, **_prewarm_stats}
+    }
@@ -6,14 +6,19 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-import pandas as pd
 from typing import Optional
-import os
 
 from utils.predict import (
     predict_next_day_price,
-    forecast_summary
+    forecast_summary,
+    forecast_batch,
+    summarize_forecast
 )
+from utils.forecast_table import ForecastStore
+from utils.onnx_backend import get_sessions
+from utils.registry import get_registry
+from utils.series_index import SeriesIndex
+from utils.dataset import DATA_PATH, load_price_data
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -31,43 +36,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load data once at startup
-DATA_PATH = "data/Agriculture_price_dataset.csv"
-if os.path.exists("croppricedata/Agriculture_price_dataset.csv"):
-    DATA_PATH = "croppricedata/Agriculture_price_dataset.csv"
-
-print(f"Loading data from {DATA_PATH}...")
-df = pd.read_csv(DATA_PATH)
-
-# Data preprocessing
-df.rename(columns={
-    'Price Date': 'Date',
-    'Modal_Price': 'Price',
-    'Market Name': 'Market',
-    'District Name': 'District'
-}, inplace=True)
-
-df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
-df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
-df = df.dropna(subset=['Date', 'Price'])
-
-# Normalize state names
-df['STATE'] = df['STATE'].str.strip()
-state_map = {
-    'Chattisgarh': 'Chhattisgarh',
-    'Orissa': 'Odisha',
-    'Uttrakhand': 'Uttarakhand',
-    'Tamilnadu': 'Tamil Nadu',
-    'Jammu & Kashmir': 'Jammu and Kashmir'
-}
-df['STATE'] = df['STATE'].replace(state_map)
-
-print(f"Data loaded successfully! Shape: {df.shape}")
+# Load data once at startup and index it per (crop, state) -
+# requests look their daily series up instead of scanning the frame
+series = SeriesIndex(load_price_data(DATA_PATH))
+print(f"Series index built: {series.stats()}")
+
+# Scan the models directory once; models are deserialized into an LRU
+registry = get_registry()
+print(f"Model registry: {registry.status()['models']} models in {registry.models_dir}")
+
+# Precomputed 30-day forecasts (loaded from disk, kept fresh by a background job)
+forecasts = ForecastStore()
+print(f"Forecast table: {len(forecasts.table)} series in {forecasts.path}")
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+@app.on_event("startup")
+def preload_models():
+    """Deserialize the most used models before the first request"""
+    loaded = registry.preload()
+    if loaded:
+        print(f"Preloaded {len(loaded)} models: {', '.join(loaded)}")
+
+
+@app.on_event("startup")
+def schedule_forecast_table():
+    """Materialize stale forecasts now and every FORECAST_REFRESH_SECONDS"""
+    forecasts.start_schedule(lambda: series, registry)
+
+
+@app.on_event("shutdown")
+def save_model_usage():
+    registry.save_usage()
+
+
 @app.get("/")
 def read_root():
     """Serve frontend"""
@@ -84,31 +88,65 @@ def api_root():
         "endpoints": {
             "predict": "/api/predict?crop={crop}&state={state}",
             "forecast": "/api/forecast?crop={crop}&state={state}&days={days}",
+            "forecast_batch": "/api/forecast/batch?crop={crop}[&states=A,B] or ?state={state}[&crops=A,B]",
             "crops": "/api/crops",
-            "states": "/api/states"
+            "states": "/api/states",
+            "models": "/api/models",
+            "refresh": "/api/refresh (POST)"
         }
     }
 
 
 @app.get("/api/crops")
 def get_crops():
-    """Get list of available crops"""
-    crops = ['Potato', 'Onion', 'Wheat', 'Tomato', 'Rice']
+    """Get list of crops that have a trained model and price data"""
+    crops = [crop for crop in registry.crops() if _states_for(crop)]
     return {"crops": crops}
 
 
 @app.get("/api/states")
 def get_states(crop: Optional[str] = None):
-    """Get list of available states, optionally filtered by crop"""
+    """Get list of states that have a trained model and price data, optionally filtered by crop"""
     if crop:
-        states = df[df['Commodity'] == crop]['STATE'].unique().tolist()
+        states = _states_for(crop)
     else:
-        states = df['STATE'].unique().tolist()
-    
-    states.sort()
+        states = sorted({state for c in registry.crops() for state in _states_for(c)})
     return {"states": states}
 
 
+def _states_for(crop: str) -> list:
+    """States with both a model and price data for crop"""
+    with_data = set(series.states(crop))
+    return [state for state in registry.states(crop) if state in with_data]
+
+
+def _crops_for(state: str) -> list:
+    """Crops with both a model and price data in state"""
+    return [crop for crop in registry.crops() if registry.has_model(crop, state) and (crop, state) in series]
+
+
+@app.get("/api/models")
+def get_models():
+    """Model catalogue (crop, state, mtime, size, feature schema) and cache stats"""
+    return {
+        "registry": registry.status(),
+        "series": series.stats(),
+        "forecast_table": forecasts.status(),
+        "onnx": get_sessions().status(),
+        "models": registry.catalogue()
+    }
+
+
+@app.post("/api/refresh")
+def refresh_data():
+    """Re-read the price dataset, rebuild the series index, rescan models and re-materialize forecasts"""
+    global series
+    series = SeriesIndex(load_price_data(DATA_PATH))
+    registry.scan()
+    job = forecasts.refresh_async(lambda: series, registry)
+    return {"success": True, "series": series.stats(), "registry": registry.status(), "forecast_table": job}
+
+
 @app.get("/api/predict")
 def predict(crop: str, state: str):
     """
@@ -120,9 +158,12 @@ def predict(crop: str, state: str):
     
     Returns:
     - Predicted price for next day
+    
+    Always scored live on one feature row (ONNX session, pickle fallback);
+    the forecast table serves the multi-day endpoints.
     """
     try:
-        price = predict_next_day_price(df, crop, state)
+        price = predict_next_day_price(series, crop, state)
         return {
             "success": True,
             "crop": crop,
@@ -160,7 +201,12 @@ def forecast(crop: str, state: str, days: int = 7):
         )
     
     try:
-        summary = forecast_summary(df, crop, state, days)
+        # Served from the precomputed table unless its row is missing or stale
+        stored = forecasts.lookup(series, registry, crop, state, days)
+        if stored:
+            summary = summarize_forecast(crop, state, days, stored)
+        else:
+            summary = forecast_summary(series, crop, state, days)
         summary['success'] = True
         summary['unit'] = "₹ per quintal"
         return summary
@@ -173,6 +219,61 @@ def forecast(crop: str, state: str, days: int = 7):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+
+@app.get("/api/forecast/batch")
+def forecast_many(
+    crop: Optional[str] = None,
+    state: Optional[str] = None,
+    states: Optional[str] = None,
+    crops: Optional[str] = None,
+    days: int = 7
+):
+    """
+    Forecast one crop across many states, or one state across many crops
+    
+    Parameters:
+    - crop + states (comma-separated, default: all states with a model), or
+    - state + crops (comma-separated, default: all crops with a model)
+    - days: Number of days to forecast (default: 7, max: 30)
+    
+    Returns:
+    - One forecast summary per series, plus the series that could not be forecast
+    """
+    if days < 1 or days > 30:
+        raise HTTPException(status_code=400, detail="Days must be between 1 and 30")
+    if bool(crop) == bool(state):
+        raise HTTPException(status_code=400, detail="Give either crop or state")
+    
+    if crop:
+        names = [s.strip() for s in states.split(",") if s.strip()] if states else _states_for(crop)
+        pairs = [(crop, name) for name in names]
+    else:
+        names = [c.strip() for c in crops.split(",") if c.strip()] if crops else _crops_for(state)
+        pairs = [(name, state) for name in names]
+    
+    if not pairs:
+        raise HTTPException(status_code=404, detail="No models found for this selection")
+    
+    # Fresh rows come from the table; the rest are forecast together
+    stored = {pair: forecasts.lookup(series, registry, *pair, days) for pair in pairs}
+    computed, errors = forecast_batch(series, [pair for pair in pairs if not stored[pair]], days)
+    by_pair = {(s["crop"], s["state"]): s for s in computed}
+    summaries = [
+        summarize_forecast(*pair, days, stored[pair]) if stored[pair] else by_pair[pair]
+        for pair in pairs if stored[pair] or pair in by_pair
+    ]
+    return {
+        "success": True,
+        "crop": crop,
+        "state": state,
+        "days": days,
+        "unit": "₹ per quintal",
+        "count": len(summaries),
+        "forecasts": summaries,
+        "errors": errors
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
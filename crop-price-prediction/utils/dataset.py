@@ -0,0 +1,189 @@
+"""
+Price dataset loading with a columnar binary cache
+
+The raw CSV needs dayfirst date parsing, renames and state normalization
+on every start, and keeps every string column as Python objects. The first
+load writes the normalized frame to an uncompressed Feather (Arrow IPC)
+file next to the CSV:
+
+- Commodity / STATE / Market / District as categoricals (dictionary-encoded)
+- Date as int32 days since 1970-01-01
+- Price as float32 (float64 if some price would not round-trip exactly,
+  so forecasts never change)
+
+Later starts memory-map that file. It is rebuilt when the CSV's size or
+mtime no longer match what the cache was built from. Build it ahead of
+time (e.g. in the Render build step) with:
+
+    python -m utils.dataset
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = "data/Agriculture_price_dataset.csv"
+if os.path.exists("croppricedata/Agriculture_price_dataset.csv"):
+    DATA_PATH = "croppricedata/Agriculture_price_dataset.csv"
+
+CACHE_FORMAT_VERSION = 1
+METADATA_KEY = b"price_cache"
+
+CATEGORICAL_COLUMNS = ['Commodity', 'STATE', 'Market', 'District']
+
+# Resolution pd.to_datetime gives parsed dates (ns on pandas 2, us on 3).
+# Cached dates are restored in the same unit - time interpolation rounds
+# differently per unit, and the daily series must not depend on the source.
+DATE_DTYPE = pd.to_datetime(pd.Series(["01-01-2000"]), dayfirst=True).dtype
+
+state_map = {
+    'Chattisgarh': 'Chhattisgarh',
+    'Orissa': 'Odisha',
+    'Uttrakhand': 'Uttarakhand',
+    'Tamilnadu': 'Tamil Nadu',
+    'Jammu & Kashmir': 'Jammu and Kashmir'
+}
+
+
+def cache_path(csv_path: str = DATA_PATH) -> str:
+    return os.path.splitext(csv_path)[0] + ".feather"
+
+
+def read_csv(path: str = DATA_PATH) -> pd.DataFrame:
+    """Read and clean the raw price CSV"""
+    df = pd.read_csv(path)
+
+    # Data preprocessing
+    df.rename(columns={
+        'Price Date': 'Date',
+        'Modal_Price': 'Price',
+        'Market Name': 'Market',
+        'District Name': 'District'
+    }, inplace=True)
+
+    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
+    df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
+    df = df.dropna(subset=['Date', 'Price'])
+
+    # Normalize state names
+    df['STATE'] = df['STATE'].str.strip()
+    df['STATE'] = df['STATE'].replace(state_map)
+
+    return df
+
+
+def _source_stamp(csv_path: str) -> dict:
+    st = os.stat(csv_path)
+    return {"version": CACHE_FORMAT_VERSION, "source_size": st.st_size, "source_mtime": st.st_mtime}
+
+
+def _to_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalized frame in compact dtypes (Date as int32 days)"""
+    df = df.reset_index(drop=True)
+    columns = {}
+    for name in CATEGORICAL_COLUMNS:
+        if name in df:
+            columns[name] = df[name].astype('category')
+
+    days = df['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    columns['Date'] = days.astype(np.int32)
+
+    prices = df['Price'].to_numpy(dtype=np.float64)
+    as_float32 = prices.astype(np.float32)
+    lossless = np.array_equal(as_float32.astype(np.float64), prices)
+    columns['Price'] = as_float32 if lossless else prices
+
+    return pd.DataFrame(columns)
+
+
+def _with_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """int32 day numbers back to a datetime64 Date column"""
+    df['Date'] = df['Date'].to_numpy(dtype=np.int64).astype('datetime64[D]').astype(DATE_DTYPE)
+    return df
+
+
+def write_cache(columnar: pd.DataFrame, csv_path: str = DATA_PATH) -> str:
+    """Write the compact frame + source stamp (temp file + rename)"""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    table = pa.Table.from_pandas(columnar, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(_source_stamp(csv_path)).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    path = cache_path(csv_path)
+    tmp_path = f"{path}.tmp"
+    # Uncompressed so the file can be memory-mapped without decoding
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_cache(csv_path: str = DATA_PATH):
+    """
+    Memory-mapped cached frame, or None when missing, stale or unreadable
+
+    Date comes back as datetime64 and Price as float32/float64; the
+    categorical columns stay categorical.
+    """
+    path = cache_path(csv_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        import pyarrow as pa
+
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            stamp = json.loads((reader.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+            if os.path.exists(csv_path) and stamp != _source_stamp(csv_path):
+                print(f"Price cache {path} is stale, rebuilding from CSV")
+                return None
+            df = reader.read_all().to_pandas()
+    except Exception as e:
+        print(f"Could not read price cache {path}: {e}")
+        return None
+
+    return _with_dates(df)
+
+
+def load_price_data(path: str = DATA_PATH) -> pd.DataFrame:
+    """
+    Normalized price frame (Commodity, STATE, Market, District, Date,
+    Price) - from the columnar cache when it is fresh, otherwise from the
+    CSV (refreshing the cache). Same dtypes either way.
+    """
+    start = time.time()
+    df = read_cache(path)
+    if df is not None:
+        print(f"Data loaded from cache in {time.time() - start:.2f}s! Shape: {df.shape}")
+        return df
+
+    print(f"Loading data from {path}...")
+    columnar = _to_columnar(read_csv(path))
+    print(f"Data loaded successfully in {time.time() - start:.2f}s! Shape: {columnar.shape}")
+
+    try:
+        print(f"Price cache written: {write_cache(columnar, path)}")
+    except Exception as e:
+        print(f"Could not write price cache: {e}")
+    return _with_dates(columnar)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the columnar price cache from the CSV")
+    parser.add_argument("--data", default=DATA_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        # Nothing to cache - the app will report the missing dataset itself
+        print(f"Dataset not found: {args.data}, no cache written")
+        raise SystemExit(0)
+
+    frame = _to_columnar(read_csv(args.data))
+    print(f"Wrote {write_cache(frame, args.data)} ({len(frame)} rows, Price {frame['Price'].dtype})")
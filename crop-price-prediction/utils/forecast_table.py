@@ -0,0 +1,327 @@
+"""
+Precomputed forecast table
+
+A recursive forecast only depends on the (crop, state) model and the last
+31 daily prices, so every user asking about Potato/Punjab on the same day
+gets the same answer - and the first k days of the 30-day forecast are the
+k-day forecast. The materialization job therefore runs one 30-day forecast
+per (crop, state) with both a model and price data (all series in lockstep,
+see kernel.forecast_batch) and keeps the results in one keyed table:
+
+- prices: float array (series x 30), rounded like the live forecast
+- last data date, data stamp (hash of the trailing prices) and model
+  stamp (mtime, size of the .pkl) per row
+
+A lookup re-checks both stamps against the current series index and model
+file, so a row goes stale by itself when the data is refreshed or a model
+is replaced; stale or missing rows are answered live by the caller. The job
+runs at startup, after /api/refresh and every FORECAST_REFRESH_SECONDS
+(rescanning models, recomputing only stale rows), and the table is saved
+to FORECAST_TABLE_PATH so a restart serves lookups right away.
+
+    python -m utils.forecast_table    # materialize + save once
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import kernel
+from utils.registry import MODELS_DIR, ModelRegistry
+from utils.series_index import SeriesIndex
+
+HORIZON = 30
+
+TABLE_PATH = os.getenv("FORECAST_TABLE_PATH", os.path.join(MODELS_DIR, "forecast_table.npz"))
+REFRESH_INTERVAL = int(os.getenv("FORECAST_REFRESH_SECONDS", "3600"))
+
+TABLE_FORMAT_VERSION = 1
+
+
+def data_stamp(first: pd.Timestamp, values: np.ndarray) -> int:
+    """Fingerprint of everything a forecast reads from a series (last date + trailing prices)"""
+    last_day = (first + pd.Timedelta(days=len(values) - 1)).date().toordinal()
+    digest = hashlib.blake2b(np.ascontiguousarray(values[-kernel.SPAN:]).tobytes(), digest_size=8)
+    digest.update(last_day.to_bytes(4, "little"))
+    return int.from_bytes(digest.digest(), "little")
+
+
+def model_stamp(path: str) -> Tuple[float, int]:
+    st = os.stat(path)
+    return st.st_mtime, st.st_size
+
+
+class ForecastTable:
+    """Immutable keyed table of 30-day forecasts with per-row version stamps"""
+
+    def __init__(self, keys: List[Tuple[str, str]], prices: np.ndarray, last_days: np.ndarray,
+                 data_stamps: np.ndarray, model_mtimes: np.ndarray, model_sizes: np.ndarray,
+                 built_at: float = 0.0):
+        self.keys = list(keys)
+        self.rows: Dict[Tuple[str, str], int] = {key: i for i, key in enumerate(self.keys)}
+        self.prices = prices
+        self.last_days = last_days
+        self.data_stamps = data_stamps
+        self.model_mtimes = model_mtimes
+        self.model_sizes = model_sizes
+        self.built_at = built_at
+
+    @classmethod
+    def empty(cls) -> "ForecastTable":
+        return cls([], np.empty((0, HORIZON)), np.empty(0, np.int32), np.empty(0, np.uint64),
+                   np.empty(0), np.empty(0, np.int64))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def is_fresh(self, row: int, stamp: int, model: Tuple[float, int]) -> bool:
+        return (
+            int(self.data_stamps[row]) == stamp
+            and float(self.model_mtimes[row]) == model[0]
+            and int(self.model_sizes[row]) == model[1]
+        )
+
+    def forecast(self, row: int, days: int) -> List[Tuple]:
+        """First `days` rows of the stored forecast as (date, price) tuples"""
+        last = date.fromordinal(int(self.last_days[row]))
+        return [
+            (last + timedelta(days=i + 1), price)
+            for i, price in enumerate(self.prices[row, :days].tolist())
+        ]
+
+    # ----- persistence -----
+
+    def save(self, path: str = TABLE_PATH):
+        """Write the table as an uncompressed .npz (temp file + rename)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(TABLE_FORMAT_VERSION),
+                horizon=np.array(HORIZON),
+                built_at=np.array(self.built_at),
+                crops=np.array([c for c, _ in self.keys], dtype=str),
+                states=np.array([s for _, s in self.keys], dtype=str),
+                prices=self.prices,
+                last_days=self.last_days,
+                data_stamps=self.data_stamps,
+                model_mtimes=self.model_mtimes,
+                model_sizes=self.model_sizes,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = TABLE_PATH) -> Optional["ForecastTable"]:
+        """Saved table, or None when missing, unreadable or of another format"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != TABLE_FORMAT_VERSION or int(data["horizon"]) != HORIZON:
+                    return None
+                return cls(
+                    list(zip(data["crops"].tolist(), data["states"].tolist())),
+                    data["prices"], data["last_days"], data["data_stamps"],
+                    data["model_mtimes"], data["model_sizes"], float(data["built_at"])
+                )
+        except Exception as e:
+            print(f"Could not read forecast table {path}: {e}")
+            return None
+
+
+def materialize(series: SeriesIndex, registry: ModelRegistry,
+                previous: Optional[ForecastTable] = None) -> Tuple[ForecastTable, Dict]:
+    """
+    Forecast table for every (crop, state) with a model and price data
+
+    Rows of `previous` whose stamps still match are kept as they are; the
+    rest are forecast together, in chunks of at most registry.max_loaded
+    models so the job never holds more forests than the LRU.
+
+    Returns:
+    - (table, stats) - stats: series, computed, reused, errors, seconds
+    """
+    start = time.time()
+    previous = previous or ForecastTable.empty()
+
+    keep, todo, errors = [], [], []
+    for crop in registry.crops():
+        for state in registry.states(crop):
+            if (crop, state) not in series:
+                continue
+            try:
+                first, values = series.values(crop, state)
+                stamps = (data_stamp(first, values), model_stamp(registry.lookup(crop, state)["path"]))
+            except (OSError, ValueError) as e:
+                errors.append({"crop": crop, "state": state, "error": str(e)})
+                continue
+            row = previous.rows.get((crop, state))
+            if row is not None and previous.is_fresh(row, *stamps):
+                keep.append(((crop, state), row))
+            else:
+                todo.append(((crop, state), first, values, stamps))
+
+    keys = [key for key, _ in keep]
+    prices = [previous.prices[row] for _, row in keep]
+    last_days = [int(previous.last_days[row]) for _, row in keep]
+    data_stamps = [int(previous.data_stamps[row]) for _, row in keep]
+    model_mtimes = [float(previous.model_mtimes[row]) for _, row in keep]
+    model_sizes = [int(previous.model_sizes[row]) for _, row in keep]
+
+    chunk = max(1, registry.max_loaded)
+    for offset in range(0, len(todo), chunk):
+        models, kernels, ready = [], [], []
+        for (crop, state), first, values, stamps in todo[offset:offset + chunk]:
+            last_date = (first + pd.Timedelta(days=len(values) - 1)).date()
+            try:
+                model = registry.get(crop, state, record=False)
+                series_kernel = kernel.ForecastKernel(values, last_date)
+            except (FileNotFoundError, ValueError) as e:
+                errors.append({"crop": crop, "state": state, "error": str(e)})
+                continue
+            models.append(model)
+            kernels.append(series_kernel)
+            ready.append(((crop, state), last_date, stamps))
+
+        for ((crop, state), last_date, (stamp, model)), forecast in zip(
+                ready, kernel.forecast_batch(models, kernels, HORIZON)):
+            keys.append((crop, state))
+            prices.append(np.array([price for _, price in forecast]))
+            last_days.append(last_date.toordinal())
+            data_stamps.append(stamp)
+            model_mtimes.append(model[0])
+            model_sizes.append(model[1])
+
+    table = ForecastTable(
+        keys,
+        np.array(prices, dtype=np.float64).reshape(len(keys), HORIZON),
+        np.array(last_days, dtype=np.int32),
+        np.array(data_stamps, dtype=np.uint64),
+        np.array(model_mtimes, dtype=np.float64),
+        np.array(model_sizes, dtype=np.int64),
+        built_at=time.time()
+    )
+    stats = {
+        "series": len(keys),
+        "computed": len(keys) - len(keep),
+        "reused": len(keep),
+        "errors": errors,
+        "seconds": round(time.time() - start, 2)
+    }
+    return table, stats
+
+
+class ForecastStore:
+    """The current table plus the job that keeps it fresh"""
+
+    def __init__(self, path: str = TABLE_PATH):
+        self.path = path
+        self.table = ForecastTable.load(path) or ForecastTable.empty()
+
+        self._job_lock = threading.Lock()
+        self._pending = False
+        self._stats = {"lookups": 0, "served": 0, "stale": 0, "missing": 0}
+        self._last_run = {"state": "idle", "at": None, "result": None, "error": None}
+
+    def lookup(self, series: SeriesIndex, registry: ModelRegistry, crop: str, state: str,
+               days: int) -> Optional[List[Tuple]]:
+        """
+        Stored (date, price) forecast for the next `days` days, or None when
+        there is no row or its data / model stamp no longer matches
+        """
+        self._stats["lookups"] += 1
+        table = self.table
+        row = table.rows.get((crop, state))
+        if row is None or days > HORIZON:
+            self._stats["missing"] += 1
+            return None
+
+        try:
+            first, values = series.values(crop, state)
+            fresh = table.is_fresh(row, data_stamp(first, values),
+                                   model_stamp(registry.lookup(crop, state)["path"]))
+        except (OSError, ValueError):
+            fresh = False
+        if not fresh:
+            self._stats["stale"] += 1
+            return None
+
+        self._stats["served"] += 1
+        return table.forecast(row, days)
+
+    def refresh(self, series: SeriesIndex, registry: ModelRegistry) -> Dict:
+        """Recompute stale / missing rows, swap the table in and save it"""
+        table, stats = materialize(series, registry, self.table)
+        self.table = table
+        try:
+            table.save(self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save forecast table: {e}")
+        return stats
+
+    def refresh_async(self, get_series: Callable[[], SeriesIndex], registry: ModelRegistry) -> str:
+        """Run refresh in a background thread (queued once if a run is in progress)"""
+        if not self._job_lock.acquire(blocking=False):
+            self._pending = True
+            return "queued"
+        threading.Thread(target=self._run, args=(get_series, registry), daemon=True).start()
+        return "started"
+
+    def _run(self, get_series, registry):
+        # Called with _job_lock held
+        try:
+            while True:
+                self._pending = False
+                self._last_run.update(state="running", error=None)
+                try:
+                    stats = self.refresh(get_series(), registry)
+                    self._last_run.update(result={k: v for k, v in stats.items() if k != "errors"})
+                    print(f"📋 Forecast table: {stats['series']} series "
+                          f"({stats['computed']} computed, {stats['reused']} reused) in {stats['seconds']}s")
+                except Exception as e:
+                    self._last_run.update(error=str(e))
+                    print(f"⚠️ Forecast table refresh failed: {e}")
+                self._last_run.update(state="idle", at=time.time())
+                if not self._pending:
+                    break
+        finally:
+            self._job_lock.release()
+
+    def start_schedule(self, get_series: Callable[[], SeriesIndex], registry: ModelRegistry,
+                       interval: int = REFRESH_INTERVAL):
+        """Refresh now, then rescan models and refresh every `interval` seconds"""
+        def loop():
+            while True:
+                self.refresh_async(get_series, registry)
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+                registry.scan()
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def status(self) -> Dict:
+        table = self.table
+        return {
+            "path": self.path,
+            "series": len(table),
+            "horizon": HORIZON,
+            "built_at": table.built_at or None,
+            "refresh_interval": REFRESH_INTERVAL,
+            "last_run": dict(self._last_run),
+            **self._stats
+        }
+
+
+if __name__ == "__main__":
+    from utils.dataset import load_price_data
+    from utils.registry import get_registry
+
+    store = ForecastStore()
+    result = store.refresh(SeriesIndex(load_price_data()), get_registry())
+    print(f"Wrote {store.path}: {result}")
@@ -0,0 +1,284 @@
+"""
+Ring-buffer kernel for recursive multi-day forecasts
+
+make_features rebuilds every lag / rolling column over a 60-row window
+for each forecast day. Only the last row is used, and that row only
+depends on the last 31 prices and the date, so the kernel keeps exactly
+that state:
+
+- the last 31 prices in a ring buffer stored twice (positions i and i + 31),
+  so any trailing window is one contiguous slice
+- running sums for ma_7 / ma_14 / ma_30, updated with the entering and
+  leaving price on every step
+- std_7 from the 7-value window (two-pass, like pandas' ddof=1)
+
+Feature values match make_features up to float rounding; the trees cast
+inputs to float32, so predictions are the same as the pandas path
+(forecast_prices_reference in predict.py). Check with:
+
+    python -m utils.kernel --crop Potato --state Punjab --days 30
+"""
+import math
+import weakref
+from datetime import date, timedelta
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (7, 14, 30)
+
+# Today plus 30 days back (lag_30)
+SPAN = 31
+
+# Forests scored through PackedForests (anything else via model.predict)
+FOREST_TYPES = ("RandomForestRegressor", "ExtraTreesRegressor")
+
+# Column order produced by make_features (minus Price) - the training order
+FEATURE_COLUMNS = [
+    'day', 'month', 'dayofweek', 'weekofyear',
+    'lag_1', 'lag_7', 'lag_14', 'lag_30',
+    'ma_7', 'ma_14', 'ma_30', 'std_7'
+]
+
+
+class ForecastKernel:
+    """Feature state of one daily series; push() appends the next day's price"""
+
+    def __init__(self, values, last_date: date):
+        """
+        Parameters:
+        - values: daily prices, oldest first (at least 31)
+        - last_date: date of the last value ("today")
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) < SPAN:
+            raise ValueError("Not enough historical data")
+
+        tail = values[-SPAN:]
+        self._buf = np.concatenate([tail, tail])
+        self._head = SPAN - 1
+        self._sums = {w: math.fsum(tail[-w:]) for w in WINDOWS}
+        self.date = last_date
+
+    def push(self, price: float):
+        """Append the price of the day after self.date"""
+        head = (self._head + 1) % SPAN
+        # Positions head + SPAN - w hold the price leaving each window
+        for w in WINDOWS:
+            self._sums[w] += price - self._buf[head + SPAN - w]
+        self._buf[head] = price
+        self._buf[head + SPAN] = price
+        self._head = head
+        self.date = self.date + timedelta(days=1)
+
+    def features(self) -> np.ndarray:
+        """Feature row for self.date, in FEATURE_COLUMNS order"""
+        buf = self._buf
+        t = self._head + SPAN
+        d = self.date
+
+        window = buf[t - 6:t + 1]
+        mean_7 = self._sums[7] / 7
+        std_7 = math.sqrt(math.fsum((x - mean_7) ** 2 for x in window) / 6)
+
+        return np.array([
+            d.day, d.month, d.weekday(), d.isocalendar()[1],
+            buf[t - 1], buf[t - 7], buf[t - 14], buf[t - 30],
+            mean_7, self._sums[14] / 14, self._sums[30] / 30, std_7
+        ], dtype=np.float64)
+
+
+def _forest_trees(model):
+    """Fitted trees of a single-output sklearn forest regressor, else None"""
+    trees = getattr(model, "estimators_", None)
+    if type(model).__name__ not in FOREST_TYPES or not trees or getattr(model, "n_outputs_", 1) != 1:
+        return None
+    return trees
+
+
+# Flattened node arrays per fitted forest (dropped with the model)
+_packs = weakref.WeakKeyDictionary()
+
+
+def _pack(model) -> dict:
+    """Node arrays of all trees of a forest, child indices relative to the forest"""
+    pack = _packs.get(model)
+    if pack is not None:
+        return pack
+
+    names = getattr(model, "feature_names_in_", None)
+    columns = [FEATURE_COLUMNS.index(n) for n in names] if names is not None else list(range(len(FEATURE_COLUMNS)))
+
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset, depth = 0, 0
+    for tree in _forest_trees(model):
+        t = tree.tree_
+        ids = np.arange(t.node_count)
+        leaf = t.children_left == -1
+        # Leaves point to themselves so every traversal can run max-depth steps
+        left.append(np.where(leaf, ids, t.children_left) + offset)
+        right.append(np.where(leaf, ids, t.children_right) + offset)
+        feature.append(np.where(leaf, 0, np.take(columns, np.maximum(t.feature, 0))))
+        threshold.append(t.threshold)
+        value.append(t.value[:, 0, 0])
+        roots.append(offset)
+        offset += t.node_count
+        depth = max(depth, t.max_depth)
+
+    pack = {
+        "feature": np.concatenate(feature), "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left), "right": np.concatenate(right),
+        "value": np.concatenate(value), "roots": np.array(roots), "depth": depth
+    }
+    _packs[model] = pack
+    return pack
+
+
+class PackedForests:
+    """
+    Forests of many series flattened into one set of node arrays, so one
+    day of all series is scored by a single vectorized traversal
+
+    Reproduces RandomForestRegressor.predict exactly: float32 inputs
+    compared against the float64 thresholds, leaf values summed in
+    estimator order, divided by the number of trees.
+    """
+
+    def __init__(self, models: list):
+        offsets, parts, total = {}, [], 0
+        for model in models:
+            if id(model) not in offsets:
+                pack = _pack(model)
+                offsets[id(model)] = (total, pack)
+                parts.append(pack)
+                total += len(pack["value"])
+
+        self.feature = np.concatenate([p["feature"] for p in parts])
+        self.threshold = np.concatenate([p["threshold"] for p in parts])
+        self.value = np.concatenate([p["value"] for p in parts])
+        self.left = np.concatenate([p["left"] + offsets[k][0] for k, p in zip(offsets, parts)])
+        self.right = np.concatenate([p["right"] + offsets[k][0] for k, p in zip(offsets, parts)])
+        self.depth = max(p["depth"] for p in parts)
+
+        # One (tree, row) pair per tree of each series' forest
+        roots, rows, self.bounds = [], [], []
+        start = 0
+        for i, model in enumerate(models):
+            offset, pack = offsets[id(model)]
+            count = len(pack["roots"])
+            roots.append(pack["roots"] + offset)
+            rows.append(np.full(count, i))
+            self.bounds.append((start, start + count))
+            start += count
+        self.roots = np.concatenate(roots)
+        self.rows = np.concatenate(rows)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Prediction per row of X (row i belongs to models[i])"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        node = self.roots
+        for _ in range(self.depth):
+            go_left = X[self.rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        leaves = self.value[node]
+
+        # cumsum adds strictly in order, like sklearn's accumulation
+        return np.array([np.cumsum(leaves[a:b])[-1] / (b - a) for a, b in self.bounds])
+
+
+def model_input(model, rows: np.ndarray):
+    """Shape feature row(s) for model.predict (named columns if fitted on a DataFrame)"""
+    rows = np.atleast_2d(rows)
+    if getattr(model, "feature_names_in_", None) is not None:
+        return pd.DataFrame(rows, columns=FEATURE_COLUMNS)[list(model.feature_names_in_)]
+    return rows
+
+
+def forecast_batch(models: list, kernels: List[ForecastKernel], days: int) -> List[List[Tuple]]:
+    """
+    Recursive forecast of many series in lockstep
+
+    Every day the feature rows of all series are built into one matrix.
+    Forest models are scored together by one PackedForests traversal;
+    any other model gets one model.predict per day for all rows that use it.
+
+    Parameters:
+    - models: model for each series (the same object may appear repeatedly)
+    - kernels: ForecastKernel per series (advanced in place)
+    - days: Number of days to forecast
+
+    Returns:
+    - Per series, list of tuples (date, predicted_price)
+    """
+    if not kernels:
+        return []
+
+    forest_rows = [i for i, model in enumerate(models) if _forest_trees(model) is not None]
+    packed = PackedForests([models[i] for i in forest_rows]) if forest_rows else None
+
+    other_groups = {}
+    packed_rows = set(forest_rows)
+    for i, model in enumerate(models):
+        if i not in packed_rows:
+            other_groups.setdefault(id(model), (model, []))[1].append(i)
+
+    results = [[] for _ in kernels]
+    predictions = np.empty(len(kernels))
+    for _ in range(days):
+        X = np.vstack([k.features() for k in kernels])
+
+        if packed is not None:
+            predictions[forest_rows] = packed.predict(X[forest_rows])
+        for model, rows in other_groups.values():
+            predictions[rows] = model.predict(model_input(model, X[rows]))
+
+        for i, next_price in enumerate(predictions.tolist()):
+            kernels[i].push(next_price)
+            results[i].append((kernels[i].date, round(next_price, 2)))
+
+    return results
+
+
+def forecast(model, values, last_date: date, days: int) -> List[Tuple]:
+    """
+    Recursive forecast of `days` days after last_date
+
+    Returns:
+    - List of tuples (date, predicted_price)
+    """
+    return forecast_batch([model], [ForecastKernel(values, last_date)], days)[0]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from app import series
+    from utils.predict import forecast_prices, forecast_prices_reference
+
+    parser = argparse.ArgumentParser(description="Compare the kernel with the pandas forecast path")
+    parser.add_argument("--crop", default="Potato")
+    parser.add_argument("--state", default="Punjab")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    reference = forecast_prices_reference(series, args.crop, args.state, args.days)
+    reference_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    fast = forecast_prices(series, args.crop, args.state, args.days)
+    kernel_ms = (time.perf_counter() - start) * 1000
+
+    first, values = series.values(args.crop, args.state)
+    kernel = ForecastKernel(values, (first + pd.Timedelta(days=len(values) - 1)).date())
+    start = time.perf_counter()
+    for _ in range(args.days):
+        kernel.push(float(kernel.features()[4]))
+    feature_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = [(a, b) for a, b in zip(reference, fast) if a != b]
+    print(f"pandas path: {reference_ms:.1f} ms, kernel path: {kernel_ms:.1f} ms "
+          f"(feature work {feature_ms:.3f} ms for {args.days} days)")
+    print("identical" if not mismatches else f"{len(mismatches)} mismatches: {mismatches[:5]}")
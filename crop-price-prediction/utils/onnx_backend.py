@@ -0,0 +1,293 @@
+"""
+ONNX export and onnxruntime inference for the price models
+
+model.predict on a one-row DataFrame spends milliseconds in validation
+and joblib dispatch before walking the trees. The same forest exported to
+ONNX runs as one TreeEnsembleRegressor node on a float32 NumPy row in a
+few microseconds.
+
+Export (needs skl2onnx, only where the export runs):
+
+    python -m utils.onnx_backend [--only Potato_Punjab]
+
+writes models/onnx/{crop}_{state}.onnx and checks each one against its
+pickle on that series' historical feature rows. The result goes to
+models/onnx/manifest.json together with the pickle's mtime/size:
+
+- a model whose parity check failed is never served from ONNX
+- a pickle retrained after the export (mtime/size differ) falls back to
+  the pickle until it is exported again
+
+ONNX accumulates leaf values in float32, so predictions agree with the
+pickle to ~1e-7 relative, not bit for bit (PARITY_RTOL is the bound).
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils import kernel
+from utils.registry import MODEL_CACHE_SIZE, MODELS_DIR, ModelRegistry, get_registry
+
+ONNX_DIR = os.getenv("ONNX_MODELS_DIR", os.path.join(MODELS_DIR, "onnx"))
+
+# "onnx" serves exported models when they pass the checks, "pickle" never does
+PREDICT_BACKEND = os.getenv("PREDICT_BACKEND", "onnx")
+
+MANIFEST_FILE = "manifest.json"
+PARITY_RTOL = 1e-5
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+def onnx_path(crop: str, state: str, onnx_dir: str = ONNX_DIR) -> str:
+    return os.path.join(onnx_dir, f"{crop}_{state}.onnx")
+
+
+def _read_manifest(onnx_dir: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(onnx_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# ============================================
+# Inference
+# ============================================
+
+class OnnxSessions:
+    """LRU of onnxruntime sessions for exported models that are still current"""
+
+    def __init__(self, onnx_dir: str = ONNX_DIR, registry: Optional[ModelRegistry] = None,
+                 max_loaded: int = MODEL_CACHE_SIZE):
+        self.onnx_dir = onnx_dir
+        self.registry = registry
+        self.max_loaded = max_loaded
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()   # (crop, state) -> (session, columns, source stamp)
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._stats = {"runs": 0, "loads": 0, "fallbacks": 0}
+
+    def _current_manifest(self) -> Dict[str, dict]:
+        try:
+            mtime = os.stat(os.path.join(self.onnx_dir, MANIFEST_FILE)).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            self._manifest = _read_manifest(self.onnx_dir) if mtime is not None else {}
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def get(self, crop: str, state: str):
+        """
+        (session, feature column indices) for crop/state, or None when there
+        is no passing export for the current pickle (or no onnxruntime)
+        """
+        if ort is None or PREDICT_BACKEND != "onnx":
+            return None
+
+        entry = self._current_manifest().get(f"{crop}_{state}")
+        if not entry or not entry.get("passed"):
+            return None
+
+        registry = self.registry or get_registry()
+        try:
+            st = os.stat(registry.lookup(crop, state)["path"])
+        except (FileNotFoundError, OSError):
+            return None
+        source = (st.st_mtime, st.st_size)
+        if source != (entry["source_mtime"], entry["source_size"]):
+            # Pickle retrained since the export
+            return None
+
+        key = (crop, state)
+        with self._lock:
+            cached = self._sessions.get(key)
+            if cached is not None and cached[2] == source:
+                self._sessions.move_to_end(key)
+                return cached[0], cached[1]
+
+        options = ort.SessionOptions()
+        # One row per call - a thread pool only adds overhead
+        options.intra_op_num_threads = 1
+        session = ort.InferenceSession(onnx_path(crop, state, self.onnx_dir), options,
+                                       providers=["CPUExecutionProvider"])
+        columns = np.array([kernel.FEATURE_COLUMNS.index(name) for name in entry["features"]])
+
+        with self._lock:
+            self._stats["loads"] += 1
+            self._sessions[key] = (session, columns, source)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_loaded:
+                self._sessions.popitem(last=False)
+        return session, columns
+
+    def predict(self, crop: str, state: str, rows: np.ndarray) -> Optional[np.ndarray]:
+        """Predictions for feature rows (FEATURE_COLUMNS order), None if not served by ONNX"""
+        found = self.get(crop, state)
+        if found is None:
+            self._stats["fallbacks"] += 1
+            return None
+        session, columns = found
+        X = np.ascontiguousarray(np.atleast_2d(rows)[:, columns], dtype=np.float32)
+        self._stats["runs"] += 1
+        return session.run(None, {session.get_inputs()[0].name: X})[0].ravel().astype(np.float64)
+
+    def status(self) -> dict:
+        manifest = self._current_manifest()
+        with self._lock:
+            return {
+                "backend": PREDICT_BACKEND if ort is not None else "pickle (onnxruntime not installed)",
+                "onnx_dir": self.onnx_dir,
+                "exported": sum(1 for e in manifest.values() if e.get("passed")),
+                "failed_parity": sorted(k for k, e in manifest.items() if not e.get("passed")),
+                "loaded": len(self._sessions),
+                **self._stats
+            }
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+
+def get_sessions() -> OnnxSessions:
+    """Process-wide session cache (created on first use)"""
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                _sessions = OnnxSessions()
+    return _sessions
+
+
+# ============================================
+# Export
+# ============================================
+
+def parity_rows(model, values: Optional[np.ndarray] = None, count: int = 2000) -> np.ndarray:
+    """
+    Feature rows to compare pickle and ONNX on: every historical day of the
+    series when given, otherwise random rows spanning the trees' thresholds
+    """
+    if values is not None and len(values) > kernel.SPAN:
+        from datetime import date
+        series_kernel = kernel.ForecastKernel(values[:kernel.SPAN], date(2000, 1, 1))
+        rows = [series_kernel.features()]
+        for price in values[kernel.SPAN:]:
+            series_kernel.push(float(price))
+            rows.append(series_kernel.features())
+        return np.vstack(rows)
+
+    rng = np.random.default_rng(0)
+    trees = [t.tree_ for t in model.estimators_]
+    rows = np.empty((count, len(kernel.FEATURE_COLUMNS)))
+    for i in range(rows.shape[1]):
+        thresholds = np.concatenate([t.threshold[t.feature == i] for t in trees])
+        low, high = (thresholds.min(), thresholds.max()) if len(thresholds) else (0.0, 1.0)
+        rows[:, i] = rng.uniform(low - 1, high + 1, count)
+    return rows
+
+
+def export_model(model, path: str, rows: np.ndarray) -> dict:
+    """
+    Convert a fitted regressor to ONNX at path and compare it with
+    model.predict on rows (FEATURE_COLUMNS order)
+
+    Returns:
+    - Manifest entry (features, max_abs_diff, max_rel_diff, rows, passed)
+    """
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    features = [str(n) for n in getattr(model, "feature_names_in_", kernel.FEATURE_COLUMNS)]
+    columns = [kernel.FEATURE_COLUMNS.index(name) for name in features]
+
+    onx = convert_sklearn(
+        model, initial_types=[("X", FloatTensorType([None, len(features)]))],
+        target_opset={"": 17, "ai.onnx.ml": 3}
+    )
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(onx.SerializeToString())
+
+    # Same float32 rows for both: the trees cast inputs to float32 anyway
+    X = rows.astype(np.float32).astype(np.float64)
+    expected = model.predict(kernel.model_input(model, X))
+    session = ort.InferenceSession(tmp_path, providers=["CPUExecutionProvider"])
+    actual = session.run(None, {"X": np.ascontiguousarray(X[:, columns], dtype=np.float32)})[0].ravel()
+
+    diff = np.abs(actual - expected)
+    rel = diff / np.maximum(np.abs(expected), 1e-9)
+    passed = bool(rel.max() <= PARITY_RTOL)
+    if passed:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+
+    return {
+        "features": features,
+        "max_abs_diff": float(diff.max()),
+        "max_rel_diff": float(rel.max()),
+        "rows": len(X),
+        "passed": passed
+    }
+
+
+def export_all(registry: ModelRegistry, series=None, onnx_dir: str = ONNX_DIR, only=None) -> Dict[str, dict]:
+    """Export every model in the registry (or the `only` names) and update the manifest"""
+    os.makedirs(onnx_dir, exist_ok=True)
+    manifest = _read_manifest(onnx_dir)
+
+    for crop in registry.crops():
+        for state in registry.states(crop):
+            name = f"{crop}_{state}"
+            if only and name not in only:
+                continue
+            entry = registry.lookup(crop, state)
+            values = series.values(crop, state)[1] if series is not None and (crop, state) in series else None
+            try:
+                model = registry.get(crop, state, record=False)
+                result = export_model(model, onnx_path(crop, state, onnx_dir), parity_rows(model, values))
+            except Exception as e:
+                result = {"passed": False, "error": str(e)}
+            manifest[name] = {"source_mtime": entry["mtime"], "source_size": entry["size"], **result}
+            status = "ok" if result["passed"] else "FAILED"
+            print(f"{name}: {status} {({k: v for k, v in result.items() if k != 'features'})}")
+
+    tmp_path = os.path.join(onnx_dir, f"{MANIFEST_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(onnx_dir, MANIFEST_FILE))
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the price models to ONNX and check parity")
+    parser.add_argument("--out", default=ONNX_DIR)
+    parser.add_argument("--only", nargs="*", help="model names like Potato_Punjab")
+    parser.add_argument("--no-data", action="store_true", help="check on random rows instead of the dataset")
+    args = parser.parse_args()
+
+    if ort is None:
+        raise SystemExit("onnxruntime is required for the parity check")
+
+    price_series = None
+    if not args.no_data:
+        from utils.dataset import load_price_data
+        from utils.series_index import SeriesIndex
+        price_series = SeriesIndex(load_price_data())
+
+    results = export_all(get_registry(), price_series, args.out, args.only)
+    failed = [name for name, entry in results.items() if not entry.get("passed")]
+    print(f"{len(results) - len(failed)} exported, {len(failed)} failed parity{': ' + ', '.join(failed) if failed else ''}")
@@ -1,25 +1,27 @@
 """
 Prediction utilities for crop price forecasting
 """
+import numpy as np
 import pandas as pd
-import joblib
-import os
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Union
+
+from utils import kernel
+from utils.onnx_backend import get_sessions
+from utils.registry import get_registry
+from utils.series_index import SeriesIndex, to_daily
+
+# Price data: the pre-built per-(crop, state) index, or the raw DataFrame
+PriceData = Union[SeriesIndex, pd.DataFrame]
 
 
 def get_model_path(crop: str, state: str) -> str:
     """Get the model file path for a given crop and state"""
-    model_path = f"models/{crop}_{state}.pkl"
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model not found: {model_path}")
-    return model_path
+    return get_registry().lookup(crop, state)["path"]
 
 
 def load_model(crop: str, state: str):
-    """Load the trained model for a given crop and state"""
-    model_path = get_model_path(crop, state)
-    model = joblib.load(model_path)
-    return model
+    """Get the trained model for a given crop and state (cached by the registry)"""
+    return get_registry().get(crop, state)
 
 
 def make_daily_ts(df: pd.DataFrame, crop: str, state: str) -> pd.DataFrame:
@@ -36,18 +38,18 @@ def make_daily_ts(df: pd.DataFrame, crop: str, state: str) -> pd.DataFrame:
     if ts.empty:
         raise ValueError(f"No data found for {crop} in {state}")
     
-    # Sort & set index
-    ts = ts.sort_values('Date')
-    ts = ts.set_index('Date')
-    
-    # Resample to daily
-    ts_daily = ts.resample('D').mean()
-    
-    # Interpolate missing values
-    ts_daily['Price'] = ts_daily['Price'].interpolate(method='time')
-    ts_daily['Price'] = ts_daily['Price'].ffill().bfill()
-    
-    return ts_daily
+    return to_daily(ts)
+
+
+def daily_ts(data: PriceData, crop: str, state: str, days: int = None) -> pd.DataFrame:
+    """
+    Daily series for crop/state - an O(1) lookup when data is a SeriesIndex,
+    a full scan (make_daily_ts) when it is the raw DataFrame
+    """
+    if isinstance(data, SeriesIndex):
+        return data.frame(crop, state, days)
+    ts = make_daily_ts(data, crop, state)
+    return ts if days is None else ts.iloc[-days:]
 
 
 def make_features(ts_daily: pd.DataFrame) -> pd.DataFrame:
@@ -75,16 +77,16 @@ def make_features(ts_daily: pd.DataFrame) -> pd.DataFrame:
     return df_feat.dropna()
 
 
-def get_recent_ts(df: pd.DataFrame, crop: str, state: str, days: int = 60) -> pd.DataFrame:
+def get_recent_ts(df: PriceData, crop: str, state: str, days: int = 60) -> pd.DataFrame:
     """
     Get recent time series data for prediction
     """
-    ts = make_daily_ts(df, crop, state)
+    ts = daily_ts(df, crop, state, days)
     
     if len(ts) < days:
         raise ValueError("Not enough historical data")
     
-    return ts.iloc[-days:]
+    return ts
 
 
 def prepare_latest_features(ts_recent: pd.DataFrame) -> pd.DataFrame:
@@ -100,39 +102,54 @@ def prepare_latest_features(ts_recent: pd.DataFrame) -> pd.DataFrame:
     return X_latest
 
 
-def predict_next_day_price(df: pd.DataFrame, crop: str, state: str) -> float:
+def predict_rows(crop: str, state: str, rows: np.ndarray) -> np.ndarray:
+    """
+    Predict feature rows (kernel.FEATURE_COLUMNS order) with the crop/state model
+    
+    Uses the exported ONNX session when there is a current one that passed
+    its parity check (utils/onnx_backend.py), otherwise the pickled model.
+    """
+    predictions = get_sessions().predict(crop, state, rows)
+    if predictions is not None:
+        return predictions
+    model = load_model(crop, state)
+    return np.asarray(model.predict(kernel.model_input(model, rows)), dtype=np.float64)
+
+
+def predict_next_day_price(df: PriceData, crop: str, state: str) -> float:
     """
     Predict next day's price for given crop and state
     
     Parameters:
-    - df: DataFrame with crop price data
+    - df: SeriesIndex (or DataFrame) with crop price data
     - crop: Crop name (e.g., 'Potato', 'Onion', 'Tomato', 'Rice', 'Wheat')
     - state: State name (e.g., 'Punjab', 'Uttar Pradesh')
     
     Returns:
     - Predicted price for next day
     """
-    # 1. Load model
-    model = load_model(crop, state)
-    
-    # 2. Get recent data
-    ts_recent = get_recent_ts(df, crop, state)
+    # 1. Check the model exists, get recent data
+    get_model_path(crop, state)
+    values, last_date = _series_values(df, crop, state)
     
-    # 3. Prepare features
-    X_latest = prepare_latest_features(ts_recent)
+    # 2. Prepare features - the kernel's row for "today" as a NumPy array
+    X_latest = kernel.ForecastKernel(values, last_date).features()
     
-    # 4. Predict
-    predicted_price = model.predict(X_latest)[0]
+    # 3. Predict (ONNX session, or the pickle as fallback)
+    predicted_price = predict_rows(crop, state, X_latest)[0]
     
     return round(float(predicted_price), 2)
 
 
-def forecast_prices(df: pd.DataFrame, crop: str, state: str, days: int = 7) -> List[Tuple]:
+def forecast_prices(df: PriceData, crop: str, state: str, days: int = 7) -> List[Tuple]:
     """
     Forecast prices for next N days using recursive strategy
     
+    Features are updated incrementally by the ring-buffer kernel
+    (utils/kernel.py) - same predictions as forecast_prices_reference.
+    
     Parameters:
-    - df: DataFrame with crop price data
+    - df: SeriesIndex (or DataFrame) with crop price data
     - crop: Crop name
     - state: State name
     - days: Number of days to forecast
@@ -141,7 +158,27 @@ def forecast_prices(df: pd.DataFrame, crop: str, state: str, days: int = 7) -> L
     - List of tuples (date, predicted_price)
     """
     model = load_model(crop, state)
+    values, last_date = _series_values(df, crop, state)
+    return kernel.forecast(model, values, last_date, days)
+
+
+def _series_values(df: PriceData, crop: str, state: str):
+    """(daily prices, date of the last one) for crop/state"""
+    if isinstance(df, SeriesIndex):
+        first, values = df.values(crop, state)
+        return values, (first + pd.Timedelta(days=len(values) - 1)).date()
     ts = make_daily_ts(df, crop, state)
+    return ts['Price'].to_numpy(), ts.index[-1].date()
+
+
+def forecast_prices_reference(df: PriceData, crop: str, state: str, days: int = 7) -> List[Tuple]:
+    """
+    Recursive forecast rebuilding all features with pandas every day -
+    the original implementation, kept to check the kernel against
+    """
+    model = load_model(crop, state)
+    # Only the trailing 60 days are ever read
+    ts = daily_ts(df, crop, state, 60)
     
     forecasts = []
     
@@ -190,12 +227,12 @@ def get_trend(forecasts: List[Tuple]) -> Tuple[float, str]:
     return round(pct_change, 2), trend
 
 
-def forecast_summary(df: pd.DataFrame, crop: str, state: str, days: int = 7) -> Dict:
+def forecast_summary(df: PriceData, crop: str, state: str, days: int = 7) -> Dict:
     """
     Generate forecast summary with trend analysis
     
     Parameters:
-    - df: DataFrame with crop price data
+    - df: SeriesIndex (or DataFrame) with crop price data
     - crop: Crop name
     - state: State name
     - days: Number of days to forecast (default: 7)
@@ -208,6 +245,11 @@ def forecast_summary(df: pd.DataFrame, crop: str, state: str, days: int = 7) ->
         - daily_forecast (list of objects with date and price)
     """
     forecast = forecast_prices(df, crop, state, days)
+    return summarize_forecast(crop, state, days, forecast)
+
+
+def summarize_forecast(crop: str, state: str, days: int, forecast: List[Tuple]) -> Dict:
+    """Forecast summary payload from (date, price) tuples"""
     pct_change, trend = get_trend(forecast)
     
     start_price = forecast[0][1]
@@ -236,3 +278,38 @@ def forecast_summary(df: pd.DataFrame, crop: str, state: str, days: int = 7) ->
     }
     
     return summary
+
+
+def forecast_batch(df: PriceData, pairs: List[Tuple[str, str]], days: int = 7) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Forecast summaries for many (crop, state) series in one pass
+    
+    Models are fetched once, all series are stepped together and scored
+    per model in vectorized calls (see kernel.forecast_batch). A series
+    without a model or enough data is reported instead of failing the batch.
+    
+    Parameters:
+    - df: SeriesIndex (or DataFrame) with crop price data
+    - pairs: (crop, state) tuples
+    - days: Number of days to forecast
+    
+    Returns:
+    - (summaries, errors) - errors as {"crop", "state", "error"}
+    """
+    models, kernels, ready, errors = [], [], [], []
+    for crop, state in pairs:
+        try:
+            model = load_model(crop, state)
+            values, last_date = _series_values(df, crop, state)
+            kernels.append(kernel.ForecastKernel(values, last_date))
+            models.append(model)
+            ready.append((crop, state))
+        except (FileNotFoundError, ValueError) as e:
+            errors.append({"crop": crop, "state": state, "error": str(e)})
+    
+    forecasts = kernel.forecast_batch(models, kernels, days)
+    summaries = [
+        summarize_forecast(crop, state, days, forecast)
+        for (crop, state), forecast in zip(ready, forecasts)
+    ]
+    return summaries, errors
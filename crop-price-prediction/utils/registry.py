@@ -0,0 +1,243 @@
+"""
+Model registry for crop price forecasting
+
+- scans the models directory once: crop, state, path, mtime and size of
+  every {crop}_{state}.pkl
+- keeps a bounded LRU of deserialized models (MODEL_CACHE_SIZE)
+- a model whose file mtime/size changed is reloaded on next use, so models
+  can be swapped on disk without a restart
+- records each loaded model's feature schema and per-model hit counts;
+  the hit counts are saved so the hottest models can be preloaded at startup
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import joblib
+
+MODELS_DIR = os.getenv("MODELS_DIR", "models")
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "32"))
+MODEL_PRELOAD = int(os.getenv("MODEL_PRELOAD", "8"))
+
+# Unknown models trigger a directory rescan at most this often (seconds)
+RESCAN_INTERVAL = 30
+
+USAGE_FILE = "usage.json"
+
+
+def _split_name(filename: str):
+    """'Potato_Uttar Pradesh.pkl' -> ('Potato', 'Uttar Pradesh')"""
+    stem = filename[:-len(".pkl")]
+    if "_" not in stem:
+        return None
+    crop, state = stem.split("_", 1)
+    return crop, state
+
+
+class ModelRegistry:
+    """Catalogue of the models on disk plus an LRU of loaded ones"""
+
+    def __init__(self, models_dir: str = MODELS_DIR, max_loaded: int = MODEL_CACHE_SIZE):
+        self.models_dir = models_dir
+        self.max_loaded = max_loaded
+
+        self._lock = threading.Lock()
+        self._entries = {}               # (crop, state) -> metadata dict
+        self._loaded = OrderedDict()     # (crop, state) -> (model, mtime, size)
+        self._last_scan = 0.0
+        self._stats = {"hits": 0, "loads": 0, "reloads": 0, "evictions": 0, "scans": 0}
+
+        self.scan()
+
+    # ----- catalogue -----
+
+    def scan(self) -> int:
+        """(Re)read the models directory; returns the number of models found"""
+        entries = {}
+        try:
+            names = os.listdir(self.models_dir)
+        except OSError:
+            names = []
+
+        for name in names:
+            if not name.endswith(".pkl"):
+                continue
+            key = _split_name(name)
+            if key is None:
+                continue
+            path = os.path.join(self.models_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries[key] = {
+                "crop": key[0],
+                "state": key[1],
+                "path": path,
+                "mtime": st.st_mtime,
+                "size": st.st_size,
+            }
+
+        usage = self._read_usage()
+        with self._lock:
+            for key, entry in entries.items():
+                old = self._entries.get(key, {})
+                entry["features"] = old.get("features")
+                entry["hits"] = old.get("hits", usage.get(f"{key[0]}_{key[1]}", 0))
+            self._entries = entries
+            # Drop loaded models whose file disappeared
+            for key in [k for k in self._loaded if k not in entries]:
+                del self._loaded[key]
+            self._last_scan = time.monotonic()
+            self._stats["scans"] += 1
+
+        return len(entries)
+
+    def lookup(self, crop: str, state: str) -> dict:
+        key = (crop, state)
+        entry = self._entries.get(key)
+        if entry is None and time.monotonic() - self._last_scan > RESCAN_INTERVAL:
+            self.scan()
+            entry = self._entries.get(key)
+        if entry is None:
+            raise FileNotFoundError(f"Model not found: {os.path.join(self.models_dir, f'{crop}_{state}.pkl')}")
+        return entry
+
+    def crops(self) -> List[str]:
+        return sorted({crop for crop, _ in self._entries})
+
+    def states(self, crop: Optional[str] = None) -> List[str]:
+        return sorted({state for c, state in self._entries if crop is None or c == crop})
+
+    def has_model(self, crop: str, state: str) -> bool:
+        return (crop, state) in self._entries
+
+    # ----- loading -----
+
+    def get(self, crop: str, state: str, record: bool = True):
+        """
+        Deserialized model for crop/state (record=False: don't count the
+        hit, for batch jobs that touch every model)
+
+        Raises:
+            FileNotFoundError: no such model on disk
+        """
+        key = (crop, state)
+        entry = self.lookup(crop, state)
+
+        try:
+            st = os.stat(entry["path"])
+        except OSError:
+            self.scan()
+            raise FileNotFoundError(f"Model not found: {entry['path']}")
+
+        with self._lock:
+            if record:
+                entry["hits"] = entry.get("hits", 0) + 1
+            cached = self._loaded.get(key)
+            if cached is not None and cached[1] == st.st_mtime and cached[2] == st.st_size:
+                self._loaded.move_to_end(key)
+                self._stats["hits"] += 1
+                return cached[0]
+
+        # Load outside the lock - unpickling a forest can take a while
+        model = joblib.load(entry["path"])
+
+        with self._lock:
+            if cached is not None:
+                self._stats["reloads"] += 1
+                print(f"♻️ Model {crop}_{state} changed on disk, reloaded")
+            self._stats["loads"] += 1
+            entry.update(mtime=st.st_mtime, size=st.st_size, features=self._schema(model))
+            self._loaded[key] = (model, st.st_mtime, st.st_size)
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+                self._stats["evictions"] += 1
+
+        return model
+
+    @staticmethod
+    def _schema(model) -> Optional[List[str]]:
+        names = getattr(model, "feature_names_in_", None)
+        if names is not None:
+            return [str(n) for n in names]
+        count = getattr(model, "n_features_in_", None)
+        return [f"f{i}" for i in range(count)] if count else None
+
+    def preload(self, limit: int = MODEL_PRELOAD) -> List[str]:
+        """Load the most used models (by saved hit counts) into the LRU"""
+        limit = min(limit, self.max_loaded)
+        with self._lock:
+            hottest = sorted(self._entries.values(), key=lambda e: e.get("hits", 0), reverse=True)[:limit]
+
+        loaded = []
+        for entry in hottest:
+            try:
+                self.get(entry["crop"], entry["state"])
+                loaded.append(f"{entry['crop']}_{entry['state']}")
+            except Exception as e:
+                print(f"⚠️ Could not preload {entry['crop']}_{entry['state']}: {e}")
+        return loaded
+
+    # ----- usage persistence -----
+
+    def _usage_path(self) -> str:
+        return os.path.join(self.models_dir, USAGE_FILE)
+
+    def _read_usage(self) -> Dict[str, int]:
+        try:
+            with open(self._usage_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_usage(self):
+        """Persist hit counts so the next start preloads the hottest models"""
+        with self._lock:
+            usage = {f"{c}_{s}": e.get("hits", 0) for (c, s), e in self._entries.items() if e.get("hits")}
+        if not usage:
+            return
+        try:
+            tmp_path = f"{self._usage_path()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(usage, f, indent=2)
+            os.replace(tmp_path, self._usage_path())
+        except OSError as e:
+            print(f"⚠️ Could not save model usage: {e}")
+
+    # ----- status -----
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "models_dir": self.models_dir,
+                "models": len(self._entries),
+                "loaded": len(self._loaded),
+                "max_loaded": self.max_loaded,
+                **self._stats,
+            }
+
+    def catalogue(self) -> List[dict]:
+        with self._lock:
+            return [
+                {**entry, "loaded": key in self._loaded}
+                for key, entry in sorted(self._entries.items())
+            ]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry (created on first use)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,96 @@
+"""
+Pre-indexed daily price series per (crop, state)
+
+Built once from the price DataFrame (at startup or on refresh): every
+(Commodity, STATE) group is resampled to daily and interpolated exactly as
+make_daily_ts does, and stored as a start date + float64 NumPy array.
+Requests then look up their series in O(1) instead of masking the whole
+dataset, and crop -> states comes from the same index.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def to_daily(ts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Daily Price series from raw (Date, Price) rows of one crop and state:
+    mean per day, time-interpolated gaps, edges filled (always float64,
+    also when the cached dataset stores prices as float32)
+    """
+    ts = ts.astype({'Price': 'float64'}).sort_values('Date').set_index('Date')
+
+    ts_daily = ts.resample('D').mean()
+    ts_daily['Price'] = ts_daily['Price'].interpolate(method='time')
+    ts_daily['Price'] = ts_daily['Price'].ffill().bfill()
+
+    return ts_daily
+
+
+class SeriesIndex:
+    """(crop, state) -> (first date, daily prices) plus crop -> states"""
+
+    def __init__(self, df: pd.DataFrame):
+        start = time.time()
+
+        self._series: Dict[Tuple[str, str], Tuple[pd.Timestamp, np.ndarray]] = {}
+        self._states: Dict[str, List[str]] = {}
+
+        rows = df[['Commodity', 'STATE', 'Date', 'Price']]
+        for (crop, state), group in rows.groupby(['Commodity', 'STATE'], sort=False, observed=True):
+            daily = to_daily(group[['Date', 'Price']])
+            values = daily['Price'].to_numpy(dtype=np.float64)
+            values.setflags(write=False)
+            self._series[(crop, state)] = (daily.index[0], values)
+
+        for crop, state in self._series:
+            self._states.setdefault(crop, []).append(state)
+        for states in self._states.values():
+            states.sort()
+
+        self.source_rows = len(df)
+        self.build_seconds = round(time.time() - start, 2)
+
+    def __contains__(self, key) -> bool:
+        return key in self._series
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def values(self, crop: str, state: str) -> Tuple[pd.Timestamp, np.ndarray]:
+        """
+        (first date, read-only daily prices) for crop/state
+
+        Raises:
+            ValueError: no data for crop/state
+        """
+        series = self._series.get((crop, state))
+        if series is None:
+            raise ValueError(f"No data found for {crop} in {state}")
+        return series
+
+    def frame(self, crop: str, state: str, days: Optional[int] = None) -> pd.DataFrame:
+        """Daily series as a Date-indexed DataFrame (last `days` days if given)"""
+        first, values = self.values(crop, state)
+        offset = 0 if days is None else max(0, len(values) - days)
+        index = pd.date_range(first + pd.Timedelta(days=offset), periods=len(values) - offset, freq='D', name='Date')
+        return pd.DataFrame({'Price': values[offset:].copy()}, index=index)
+
+    def crops(self) -> List[str]:
+        return sorted(self._states)
+
+    def states(self, crop: Optional[str] = None) -> List[str]:
+        if crop is not None:
+            return list(self._states.get(crop, []))
+        return sorted({state for states in self._states.values() for state in states})
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self._series),
+            "crops": len(self._states),
+            "source_rows": self.source_rows,
+            "daily_points": int(sum(len(v) for _, v in self._series.values())),
+            "build_seconds": self.build_seconds
+        }
@@ -0,0 +1,300 @@
+"""
+Retraining pipeline for every crop x state model
+
+The training recipe of croppriceprediction.ipynb (make_features, last 20%
+held out, RandomForestRegressor(500 trees, depth 15, min_samples_leaf 5),
+per-crop history minimums and MAE limits) as one command:
+
+    python -m utils.train [--workers N] [--crops Potato Onion] [--states Punjab]
+
+- every (crop, state) series of the dataset with enough history is found
+  through the SeriesIndex, and its features are built once in the parent
+- models train in a process pool with one worker per available core, each
+  forest single-threaded, largest series first
+- a worker writes {crop}_{state}.pkl and {crop}_{state}.json (feature
+  schema, training / test window, MAE, RMSE, parameters) through temp
+  files + rename, so a running API never sees a partial model; models
+  that fail the quality filters are not written
+- a wall-time report per series goes to stdout and models/training_report.json
+
+A running API picks the new pickles up through the registry's mtime check;
+their forecast table rows and ONNX exports go stale by themselves.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.registry import MODELS_DIR
+
+MIN_DAYS_BY_CROP = {
+    'Potato': 365,
+    'Onion': 365,
+    'Wheat': 365,
+    'Tomato': 180,
+    'Rice': 180
+}
+
+MIN_FEATURE_ROWS_BY_CROP = {
+    'Potato': 300,
+    'Onion': 300,
+    'Wheat': 300,
+    'Tomato': 200,
+    'Rice': 200
+}
+
+MAX_MAE_BY_CROP = {
+    'Potato': 150,
+    'Onion': 200,
+    'Wheat': 50,
+    'Tomato': 250,
+    'Rice': 100
+}
+
+# Crops the notebook did not configure
+DEFAULT_MIN_DAYS = 365
+DEFAULT_MIN_FEATURE_ROWS = 300
+
+# n_jobs=1: the pool already runs one forest per core
+RF_PARAMS = {
+    "n_estimators": 500,
+    "max_depth": 15,
+    "min_samples_leaf": 5,
+    "n_jobs": 1,
+    "random_state": 42
+}
+
+TEST_FRACTION = 0.2
+
+REPORT_FILE = "training_report.json"
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects container CPU affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def discover_jobs(series, crops: Optional[List[str]] = None, states: Optional[List[str]] = None) -> List[Dict]:
+    """
+    One training job per (crop, state) with enough history, features built once
+
+    Returns:
+    - Jobs {crop, state, features, feature_seconds}, plus skipped series
+      as {crop, state, status: "skipped", reason}
+    """
+    from utils.predict import make_features
+
+    jobs = []
+    for crop in series.crops():
+        if crops and crop not in crops:
+            continue
+        for state in series.states(crop):
+            if states and state not in states:
+                continue
+
+            start = time.perf_counter()
+            ts_daily = series.frame(crop, state)
+            min_days = MIN_DAYS_BY_CROP.get(crop, DEFAULT_MIN_DAYS)
+            if len(ts_daily) < min_days:
+                jobs.append({"crop": crop, "state": state, "status": "skipped",
+                             "reason": f"only {len(ts_daily)} days (< {min_days})"})
+                continue
+
+            ts_feat = make_features(ts_daily)
+            min_rows = MIN_FEATURE_ROWS_BY_CROP.get(crop, DEFAULT_MIN_FEATURE_ROWS)
+            if len(ts_feat) < min_rows:
+                jobs.append({"crop": crop, "state": state, "status": "skipped",
+                             "reason": f"insufficient features ({len(ts_feat)} rows < {min_rows})"})
+                continue
+
+            jobs.append({
+                "crop": crop,
+                "state": state,
+                "features": ts_feat,
+                "feature_seconds": round(time.perf_counter() - start, 3)
+            })
+    return jobs
+
+
+def _write_atomic(path: str, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train_series(crop: str, state: str, ts_feat: pd.DataFrame, models_dir: str = MODELS_DIR,
+                 params: Optional[Dict] = None) -> Dict:
+    """
+    Train, evaluate and (if it passes the quality filters) save one model
+
+    Runs inside a pool worker; only the result dict goes back to the parent.
+
+    Returns:
+    - {crop, state, status: "trained" | "dropped", mae, rmse, rows, seconds, ...}
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    params = {**RF_PARAMS, **(params or {})}
+    start = time.perf_counter()
+
+    X = ts_feat.drop(columns=['Price'])
+    y = ts_feat['Price']
+
+    # last 20% as test
+    split = int(len(ts_feat) * (1 - TEST_FRACTION))
+    X_train, X_test = X.iloc[:split], X.iloc[split:]
+    y_train, y_test = y.iloc[:split], y.iloc[split:]
+
+    model = RandomForestRegressor(**params)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    preds = model.predict(X_test)
+    mae = float(mean_absolute_error(y_test, preds))
+    rmse = float(np.sqrt(mean_squared_error(y_test, preds)))
+
+    result = {
+        "crop": crop,
+        "state": state,
+        "rows": len(ts_feat),
+        "mae": round(mae, 2),
+        "rmse": round(rmse, 2),
+        "fit_seconds": round(fit_seconds, 2)
+    }
+
+    # ---- Quality filters
+    max_mae = MAX_MAE_BY_CROP.get(crop)
+    if mae < 1:
+        result.update(status="dropped", reason="near-zero MAE (flat series)")
+    elif max_mae is not None and mae > max_mae:
+        result.update(status="dropped", reason=f"MAE {mae:.2f} > allowed {max_mae}")
+    else:
+        import sklearn
+
+        metadata = {
+            "crop": crop,
+            "state": state,
+            "features": list(X.columns),
+            "train_window": [str(X_train.index[0].date()), str(X_train.index[-1].date())],
+            "test_window": [str(X_test.index[0].date()), str(X_test.index[-1].date())],
+            "train_rows": len(X_train),
+            "test_rows": len(X_test),
+            "metrics": {"mae": mae, "rmse": rmse},
+            "params": params,
+            "sklearn_version": sklearn.__version__,
+            "trained_at": datetime.now().isoformat(timespec="seconds")
+        }
+        base = os.path.join(models_dir, f"{crop}_{state}")
+
+        def write_metadata(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+
+        # Metadata first: the registry reacts to the .pkl
+        _write_atomic(f"{base}.json", write_metadata)
+        _write_atomic(f"{base}.pkl", lambda path: joblib.dump(model, path))
+        result.update(status="trained", model_path=f"{base}.pkl")
+
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def train_all(series, models_dir: str = MODELS_DIR, workers: Optional[int] = None,
+              crops: Optional[List[str]] = None, states: Optional[List[str]] = None,
+              params: Optional[Dict] = None) -> Dict:
+    """
+    Train every eligible (crop, state) model in a process pool
+
+    Returns:
+    - Report {workers, wall_seconds, trained, dropped, skipped, failed, series: [...]}
+    """
+    start = time.perf_counter()
+    os.makedirs(models_dir, exist_ok=True)
+    workers = workers or available_cores()
+
+    found = discover_jobs(series, crops, states)
+    results = [job for job in found if job.get("status") == "skipped"]
+    jobs = [job for job in found if job.get("status") != "skipped"]
+    # Largest series first so a long fit doesn't start last
+    jobs.sort(key=lambda job: len(job["features"]), reverse=True)
+    print(f"Training {len(jobs)} models on {workers} workers ({len(results)} series skipped)")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(train_series, job["crop"], job["state"], job["features"], models_dir, params): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"crop": job["crop"], "state": job["state"], "status": "failed", "reason": str(e)}
+            result["feature_seconds"] = job["feature_seconds"]
+            results.append(result)
+
+            if result["status"] == "trained":
+                print(f"✓ TRAINED {result['crop']}-{result['state']} | Rows: {result['rows']} | "
+                      f"MAE: {result['mae']:.2f} | {result['seconds']}s")
+            else:
+                print(f"✗ {result['status'].upper()} {result['crop']}-{result['state']}: {result.get('reason')}")
+
+    results.sort(key=lambda r: (r["crop"], r["state"]))
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("trained", "dropped", "skipped", "failed")}
+    report = {
+        "workers": workers,
+        "wall_seconds": round(time.perf_counter() - start, 2),
+        "cpu_seconds": round(sum(r.get("seconds", 0) for r in results), 2),
+        **counts,
+        "series": results
+    }
+
+    def write_report(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    _write_atomic(os.path.join(models_dir, REPORT_FILE), write_report)
+    return report
+
+
+def print_report(report: Dict):
+    print("\n========== TRAINING REPORT ==========")
+    print(f"{'Series':<32} {'Status':<8} {'Rows':>6} {'MAE':>9} {'Features s':>10} {'Train s':>8}")
+    for r in report["series"]:
+        mae = f"{r['mae']:.2f}" if "mae" in r else "-"
+        print(f"{r['crop'] + '-' + r['state']:<32} {r['status']:<8} {r.get('rows', '-'):>6} {mae:>9} "
+              f"{r.get('feature_seconds', '-'):>10} {r.get('seconds', '-'):>8}")
+    print(f"\n{report['trained']} trained, {report['dropped']} dropped, {report['skipped']} skipped, "
+          f"{report['failed']} failed | wall {report['wall_seconds']}s on {report['workers']} workers "
+          f"(sum of per-series time {report['cpu_seconds']}s)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils.dataset import DATA_PATH, load_price_data
+    from utils.series_index import SeriesIndex
+
+    parser = argparse.ArgumentParser(description="Retrain every crop x state price model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--out", default=MODELS_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="default: available cores")
+    parser.add_argument("--crops", nargs="*")
+    parser.add_argument("--states", nargs="*")
+    parser.add_argument("--n-estimators", type=int, default=None, help="override for quick runs")
+    args = parser.parse_args()
+
+    overrides = {"n_estimators": args.n_estimators} if args.n_estimators else None
+    price_series = SeriesIndex(load_price_data(args.data))
+    print_report(train_all(price_series, args.out, args.workers, args.crops, args.states, overrides))
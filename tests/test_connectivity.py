@@ -0,0 +1,95 @@
+"""Circuit breaker state transitions (chatbot_backend/llm/connectivity.py)"""
+import pytest
+
+from chatbot_backend.llm import connectivity
+from chatbot_backend.llm.connectivity import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(connectivity.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure("timeout")
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure("timeout")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.is_available()
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock[0] += 9
+    assert not breaker.is_available()
+
+    clock[0] += 1
+    assert breaker.is_available()
+    # is_available() does not consume the trial
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_half_open_trial_failure_reopens_with_new_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow_request()
+
+    # A single failure in half-open reopens, regardless of the threshold
+    breaker.record_failure("still down")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.is_available()
+
+    assert breaker.snapshot()["last_error"] == "still down"
+
+    clock[0] += 10
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_probe_feeds_breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    monkeypatch.setattr(connectivity, "breaker", breaker)
+
+    monkeypatch.setattr(connectivity, "probe_connection", lambda timeout=None: False)
+    assert connectivity.run_probe() is False
+    assert not connectivity.is_online()
+
+    monkeypatch.setattr(connectivity, "probe_connection", lambda timeout=None: True)
+    assert connectivity.run_probe() is True
+    assert connectivity.is_online()
+    assert connectivity.get_connectivity_status()["state"] == CircuitBreaker.CLOSED
@@ -0,0 +1,101 @@
+"""Ring-buffer forecast kernel against the pandas path (crop-price-prediction/utils)"""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crop-price-prediction")
+if PROJECT_DIR not in sys.path:
+    sys.path.append(PROJECT_DIR)
+
+from utils import kernel, predict  # noqa: E402
+from utils.registry import ModelRegistry  # noqa: E402
+from utils.series_index import SeriesIndex  # noqa: E402
+
+PAIRS = [("Potato", "Punjab"), ("Potato", "Odisha"), ("Onion", "Punjab")]
+DAYS = 30
+
+
+def synthetic_prices() -> pd.DataFrame:
+    """A year of noisy seasonal prices per series, with missing days and duplicate reports"""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range("2022-01-01", periods=365, freq="D")
+    frames = []
+    for i, (crop, state) in enumerate(PAIRS):
+        keep = rng.random(len(dates)) > 0.2
+        day = np.arange(len(dates))[keep]
+        price = 800 + 300 * i + 150 * np.sin(day / 29 + i) + rng.normal(0, 25, len(day))
+        rows = pd.DataFrame({"Commodity": crop, "STATE": state, "Date": dates[keep], "Price": price})
+        frames += [rows, rows.sample(frac=0.1, random_state=i).assign(Price=lambda f: f["Price"] + 10)]
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def series():
+    return SeriesIndex(synthetic_prices())
+
+
+@pytest.fixture(scope="module")
+def models_dir(series, tmp_path_factory):
+    path = tmp_path_factory.mktemp("models")
+    for crop, state in PAIRS:
+        features = predict.make_features(series.frame(crop, state))
+        model = RandomForestRegressor(n_estimators=20, max_depth=8, min_samples_leaf=3, random_state=0)
+        model.fit(features.drop(columns=["Price"]), features["Price"])
+        joblib.dump(model, path / f"{crop}_{state}.pkl")
+    return str(path)
+
+
+@pytest.fixture
+def registry(models_dir, monkeypatch):
+    registry = ModelRegistry(models_dir)
+    monkeypatch.setattr(predict, "get_registry", lambda: registry)
+    return registry
+
+
+@pytest.mark.parametrize("crop,state", PAIRS)
+def test_kernel_forecast_matches_pandas_reference(series, registry, crop, state):
+    assert predict.forecast_prices(series, crop, state, DAYS) == \
+        predict.forecast_prices_reference(series, crop, state, DAYS)
+
+
+def test_kernel_features_match_make_features(series):
+    frame = series.frame("Potato", "Punjab")
+    first, values = series.values("Potato", "Punjab")
+    expected = predict.make_features(frame).drop(columns=["Price"]).iloc[-1]
+
+    features = kernel.ForecastKernel(values, frame.index[-1].date()).features()
+    assert list(expected.index) == kernel.FEATURE_COLUMNS
+    np.testing.assert_allclose(features, expected.to_numpy(dtype=np.float64), rtol=1e-9)
+
+
+def test_batch_matches_per_series_forecasts(series, registry):
+    models, inputs = [], []
+    for crop, state in PAIRS:
+        first, values = series.values(crop, state)
+        models.append(registry.get(crop, state))
+        inputs.append((values, (first + pd.Timedelta(days=len(values) - 1)).date()))
+
+    # A series repeated and a non-forest model take the other scoring paths
+    features = predict.make_features(series.frame("Onion", "Punjab"))
+    linear = LinearRegression().fit(features.drop(columns=["Price"]), features["Price"])
+    models += [models[0], linear]
+    inputs += [inputs[0], inputs[2]]
+
+    batch = kernel.forecast_batch(models, [kernel.ForecastKernel(v, d) for v, d in inputs], DAYS)
+    assert batch == [kernel.forecast(model, v, d, DAYS) for model, (v, d) in zip(models, inputs)]
+    assert batch[0] == batch[3]
+
+
+def test_forecast_batch_summaries_match_forecast_summary(series, registry):
+    summaries, errors = predict.forecast_batch(series, PAIRS + [("Rice", "Punjab")], 7)
+
+    assert [(s["crop"], s["state"]) for s in summaries] == PAIRS
+    assert [e["crop"] for e in errors] == ["Rice"]
+    for summary in summaries:
+        assert summary == predict.forecast_summary(series, summary["crop"], summary["state"], 7)
@@ -0,0 +1,119 @@
+"""Source fan-out and late merges of the mandi price cache (chatbot_backend/tools/mandi_price.py)"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from chatbot_backend.net import swr_cache
+from chatbot_backend.net.swr_cache import SWRCache
+from chatbot_backend.tools import mandi_price
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def records(market, source):
+    return [{"state": "Punjab", "market": market, "commodity": "Wheat", "variety": "",
+             "arrival_date": "01/01/2026", "modal_price": "2400", "source": source}]
+
+
+def markets(value):
+    return sorted(record["market"] for record in value or [])
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SWRCache("mandi-test", ttl=10, stale_ttl=100)
+    monkeypatch.setattr(mandi_price, "_mandi_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """Each source answers records(<its market>, name) once its gate is set"""
+    gates = {source["name"]: threading.Event() for source in mandi_price.MANDI_SOURCES}
+    answers = {source["name"]: source["name"] for source in mandi_price.MANDI_SOURCES}
+
+    def fetch(source, commodity=None, state=None, limit=50):
+        gates[source["name"]].wait(5)
+        return records(answers[source["name"]], source["name"])
+
+    monkeypatch.setattr(mandi_price, "_fetch_source", fetch)
+    return gates, answers
+
+
+def test_late_source_is_merged_into_stored_winner(cache, sources):
+    gates, _ = sources
+    gates["data.gov.in"].set()
+
+    value = mandi_price.fetch_realtime_mandi_prices("Wheat", "Punjab")
+    assert markets(value) == ["data.gov.in"]
+
+    gates["eNAM"].set()
+    gates["AgMarket"].set()
+    wait_until(lambda: len(cache.peek("wheat_punjab")) == 3)
+    assert markets(cache.peek("wheat_punjab")) == ["AgMarket", "data.gov.in", "eNAM"]
+
+
+def test_source_finishing_before_the_store_is_not_lost(cache, sources, monkeypatch):
+    gates, _ = sources
+    gates["data.gov.in"].set()
+    fanout = mandi_price._fanout
+
+    def slow_store(*args):
+        # eNAM answers after the winner was picked but before it is cached
+        winner, late = fanout(*args)
+        gates["eNAM"].set()
+        wait_until(lambda: all(f.done() for f, source in late if source["name"] == "eNAM"))
+        return winner, late
+
+    monkeypatch.setattr(mandi_price, "_fanout", slow_store)
+    mandi_price.fetch_realtime_mandi_prices("Wheat", "Punjab")
+
+    assert markets(cache.peek("wheat_punjab")) == ["data.gov.in", "eNAM"]
+    gates["AgMarket"].set()
+
+
+def test_stale_refresh_merges_into_the_new_entry(cache, sources, monkeypatch):
+    gates, answers = sources
+    now = [1000.0]
+    monkeypatch.setattr(swr_cache.time, "monotonic", lambda: now[0])
+    cache.set("wheat_punjab", records("old", "data.gov.in"))
+    now[0] += 20
+
+    answers["data.gov.in"] = "new"
+    gates["data.gov.in"].set()
+    assert markets(mandi_price.fetch_realtime_mandi_prices("Wheat", "Punjab")) == ["old"]
+    wait_until(lambda: markets(cache.peek("wheat_punjab")) == ["new"])
+
+    gates["eNAM"].set()
+    gates["AgMarket"].set()
+    wait_until(lambda: len(cache.peek("wheat_punjab")) == 3)
+    assert markets(cache.peek("wheat_punjab")) == ["AgMarket", "eNAM", "new"]
+
+
+def test_async_same_batch_answers_are_part_of_the_winner(cache, monkeypatch):
+    async def scenario():
+        agmarket = asyncio.Event()
+
+        async def fetch(source, commodity=None, state=None, limit=50):
+            if source["name"] == "AgMarket":
+                await agmarket.wait()
+            return records(source["name"], source["name"])
+
+        monkeypatch.setattr(mandi_price, "_fetch_source_async", fetch)
+        value = await mandi_price.fetch_realtime_mandi_prices_async("Wheat", "Punjab")
+        assert markets(value) == ["data.gov.in", "eNAM"]
+        assert markets(cache.peek("wheat_punjab")) == ["data.gov.in", "eNAM"]
+
+        agmarket.set()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert markets(cache.peek("wheat_punjab")) == ["AgMarket", "data.gov.in", "eNAM"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+"""Latest-price queries of the local mandi store (chatbot_backend/tools/mandi_store.py)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from chatbot_backend.tools import mandi_store
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(mandi_store, "DB_PATH", str(tmp_path / "mandi.db"))
+    monkeypatch.setattr(mandi_store, "_schema_ready", False)
+    return mandi_store
+
+
+def day(offset: int) -> str:
+    return (datetime.now() - timedelta(days=offset)).strftime("%d/%m/%Y")
+
+
+def record(market, commodity, arrival_date, modal, state="Punjab"):
+    return {"state": state, "district": market, "market": market, "commodity": commodity,
+            "arrival_date": arrival_date, "min_price": modal - 100, "max_price": modal + 100,
+            "modal_price": modal}
+
+
+def test_each_market_commodity_on_its_own_latest_date(store):
+    store.upsert_records([
+        record("Ludhiana", "Wheat", day(0), 2400),
+        record("Ludhiana", "Wheat", day(1), 2300),
+        # Didn't report today - still served, from its latest day
+        record("Ludhiana", "Onion", day(1), 1800),
+        record("Amritsar", "Wheat", day(2), 2350),
+        # Outside the MAX_AGE_DAYS window
+        record("Jalandhar", "Potato", day(10), 900),
+    ])
+
+    rows = {(r["market"], r["commodity"]): r for r in store.query_all_latest()}
+    assert set(rows) == {("Ludhiana", "Wheat"), ("Ludhiana", "Onion"), ("Amritsar", "Wheat")}
+    assert rows[("Ludhiana", "Wheat")]["modal_price"] == 2400
+    assert rows[("Ludhiana", "Onion")]["arrival_date"] == day(1)
+
+    frame = store.query_all_latest_frame()
+    assert sorted(zip(frame["market"], frame["commodity"], frame["modal_price"])) == [
+        ("Amritsar", "Wheat", 2350), ("Ludhiana", "Onion", 1800), ("Ludhiana", "Wheat", 2400)
+    ]
+
+
+def test_state_filter_and_empty_store(store):
+    assert store.query_all_latest() == []
+    assert store.query_all_latest_frame().empty
+
+    store.upsert_records([
+        record("Ludhiana", "Wheat", day(0), 2400),
+        record("Agra", "Potato", day(1), 1100, state="Uttar Pradesh"),
+    ])
+    assert [r["market"] for r in store.query_all_latest("Uttar Pradesh")] == ["Agra"]
+    assert list(store.query_all_latest_frame("punjab")["market"]) == ["Ludhiana"]
+
+
+def test_latest_prices_for_one_commodity_cover_every_market(store):
+    store.upsert_records([
+        record("Ludhiana", "Wheat", day(0), 2400),
+        record("Amritsar", "Wheat", day(1), 2350),
+        record("Amritsar", "Wheat", day(2), 2200),
+        record("Jalandhar", "Wheat", day(2), 2500),
+        record("Ludhiana", "Onion", day(0), 1800),
+        record("Agra", "Wheat", day(0), 2300, state="Uttar Pradesh"),
+    ])
+
+    rows = store.query_latest_prices("Wheat", "Punjab")
+    assert [(r["market"], r["modal_price"]) for r in rows] == [
+        ("Jalandhar", 2500), ("Ludhiana", 2400), ("Amritsar", 2350)
+    ]
+    all_wheat = [r for r in store.query_all_latest("Punjab") if r["commodity"] == "Wheat"]
+    assert sorted(r["market"] for r in rows) == sorted(r["market"] for r in all_wheat)
+    assert [r["market"] for r in store.query_latest_prices("Wheat", "Punjab", "Amritsar")] == ["Amritsar"]
+    assert store.query_latest_prices("Wheat", "Punjab", "Bathinda") == []
@@ -0,0 +1,98 @@
+"""Answer cache partitioning and query normalization (chatbot_backend/agent/semantic_cache.py)"""
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from chatbot_backend.agent import semantic_cache
+from chatbot_backend.agent.semantic_cache import SemanticCache, cache_partition, mentioned_place, normalize_query
+from chatbot_backend.geo import gazetteer
+from chatbot_backend.tools import mandi_store
+
+
+@pytest.fixture(autouse=True)
+def extractors(monkeypatch):
+    """answer.py's gazetteer-backed extractors without importing the LLM chain"""
+    def extract_location(query, default="Delhi"):
+        return gazetteer.find_in_text(query)["location"] or default
+
+    def extract_state(query, default="Punjab"):
+        return gazetteer.find_in_text(query)["state"] or default
+
+    def extract_crop(query):
+        return next((c.title() for c in ("onion", "potato", "wheat") if c in query.lower()), None)
+
+    stub = types.ModuleType("chatbot_backend.agent.answer")
+    stub.extract_location, stub.extract_state, stub.extract_crop = extract_location, extract_state, extract_crop
+    monkeypatch.setitem(sys.modules, "chatbot_backend.agent.answer", stub)
+
+
+@pytest.fixture(autouse=True)
+def store_commodities(monkeypatch):
+    """Mandi store commodities the partition resolves crops against (none unless a test sets them)"""
+    commodities = []
+    monkeypatch.setattr(mandi_store, "query_commodities", lambda: list(commodities))
+    monkeypatch.setattr(semantic_cache, "_store_commodities", {"names": frozenset(), "loaded_at": None})
+    return commodities
+
+
+def test_normalize_query_keeps_devanagari_vowel_signs():
+    assert normalize_query("प्याज़ का भाव क्या है?") == "प्याज़ का भाव क्या है"
+    assert normalize_query("  Onion   PRICE, Delhi!! ") == "onion price delhi"
+
+
+def test_unresolved_place_is_not_cached():
+    assert mentioned_place("onion price in sitapur") == "sitapur"
+    assert cache_partition("onion price in sitapur", {}) is None
+
+
+def test_known_places_get_their_own_partition():
+    bareilly = cache_partition("onion price in bareilly", {})
+    delhi = cache_partition("onion price in delhi", {})
+    nowhere = cache_partition("onion price", {})
+
+    assert bareilly[2:4] == ("bareilly", "uttar pradesh")
+    assert delhi[2:4] == ("delhi", "delhi")
+    assert len({bareilly, delhi, nowhere}) == 3
+
+
+def test_non_place_words_after_markers_still_cache():
+    assert cache_partition("onion price in the market", {}) is not None
+    assert cache_partition("what to sow in winter", {}) is not None
+
+
+def test_context_location_wins():
+    partition = cache_partition("onion price", {"location": "Agra", "state": "Uttar Pradesh", "language": "hi"})
+    assert partition[0] == "hi"
+    assert partition[2:4] == ("agra", "uttar pradesh")
+
+
+def test_lookup_only_matches_within_partition():
+    cache = SemanticCache(max_entries=10, threshold=0.9)
+    vec = np.ones(4) / 2
+    answer = {"mode": "online", "type": "mandi_price", "message": "₹1200", "intent": "mandi_price"}
+
+    cache.store("onion price in bareilly", ("en", "onion", "bareilly", "uttar pradesh", None), vec, answer)
+    assert cache.lookup("onion price in bareilly", ("en", "onion", "bareilly", "uttar pradesh", None), vec)
+    assert cache.lookup("onion price in delhi", ("en", "onion", "delhi", "delhi", None), vec) is None
+
+
+def test_crops_extract_crop_does_not_know_get_their_own_partition():
+    okra = cache_partition("aphids in okra", {})
+    brinjal = cache_partition("aphids in brinjal", {})
+    cabbages = cache_partition("how to grow cabbages", {})
+    cauliflower = cache_partition("how to grow cauliflower", {})
+
+    assert (okra[1], brinjal[1], cabbages[1], cauliflower[1]) == ("okra", "brinjal", "cabbage", "cauliflower")
+    assert cache_partition("onion and cabbage price", {})[1] == "cabbage,onion"
+
+
+def test_crops_resolve_against_the_mandi_store_commodities(store_commodities):
+    store_commodities += ["Amaranthus", "Paddy(Dhan)(Common)", "Colacasia"]
+
+    assert cache_partition("amaranthus price", {})[1] == "amaranthus"
+    assert cache_partition("colacasia price", {})[1] == "colacasia"
+    assert cache_partition("dhan price", {})[1] == "dhan"
+    # "Common" is part of a commodity name, not a crop
+    assert cache_partition("common pests of wheat", {})[1] == "wheat"
@@ -0,0 +1,208 @@
+"""SWRCache single-flight and stale-while-revalidate behaviour (chatbot_backend/net/swr_cache.py)"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from chatbot_backend.net import swr_cache
+from chatbot_backend.net.swr_cache import SWRCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(swr_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_miss_loads_then_hits(clock):
+    cache = SWRCache("t", ttl=10, stale_ttl=5)
+    calls = []
+
+    assert cache.get("k", lambda: calls.append(1) or "v1") == "v1"
+    assert cache.get("k", lambda: calls.append(1) or "v2") == "v1"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_none_is_returned_but_not_cached(clock):
+    cache = SWRCache("t", ttl=10)
+    assert cache.get("k", lambda: None) is None
+    assert cache.peek("k") is None
+    assert cache.get("k", lambda: "v") == "v"
+
+
+def test_concurrent_sync_misses_share_one_load():
+    cache = SWRCache("t", ttl=10)
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return "v"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", loader))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: cache.stats()["coalesced"] == 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["v"] * 5
+    assert len(calls) == 1
+
+
+def test_sync_load_error_reaches_followers_and_is_not_cached():
+    cache = SWRCache("t", ttl=10)
+    release = threading.Event()
+
+    def loader():
+        release.wait(2)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get("k", loader)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: cache.stats()["coalesced"] == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert errors == ["upstream down"] * 3
+    assert cache.peek("k") is None
+
+
+def test_concurrent_async_misses_share_one_load():
+    cache = SWRCache("t", ttl=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "v"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget("k", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["v"] * 5
+    assert len(calls) == 1
+
+
+def test_cancelled_async_leader_does_not_cancel_followers():
+    cache = SWRCache("t", ttl=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget("k", loader))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(cache.aget("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert cache.stats()["coalesced"] == 3
+
+        # e.g. the leader's client hung up
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(main()) == ["v"] * 3
+    # One follower led a second load, the others coalesced on it
+    assert len(calls) == 2
+    assert cache.peek("k") == "v"
+
+
+def test_stale_value_served_while_one_refresh_runs(clock):
+    cache = SWRCache("t", ttl=10, stale_ttl=5)
+    cache.get("k", lambda: "old")
+    clock[0] += 11
+
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return "new"
+
+    assert cache.get("k", loader) == "old"
+    assert cache.get("k", loader) == "old"
+    release.set()
+    wait_until(lambda: cache.stats()["refreshes"] == 1)
+
+    assert len(calls) == 1
+    assert cache.get("k", loader) == "new"
+
+
+def test_failed_refresh_keeps_stale_value(clock):
+    cache = SWRCache("t", ttl=10, stale_ttl=5)
+    cache.get("k", lambda: "old")
+    clock[0] += 11
+
+    def loader():
+        raise RuntimeError("boom")
+
+    assert cache.get("k", loader) == "old"
+    wait_until(lambda: cache.stats()["refresh_errors"] == 1)
+    assert cache.peek("k") == "old"
+
+
+def test_async_stale_refresh(clock):
+    cache = SWRCache("t", ttl=10, stale_ttl=5)
+    cache.set("k", "old")
+    clock[0] += 11
+
+    async def loader():
+        return "new"
+
+    async def main():
+        first = await cache.aget("k", loader)
+        while cache.stats()["refreshes"] == 0:
+            await asyncio.sleep(0)
+        return first, await cache.aget("k", loader)
+
+    assert asyncio.run(main()) == ("old", "new")
+
+
+def test_expires_after_stale_window(clock):
+    cache = SWRCache("t", ttl=10, stale_ttl=5)
+    cache.set("k", "old")
+    clock[0] += 16
+    assert cache.peek("k") is None
+    assert cache.get("k", lambda: "new") == "new"
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction(clock):
+    cache = SWRCache("t", max_entries=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a", lambda: None)      # touch a
+    cache.set("c", 3)
+
+    assert cache.peek("b") is None
+    assert cache.peek("a") == 1 and cache.peek("c") == 3
+    assert cache.stats()["evictions"] == 1